@@ -0,0 +1,189 @@
+import asyncio
+import threading
+from typing import Any, Callable, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from lexical_index import adense_search, alexical_search, fusion_key, reciprocal_rank_fusion, submit_lexical_search
+
+
+# Candidates fetched first, the most a query may widen to, and documents returned, per query class.
+# Retrieval only sees the standalone search query, never the conversation, so there is no follow-up class.
+DEFAULT_DEPTH_LIMITS = {
+    "chit_chat": {"initial_k": 10, "max_k": 20, "top_n": 5},
+    "simple": {"initial_k": 20, "max_k": 80, "top_n": 10},
+    "multi_hop": {"initial_k": 40, "max_k": 100, "top_n": 20},
+}
+FLAT_SCORE_SPREAD = 0.05  # dense top-to-last score gap below which the ranking is considered flat
+MIN_RERANK_CONFIDENCE = 0.5  # weak-result threshold for rerankers without their own min_confidence (Cohere)
+
+
+class DepthStats:
+    """
+    Thread-safe counters of how deep adaptive retrieval went.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.widened = 0
+        self.candidates = 0
+        self.reranked = 0
+
+    def record(self, widenings, candidates, reranked):
+        with self._lock:
+            self.queries += 1
+            self.widened += 1 if widenings else 0
+            self.candidates += candidates
+            self.reranked += reranked
+
+    def reset(self):
+        with self._lock:
+            self.queries = self.widened = self.candidates = self.reranked = 0
+
+    def stats(self):
+        """
+        Returns totals and per-query averages of candidates fetched and reranked.
+        """
+        with self._lock:
+            queries = self.queries or 1
+            return {
+                "queries": self.queries,
+                "widened": self.widened,
+                "avg_candidates": self.candidates / queries,
+                "avg_reranked": self.reranked / queries,
+            }
+
+
+depth_stats = DepthStats()
+
+
+def is_flat(scores, spread=FLAT_SCORE_SPREAD):
+    """
+    True when the dense similarity scores barely separate the best match from the rest.
+    """
+    return len(scores) > 1 and scores[0] - scores[-1] < spread
+
+
+def top_confidence(documents):
+    return max((document.metadata.get("relevance_score") or 0.0 for document in documents), default=0.0)
+
+
+def confidence_threshold(compressor, default=MIN_RERANK_CONFIDENCE):
+    """
+    Best relevance score below which a reranker's results count as weak. Scores are on
+    each reranker's own scale, so rerankers may declare it as `min_confidence` (looked
+    up through wrappers such as CachedRerank).
+    """
+    while compressor is not None:
+        threshold = getattr(compressor, "min_confidence", None)
+        if threshold is not None:
+            return threshold
+        compressor = getattr(compressor, "base_compressor", None)
+    return default
+
+
+class AdaptiveRetriever(BaseRetriever):
+    """
+    Retrieve-and-rerank that starts shallow and widens only when needed.
+
+    The query class (classifier) picks the initial candidate count, the
+    ceiling and how many documents to return. The candidate count doubles
+    while the dense scores are flat, and again while the best rerank score
+    stays under the reranker's confidence threshold (or `min_confidence` when
+    given); on a widening only the newly fetched candidates are sent to the
+    reranker, since its scores are per document.
+    """
+
+    vector_store: Any
+    compressor: Any
+    lexical_index: Any = None
+    classifier: Optional[Callable[[str], str]] = None
+    limits: dict = DEFAULT_DEPTH_LIMITS
+    flat_spread: float = FLAT_SCORE_SPREAD
+    min_confidence: Optional[float] = None
+
+    def _min_confidence(self):
+        return self.min_confidence if self.min_confidence is not None else confidence_threshold(self.compressor)
+
+    def _limits(self, query):
+        query_class = self.classifier(query) if self.classifier else "simple"
+        return self.limits.get(query_class, self.limits["simple"])
+
+    def _candidates(self, query, k):
+        lexical = submit_lexical_search(self.lexical_index, query, k) if self.lexical_index is not None else None
+        scored = self.vector_store.similarity_search_with_score(query, k=k)
+        documents = [document for document, _ in scored]
+        if lexical is not None:
+            documents = reciprocal_rank_fusion([documents, lexical.result()])[:k]
+        return documents, [score for _, score in scored]
+
+    def _rerank(self, documents, query, run_manager):
+        if not documents:
+            return []
+        return list(self.compressor.compress_documents(documents, query, callbacks=run_manager.get_child()))
+
+    async def _acandidates(self, query, k):
+        dense = adense_search(self.vector_store, query, k)
+        if self.lexical_index is None:
+            scored = await dense
+            return [document for document, _ in scored], [score for _, score in scored]
+        # The query embedding and the lexical search overlap
+        scored, lexical = await asyncio.gather(dense, alexical_search(self.lexical_index, query, k))
+        documents = reciprocal_rank_fusion([[document for document, _ in scored], lexical])[:k]
+        return documents, [score for _, score in scored]
+
+    async def _arerank(self, documents, query, run_manager):
+        if not documents:
+            return []
+        return list(await self.compressor.acompress_documents(documents, query, callbacks=run_manager.get_child()))
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        limits = self._limits(query)
+        k, widenings = limits["initial_k"], 0
+        candidates, scores = self._candidates(query, k)
+        while is_flat(scores, self.flat_spread) and k < limits["max_k"] and len(candidates) == k:
+            k, widenings = min(k * 2, limits["max_k"]), widenings + 1
+            candidates, scores = self._candidates(query, k)
+
+        seen = {fusion_key(document) for document in candidates}
+        min_confidence = self._min_confidence()
+        ranked = self._rerank(candidates, query, run_manager)
+        reranked = len(candidates)
+        while top_confidence(ranked) < min_confidence and k < limits["max_k"] and len(candidates) == k:
+            k, widenings = min(k * 2, limits["max_k"]), widenings + 1
+            candidates, _ = self._candidates(query, k)
+            new = [document for document in candidates if fusion_key(document) not in seen]
+            seen.update(fusion_key(document) for document in new)
+            ranked += self._rerank(new, query, run_manager)
+            reranked += len(new)
+
+        ranked.sort(key=lambda document: document.metadata.get("relevance_score") or 0.0, reverse=True)
+        depth_stats.record(widenings, k, reranked)
+        return ranked[:limits["top_n"]]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> list[Document]:
+        limits = self._limits(query)
+        k, widenings = limits["initial_k"], 0
+        candidates, scores = await self._acandidates(query, k)
+        while is_flat(scores, self.flat_spread) and k < limits["max_k"] and len(candidates) == k:
+            k, widenings = min(k * 2, limits["max_k"]), widenings + 1
+            candidates, scores = await self._acandidates(query, k)
+
+        seen = {fusion_key(document) for document in candidates}
+        min_confidence = self._min_confidence()
+        ranked = await self._arerank(candidates, query, run_manager)
+        reranked = len(candidates)
+        while top_confidence(ranked) < min_confidence and k < limits["max_k"] and len(candidates) == k:
+            k, widenings = min(k * 2, limits["max_k"]), widenings + 1
+            candidates, _ = await self._acandidates(query, k)
+            new = [document for document in candidates if fusion_key(document) not in seen]
+            seen.update(fusion_key(document) for document in new)
+            ranked += await self._arerank(new, query, run_manager)
+            reranked += len(new)
+
+        ranked.sort(key=lambda document: document.metadata.get("relevance_score") or 0.0, reverse=True)
+        depth_stats.record(widenings, k, reranked)
+        return ranked[:limits["top_n"]]
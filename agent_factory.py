@@ -0,0 +1,78 @@
+import threading
+
+from langchain.agents import AgentExecutor, create_json_chat_agent
+
+
+class AgentFactory:
+    """
+    Process-wide factory for the chat AgentExecutor.
+
+    The prompt, model, agent and executor are built once on first use and shared
+    by every session; only the per-session memory and callbacks are bound per call.
+    reload() swaps the prompt or model without restarting the server.
+    """
+
+    def __init__(self, llm_loader, tools, prompt_loader):
+        self.llm_loader = llm_loader
+        self.tools = tools
+        self.prompt_loader = prompt_loader
+        self.prompt = None
+        self.generation = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_executor(self):
+        """
+        Returns the shared AgentExecutor, building it on first use.
+        """
+        executor = self._executor
+        if executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.prompt is None:
+                        self.prompt = self.prompt_loader()
+                    agent = create_json_chat_agent(llm=self.llm_loader(), tools=self.tools, prompt=self.prompt)
+                    self._executor = AgentExecutor(
+                        agent=agent,
+                        tools=self.tools,
+                        return_intermediate_steps=True,
+                        handle_parsing_errors=True
+                    )
+                executor = self._executor
+        return executor
+
+    def reload(self, prompt=None, llm=None):
+        """
+        Drops the shared executor so the next turn rebuilds it.
+        A new prompt or llm replaces the current one; without a prompt it is loaded again.
+        """
+        with self._lock:
+            self.prompt = prompt
+            if llm is not None:
+                self.llm_loader = lambda: llm
+            self._executor = None
+            self.generation += 1
+
+    def invoke(self, user_input, memory, callbacks=None):
+        """
+        Runs one turn with the shared executor and the session's memory.
+
+        Returns:
+        dict: Chat agent's response
+        """
+        inputs = {"input": user_input, **memory.load_memory_variables({})}
+        response = self.get_executor().invoke(inputs, {"callbacks": callbacks or []})
+        memory.save_context({"input": user_input}, {"output": response["output"]})
+        return response
+
+    async def ainvoke(self, user_input, memory, callbacks=None):
+        """
+        Async variant of invoke(); tools run through their coroutines.
+
+        Returns:
+        dict: Chat agent's response
+        """
+        inputs = {"input": user_input, **memory.load_memory_variables({})}
+        response = await self.get_executor().ainvoke(inputs, {"callbacks": callbacks or []})
+        memory.save_context({"input": user_input}, {"output": response["output"]})
+        return response
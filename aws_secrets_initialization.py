@@ -1,62 +1,193 @@
 
-import boto3
 import json
 import os
-#from langchain.memory import DynamoDBChatMessageHistory
-from langchain_community.chat_message_histories import DynamoDBChatMessageHistory
-#from langchain_community.embeddings import BedrockEmbeddings
-from langchain_aws import BedrockEmbeddings
-from langchain_aws import ChatBedrock
 import streamlit as st
-from langsmith import Client
 from uuid import uuid4
 import time
+from embedding_cache import EmbeddingCache, CachedEmbeddings
+from lazy_init import lazy_provider
+from secrets_provider import SecretsProvider
+from history_writer import DynamoDBItemSink, WriteBehindQueue
 
 # Constants for configuration
 REGION_NAME = 'us-east-1'
 REGION_NAME_BEDROCK = 'us-east-1'
-INDEX_NAME = 'edu-application-guide-full'
+INDEX_NAME = os.environ.get("INDEX_NAME", "edu-application-guide-full")
+VECTOR_STORE_BACKEND = os.environ.get("VECTOR_STORE_BACKEND", "pinecone")  # "pinecone" or "local"
+LOCAL_INDEX_DIR = os.environ.get("LOCAL_INDEX_DIR", "snapshots")  # holds one snapshot directory per index name
+LOCAL_INDEX_KIND = os.environ.get("LOCAL_INDEX_KIND", "auto")  # "brute", "hnsw" or "auto" (by corpus size)
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")  # "hybrid" (BM25 + dense, fused) or "dense"
+RETRIEVAL_DEPTH = os.environ.get("RETRIEVAL_DEPTH", "adaptive")  # "adaptive" (widen only when needed) or "fixed"
+RERANKER = os.environ.get("RERANKER", "cohere")  # "cohere", "cross-encoder" (local ONNX model) or "lexical"
+RERANKER_MODEL_DIR = os.environ.get("RERANKER_MODEL_DIR", "models/ms-marco-MiniLM-L-6-v2")  # ONNX model and tokenizer.json for "cross-encoder"
+RETRIEVAL_DEPTH_LIMITS = json.loads(os.environ.get("RETRIEVAL_DEPTH_LIMITS", "{}"))  # per query class overrides, e.g. {"simple": {"max_k": 60}}
 MODEL_ID = "anthropic.claude-3-5-sonnet-20240620-v1:0"
 MODEL_ID_OPUS = 'anthropic.claude-3-opus-20240229-v1:0'
 SESSION_TABLE_NAME = "SessionTableEduChatbot"
+SESSION_MESSAGES_TABLE_NAME = os.environ.get("SESSION_MESSAGES_TABLE_NAME", "SessionMessagesEduChatbot")  # one item per message, keyed (SessionId, MessageKey)
 SESSION_ID = "Internal-test"
+FEEDBACK_BACKEND = os.environ.get("FEEDBACK_BACKEND", "dynamodb")  # "dynamodb" or "sqlite" (local stand-in)
+FEEDBACK_TABLE_NAME = os.environ.get("FEEDBACK_TABLE_NAME", "FeedbackEduChatbot")
+FEEDBACK_SQLITE_PATH = os.environ.get("FEEDBACK_SQLITE_PATH", "feedback.sqlite3")
+HISTORY_QUEUE_SIZE = 1000  # pending DynamoDB history writes before new ones are dropped
+EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v2:0"
+EMBEDDING_CACHE_SIZE = 4096
+EMBEDDING_CACHE_TTL_SECONDS = 7 * 24 * 3600
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH")  # SQLite file shared by worker processes; unset keeps the cache in memory
+EMBEDDING_CACHE_DISK_SIZE = 100000  # rows kept in the SQLite tier; older ones are trimmed
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity needed to reuse an answer
+ANSWER_CACHE_SIZE = 2000
+ANSWER_CACHE_TTL_SECONDS = int(os.environ.get("ANSWER_CACHE_TTL_SECONDS", str(6 * 3600)))  # bounds staleness when the index is re-ingested elsewhere
+PROMPT_HUB_SYNC = os.environ.get("PROMPT_HUB_SYNC", "false").lower() == "true"  # report drift between the vendored prompt and LangChain Hub in the background
+MEMORY_MAX_TURNS = 4  # turns resent verbatim; older ones are folded into a running summary
+MEMORY_MAX_TOKENS = 2000  # token budget for the verbatim turns
+PIPELINE_MODE = os.environ.get("PIPELINE_MODE", "auto")  # "agent", "direct" or "auto" (route per question)
+ASYNC_PIPELINE = os.environ.get("ASYNC_PIPELINE", "false").lower() == "true"  # "true" runs turns with ainvoke so the embedding, BM25 and vector stages overlap; "false" (default) keeps the sync path
+SECRETS_SOURCE = os.environ.get("SECRETS_SOURCE", "aws")  # "aws" (Secrets Manager) or "local" (SECRETS_FILE and env only)
+SECRETS_FILE = os.environ.get("SECRETS_FILE")  # JSON file of {secret_name: {key: value}} for offline runs
+SECRETS_TTL_SECONDS = 3600
+SHOW_STARTUP_REPORT = os.environ.get("SHOW_STARTUP_REPORT", "false").lower() == "true"  # sidebar table of component build times
+DEBUG_METRICS = os.environ.get("DEBUG_METRICS", "false").lower() == "true"  # sidebar panel with per-stage latency percentiles
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))  # serve the Prometheus export on this port; 0 disables it
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")  # interface the Prometheus export binds to; "0.0.0.0" exposes it on every interface
 
 
-# Setup AWS boto3 session and clients
-aws_session = boto3.Session(region_name=REGION_NAME,    aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"])
-#aws_session = boto3.Session(region_name=REGION_NAME)
-secrets_manager_client = aws_session.client(service_name='secretsmanager')
-bedrock_client = boto3.client("bedrock-runtime", region_name=REGION_NAME_BEDROCK)
+# Clients and Langchain components are built lazily on first use (or by the
+# background warm-up started after the UI renders) and memoized per process.
 
-# Initialize Langchain components
-dynamodb_history = DynamoDBChatMessageHistory(table_name=SESSION_TABLE_NAME, session_id=SESSION_ID, boto3_session=aws_session)
-embeddings = BedrockEmbeddings(client=bedrock_client, region_name=REGION_NAME_BEDROCK,model_id="amazon.titan-embed-text-v2:0" )
-llm = ChatBedrock(model_id=MODEL_ID, region_name=REGION_NAME_BEDROCK, client=bedrock_client)
+@lazy_provider("aws_session")
+def get_aws_session():
+    """
+    boto3 session using the keys in Streamlit secrets, or the default credential chain without them.
+    """
+    import boto3
+    try:
+        return boto3.Session(region_name=REGION_NAME,    aws_access_key_id=st.secrets["AWS_ACCESS_KEY_ID"],aws_secret_access_key=st.secrets["AWS_SECRET_ACCESS_KEY"])
+    except (KeyError, FileNotFoundError):
+        return boto3.Session(region_name=REGION_NAME)
+
+@lazy_provider("secrets_manager_client")
+def get_secrets_manager_client():
+    return get_aws_session().client(service_name='secretsmanager')
+
+@lazy_provider("bedrock_client")
+def get_bedrock_client():
+    import boto3
+    return boto3.client("bedrock-runtime", region_name=REGION_NAME_BEDROCK)
+
+# Secrets are fetched once per secret, cached in memory and refreshed in the background;
+# the periodic refresh starts with the first fetched secret, not at import
+secrets_provider = SecretsProvider(get_secrets_manager_client, ttl_seconds=SECRETS_TTL_SECONDS, source=SECRETS_SOURCE,
+                                   local_path=SECRETS_FILE, background_refresh=SECRETS_SOURCE == "aws")
 
 def fetch_secret_value(secret_name, key):
     """
-    Fetches a secret value from AWS Secrets Manager by secret name and key.
+    Fetches a secret value by secret name and key from the cached secrets provider.
     Returns the value associated with the key or None if the key doesn't exist.
     """
     try:
-        response = secrets_manager_client.get_secret_value(SecretId=secret_name)
-        if 'SecretString' in response:
-            secret_json = json.loads(response['SecretString'])
-            return secret_json.get(key)  # Safely return the value or None
+        return secrets_provider.get(secret_name, key)  # Safely return the value or None
     except Exception as e:
         print(f"Error retrieving the key '{key}' from the secret '{secret_name}': {e}")
         return None
 
-# Retrieve API keys from Secrets Manager
+# Retrieve API keys from Secrets Manager; read on every client build so rotated keys are used
+PINECONE_API_KEY_SECRET = ("edu-app-secrets", "PINECONE_API_KEY")
+COHERE_API_KEY_SECRET = ("policy-app-secrets", "COHERE_API_KEY")
+
+def get_pinecone_api_key():
+    return fetch_secret_value(*PINECONE_API_KEY_SECRET)
 
-PINECONE_API_KEY = fetch_secret_value("edu-app-secrets","PINECONE_API_KEY")
-COHERE_API_KEY = fetch_secret_value("policy-app-secrets","COHERE_API_KEY")
+def get_cohere_api_key():
+    return fetch_secret_value(*COHERE_API_KEY_SECRET)
 #ALB_ARN = fetch_secret_value("policy-app-secrets", "ALB_ARN")
 
+@lazy_provider("tracing")
+def configure_tracing():
+    """
+    Sets the LangSmith tracing environment read by every LangChain run (LLM, retriever and tool).
+    chat_st calls it at startup, before the first turn, rather than waiting for the LLM to be built.
+    """
+    os.environ["LANGCHAIN_TRACING_V2"] =  "true"
+    os.environ["LANGCHAIN_ENDPOINT"] ="https://api.smith.langchain.com"
+    os.environ["LANGCHAIN_API_KEY"] = fetch_secret_value("edu-app-secrets","LANGCHAIN") or ""
+    os.environ["LANGCHAIN_PROJECT"] ="edu-chatbot-test"
+    return os.environ["LANGCHAIN_PROJECT"]
+
+@lazy_provider("langsmith")
+def get_langsmith_client():
+    """
+    Configures LangSmith tracing and returns its client.
+    """
+    from langsmith import Client
+    configure_tracing()
+    return Client()
+
+# Initialize Langchain components
+
+@lazy_provider("dynamodb_client")
+def get_dynamodb_client():
+    return get_aws_session().client("dynamodb")
+
+@lazy_provider("history_writer")
+def get_history_writer():
+    """
+    Background writer that batches chat history puts to DynamoDB.
+    """
+    return WriteBehindQueue(DynamoDBItemSink(get_dynamodb_client()), max_size=HISTORY_QUEUE_SIZE, name="dynamodb-history")
+
+def get_session_history(session_id):
+    """
+    Append-only DynamoDB chat history for one Streamlit session.
+    """
+    from session_history import SessionMessageHistory
+    return SessionMessageHistory(SESSION_MESSAGES_TABLE_NAME, session_id, get_dynamodb_client(), writer=get_history_writer())
+
+@lazy_provider("embeddings")
+def get_embeddings():
+    #from langchain_community.embeddings import BedrockEmbeddings
+    from langchain_aws import BedrockEmbeddings
+    embedding_cache = EmbeddingCache(max_entries=EMBEDDING_CACHE_SIZE, ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS, path=EMBEDDING_CACHE_PATH, max_disk_entries=EMBEDDING_CACHE_DISK_SIZE)
+    return CachedEmbeddings(
+        BedrockEmbeddings(client=get_bedrock_client(), region_name=REGION_NAME_BEDROCK,model_id=EMBEDDING_MODEL_ID ),
+        model_id=EMBEDDING_MODEL_ID,
+        cache=embedding_cache,
+    )
+
+@lazy_provider("llm")
+def get_llm():
+    """
+    Claude on Bedrock; LangSmith tracing is configured first so every call is traced.
+    """
+    from langchain_aws import ChatBedrock
+    get_langsmith_client()
+    return ChatBedrock(model_id=MODEL_ID, region_name=REGION_NAME_BEDROCK, client=get_bedrock_client(), streaming=True)
+
+@lazy_provider("feedback_store")
+def get_feedback_store():
+    """
+    Append-only feedback log, separate from the chat history.
+    """
+    from feedback_store import DynamoDBFeedbackSink, FeedbackStore, SQLiteFeedbackSink
+    if FEEDBACK_BACKEND == "sqlite":
+        return FeedbackStore(SQLiteFeedbackSink(FEEDBACK_SQLITE_PATH))
+    return FeedbackStore(DynamoDBFeedbackSink(get_dynamodb_client(), FEEDBACK_TABLE_NAME))
 
+# Module attributes kept for backwards compatibility; each one builds its component on first access
+_LAZY_ATTRIBUTES = {
+    "aws_session": get_aws_session,
+    "secrets_manager_client": get_secrets_manager_client,
+    "bedrock_client": get_bedrock_client,
+    "dynamodb_history": lambda: get_session_history(SESSION_ID),
+    "embeddings": get_embeddings,
+    "embedding_cache": lambda: get_embeddings().cache,
+    "llm": get_llm,
+    "client": get_langsmith_client,
+    "PINECONE_API_KEY": get_pinecone_api_key,
+    "COHERE_API_KEY": get_cohere_api_key,
+}
 
-os.environ["LANGCHAIN_TRACING_V2"] =  "true"
-os.environ["LANGCHAIN_ENDPOINT"] ="https://api.smith.langchain.com"
-os.environ["LANGCHAIN_API_KEY"] = fetch_secret_value("edu-app-secrets","LANGCHAIN")
-os.environ["LANGCHAIN_PROJECT"] ="edu-chatbot-test"
-client = Client()
\ No newline at end of file
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,52 +1,271 @@
 
+import os
 import pandas as pd
-import pinecone
 
 
-from langchain_pinecone import PineconeVectorStore
 from langchain.agents import Tool
-from langchain.agents import create_json_chat_agent
-from langchain import hub
 from langchain.retrievers import ContextualCompressionRetriever
 from langchain_cohere import CohereRerank
-from aws_secrets_initialization import PINECONE_API_KEY, INDEX_NAME,COHERE_API_KEY, embeddings, llm, dynamodb_history
+from aws_secrets_initialization import INDEX_NAME, PROMPT_HUB_SYNC, VECTOR_STORE_BACKEND, LOCAL_INDEX_DIR, LOCAL_INDEX_KIND, RETRIEVAL_MODE, RETRIEVAL_DEPTH, RETRIEVAL_DEPTH_LIMITS, RERANKER, RERANKER_MODEL_DIR, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL_SECONDS, COHERE_API_KEY_SECRET, get_cohere_api_key, get_embeddings, get_llm, secrets_provider
+from vector_store_registry import vector_store_registry
+from semantic_cache import SemanticAnswerCache
+from local_vector_store import METADATA_FILE, LocalVectorStore
+from lexical_index import BM25Index, HybridRetriever, corpus_path, read_records
+from adaptive_retrieval import DEFAULT_DEPTH_LIMITS, AdaptiveRetriever
+from multi_query import ParallelMultiQueryRetriever, adecompose_question, decompose_question
+from ingest_handbook import read_index_version
+from agent_factory import AgentFactory
+from prompt_registry import load_prompt, sync_prompt_in_background
+from lazy_init import lazy_provider
+from rerank_cache import RerankCache, CachedRerank
+from rerankers import CrossEncoderReranker, LexicalOverlapReranker, load_cross_encoder
 
 
 # Constants and configuration
+RETRIEVAL_K = 100  # dense-only candidates
+HYBRID_DENSE_K = 40  # with BM25 fusion exact-term matches no longer need a deep dense list
+HYBRID_LEXICAL_K = 40
+HYBRID_FUSED_K = 30  # candidates sent to the reranker
+RERANK_MODEL = 'rerank-english-v2.0'
+RERANK_TOP_N = 20
+RERANK_CACHE_SIZE = 1024
+ADAPTIVE_DEPTH_LIMITS = {
+    query_class: {**limits, **RETRIEVAL_DEPTH_LIMITS.get(query_class, {})}
+    for query_class, limits in DEFAULT_DEPTH_LIMITS.items()
+}
 
 def initialize_vector_store(index_name):
     """
-    Initializes and returns a Pinecone Vector Store with specific index and embeddings.
+    Returns the process-wide Vector Store for the index, selected by VECTOR_STORE_BACKEND.
+    "pinecone": the client, index handle and connection pool are built once and shared by all sessions.
+    "local": an in-process index over the memory-mapped snapshot in LOCAL_INDEX_DIR/<index_name>.
     """
-    pc = pinecone.Pinecone(api_key=PINECONE_API_KEY)
-    text_field = "text"
-    index = pc.Index(index_name)
-    vector_store = PineconeVectorStore(index, embeddings, text_field)
-    return vector_store
+    if VECTOR_STORE_BACKEND == "local":
+        path = os.path.join(LOCAL_INDEX_DIR, index_name)
+        def build():
+            store = LocalVectorStore.load(path, get_embeddings(), kind=LOCAL_INDEX_KIND)
+            store.ensure_index()
+            return store
+        return vector_store_registry.get(("local-store", index_name), build)
+    return vector_store_registry.pinecone_vector_store(index_name)
+
+@lazy_provider("vector_store")
+def get_vector_store():
+    return initialize_vector_store(INDEX_NAME)
+
+def lexical_corpus_path():
+    """
+    Chunk corpus the BM25 index is built from. The local backend reads its snapshot;
+    Pinecone uses the corpus written by ingest_handbook (or a snapshot exported with
+    local_vector_store).
+    """
+    path = corpus_path(LOCAL_INDEX_DIR, INDEX_NAME)
+    if VECTOR_STORE_BACKEND == "local" or not os.path.exists(path):
+        path = os.path.join(LOCAL_INDEX_DIR, INDEX_NAME, METADATA_FILE)
+    return path
+
+def lexical_corpus_version():
+    """
+    (path, mtime) of the chunk corpus, or None when there is none.
+    """
+    path = lexical_corpus_path()
+    try:
+        return path, os.path.getmtime(path)
+    except OSError:
+        return None
+
+# Corpus version the current BM25 index was built from
+_lexical_version = None
+
+@lazy_provider("lexical_index")
+def get_lexical_index():
+    """
+    BM25 index over the handbook chunks, or None when no chunk corpus exists here.
+    """
+    global _lexical_version
+    _lexical_version = lexical_corpus_version()
+    if _lexical_version is None:
+        print(f"No chunk corpus for '{INDEX_NAME}' in '{LOCAL_INDEX_DIR}'; retrieval is dense only")
+        return None
+    return BM25Index(read_records(_lexical_version[0]))
+
+def _reset_index_providers(index_name):
+    get_vector_store.reset()
+    get_lexical_index.reset()
+
+vector_store_registry.on_reset(_reset_index_providers)
+
+# Version stamp of the index the handles were built from; ingest_handbook runs in its own process
+_index_version = read_index_version(INDEX_NAME)
+
+def refresh_index_version():
+    """
+    Resets the index handles when ingest_handbook stamped a new version of the index,
+    so the local store maps the new snapshot files instead of the replaced ones.
+    The BM25 index is also rebuilt whenever its chunk corpus file changed, so the
+    lexical side never serves chunks the dense side no longer has.
+    """
+    global _index_version
+    version = read_index_version(INDEX_NAME)
+    if version != _index_version:
+        _index_version = version
+        vector_store_registry.reset(INDEX_NAME)
+    elif _lexical_index_stale():
+        get_lexical_index.reset()
+
+def _lexical_index_stale():
+    provider = get_lexical_index
+    if RETRIEVAL_MODE != "hybrid" or not provider.initialized:
+        return False
+    return lexical_corpus_version() != _lexical_version
+
+# Reranker built once per process; outputs are memoized across queries and sessions
+rerank_cache = RerankCache(max_entries=RERANK_CACHE_SIZE)
+
+def build_reranker(kind, top_n=RERANK_TOP_N):
+    """
+    Returns an uncached reranker: "cohere", "cross-encoder" or "lexical".
+    The cross-encoder falls back to lexical overlap when its model or runtime is missing.
+
+    Returns:
+    tuple: (compressor, model name used in rerank cache keys)
+    """
+    if kind == "cross-encoder":
+        try:
+            load_cross_encoder(RERANKER_MODEL_DIR)
+            return CrossEncoderReranker(model_dir=RERANKER_MODEL_DIR, top_n=top_n), f"cross-encoder:{os.path.basename(os.path.normpath(RERANKER_MODEL_DIR))}"
+        except (ImportError, OSError) as e:
+            print(f"Cross-encoder reranker unavailable ({e}); using lexical overlap")
+            kind = "lexical"
+    if kind == "lexical":
+        return LexicalOverlapReranker(top_n=top_n), "lexical-overlap"
+    return CohereRerank(top_n=top_n, model = RERANK_MODEL, cohere_api_key=get_cohere_api_key()), RERANK_MODEL
+
+@lazy_provider("reranker")
+def get_compressor():
+    base_compressor, model = build_reranker(RERANKER)
+    return CachedRerank(
+        base_compressor=base_compressor,
+        cache=rerank_cache,
+        model=model,
+        top_n=RERANK_TOP_N,
+    )
+
+# A rotated Cohere key rebuilds the reranker on next use; cached rankings stay valid
+secrets_provider.on_change(*COHERE_API_KEY_SECRET, get_compressor.reset)
+
+def get_base_retriever():
+    """
+    Candidate retriever in front of the reranker: BM25 and dense results fused with
+    reciprocal rank fusion in "hybrid" mode, otherwise the vector store alone.
+    """
+    lexical_index = get_lexical_index() if RETRIEVAL_MODE == "hybrid" else None
+    if lexical_index is None:
+        return get_vector_store().as_retriever(search_kwargs={'k': RETRIEVAL_K})
+    return HybridRetriever(
+        vector_store=get_vector_store(),
+        lexical_index=lexical_index,
+        k=HYBRID_DENSE_K,
+        lexical_k=HYBRID_LEXICAL_K,
+        fused_k=HYBRID_FUSED_K,
+    )
+
+def classify_query(query):
+    from direct_pipeline import classify_question
+    return classify_question(query)
+
+def get_retriever():
+    """
+    Retrieve-and-rerank pipeline: adaptive candidate depth per query class, or the
+    fixed-depth candidate retriever followed by the reranker.
+    """
+    refresh_index_version()
+    if RETRIEVAL_DEPTH == "adaptive":
+        return AdaptiveRetriever(
+            vector_store=get_vector_store(),
+            compressor=get_compressor(),
+            lexical_index=get_lexical_index() if RETRIEVAL_MODE == "hybrid" else None,
+            classifier=classify_query,
+            limits=ADAPTIVE_DEPTH_LIMITS,
+        )
+    return ContextualCompressionRetriever(base_compressor=get_compressor(), base_retriever=get_base_retriever())
 
 def retrieve_documents(query):
     """
     Retrieves documents relevant to a query using a vector store and contextual compression.
     """
-    vector_store = initialize_vector_store(INDEX_NAME)
-    retriever = vector_store.as_retriever(search_kwargs={'k': 100})
-    compressor = CohereRerank(top_n=20, model = 'rerank-english-v2.0', cohere_api_key=COHERE_API_KEY)
-    compression_retriever = ContextualCompressionRetriever(base_compressor=compressor, base_retriever=retriever)
-    documents = compression_retriever.invoke(query)
+    documents = get_retriever().invoke(query)
     return documents
 
+async def aretrieve_documents(query):
+    """
+    Async variant of retrieve_documents: the query embedding and the lexical search
+    overlap, and no thread is held while the remote calls are in flight.
+    """
+    return await get_retriever().ainvoke(query)
+
+def get_multi_query_retriever():
+    refresh_index_version()
+    return ParallelMultiQueryRetriever(
+        vector_store=get_vector_store(),
+        embeddings=get_embeddings(),
+        compressor=get_compressor(),
+        decompose=lambda question: decompose_question(question, get_llm()),
+        adecompose=lambda question: adecompose_question(question, get_llm()),
+        lexical_index=get_lexical_index() if RETRIEVAL_MODE == "hybrid" else None,
+    )
+
+def retrieve_documents_multi(query):
+    """
+    Retrieves documents for a multi-part question in one round: sub-queries are searched
+    concurrently and their union is reranked once.
+    """
+    return get_multi_query_retriever().invoke(query)
+
+async def aretrieve_documents_multi(query):
+    """
+    Async variant of retrieve_documents_multi.
+    """
+    return await get_multi_query_retriever().ainvoke(query)
+
+# Semantic answer cache shared by all sessions; emptied whenever the index registry is reset
+# or ingest_handbook stamps a new index version
+@lazy_provider("answer_cache")
+def get_answer_cache():
+    return SemanticAnswerCache(
+        get_embeddings(),
+        threshold=ANSWER_CACHE_THRESHOLD,
+        max_entries=ANSWER_CACHE_SIZE,
+        version_fn=lambda: (vector_store_registry.generation, read_index_version(INDEX_NAME)),
+        ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+    )
+
 # Tool setup for LangChain
 knowledge_base_tool = Tool(
     name='Knowledge Base',
     func=retrieve_documents,
+    coroutine=aretrieve_documents,
     description='Use this tool to answer questions about Federal Student Aid Handbook or FAFSA, providing more information about the topic.'
 )
 
-# Chat agent configuration and initialization
-tools = [knowledge_base_tool]
+# Chat agent configuration; the vendored prompt is loaded and the executor built on first use
+multi_query_tool = Tool(
+    name='Multi-Part Knowledge Base',
+    func=retrieve_documents_multi,
+    coroutine=aretrieve_documents_multi,
+    description='Use this tool instead of Knowledge Base when a question about the Federal Student Aid Handbook or FAFSA has several parts (for example dependency override and SAI for a married graduate student); pass the whole question and every part is looked up at once.'
+)
+
+tools = [knowledge_base_tool, multi_query_tool]
 #chat_prompt = hub.pull("react-chat-json:cd7b7fc8")
-chat_prompt = hub.pull("hwchase17/react-chat-json")
-chat_agent = create_json_chat_agent(llm=llm, tools=tools, prompt=chat_prompt)
+CHAT_PROMPT_NAME = "react-chat-json"
+agent_factory = AgentFactory(llm_loader=get_llm, tools=tools, prompt_loader=lambda: load_prompt(CHAT_PROMPT_NAME))
+if PROMPT_HUB_SYNC:
+    sync_prompt_in_background(CHAT_PROMPT_NAME)
+
+@lazy_provider("agent_executor")
+def get_agent_executor():
+    return agent_factory.get_executor()
 
 '''
 def store_messages_in_dynamodb(conversation_id, messages):
@@ -1,15 +1,22 @@
+import asyncio
 import streamlit as st
 import time
 import pandas as pd
 from uuid import uuid4
-from langchain.agents import AgentExecutor
-from langchain.memory import ConversationBufferMemory
 from langchain_community.callbacks import StreamlitCallbackHandler
 from langchain_community.chat_message_histories import StreamlitChatMessageHistory
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.agents import AgentAction
+from langchain_core.messages import HumanMessage, AIMessage
 
-from aws_secrets_initialization import dynamodb_history
-from chat_retrieval import chat_agent, tools
+from aws_secrets_initialization import configure_tracing, get_session_history, get_feedback_store, get_llm, PIPELINE_MODE, ASYNC_PIPELINE, SHOW_STARTUP_REPORT, MEMORY_MAX_TURNS, MEMORY_MAX_TOKENS, DEBUG_METRICS, METRICS_HOST, METRICS_PORT
+from chat_retrieval import agent_factory, get_answer_cache, knowledge_base_tool, tools
+from semantic_cache import is_follow_up
+from direct_pipeline import arun_direct_pipeline, route_question, run_direct_pipeline
+from streaming import StreamingAnswerHandler
+from lazy_init import get_provider, startup_report, warm_up_in_background
+from stage_metrics import StageTimingCallbackHandler, stage_metrics, start_metrics_server, timed
+from adaptive_retrieval import depth_stats
+from windowed_memory import WindowedSummaryMemory
 
 # Initialize session state
 def initialize_session_state():
@@ -32,21 +39,16 @@ def handle_feedback():
     feedback_value = st.session_state["feedback_value"]
     feedback_text = st.session_state["feedback_text"]
     """
-    Process and store user feedback in DynamoDB.
+    Process and store user feedback in the feedback store, linked to the answered message.
     """
     try:
-        timestamp = int(time.time())
-        dynamodb_history.add_message(SystemMessage(
-            id=st.session_state['session_id'],
+        get_feedback_store().record(
+            session_id=st.session_state["session_id"],
+            message_key=st.session_state.get("last_message_key"),
+            score=feedback_value,
+            feedback_text=feedback_text,
             user_id='test_user',
-            content='feedback',
-            st_session_id=st.session_state["session_id"],
-            response_metadata={
-                'timestamp': timestamp,
-                'feedback_text': feedback_text,
-                'score': feedback_value,
-            }
-        ))
+        )
         st.success("Thank you for your feedback!")
         
         #st.session_state.feedback_submitted = True
@@ -94,43 +96,158 @@ def render_intermediate_steps(index, message, steps):
             st.write(step[0].log)
             st.write(step[1])
 
+# Build the per-turn callbacks
+def turn_callbacks(thoughts_container, answer_placeholder):
+    """
+    Callbacks drawing the intermediate steps, timing the stages and streaming the answer.
+    They all run inline: on async runs LangChain otherwise calls sync handlers from
+    executor threads, which cannot write to Streamlit elements.
+
+    Returns:
+    tuple: (callbacks, the StreamingAnswerHandler among them or None)
+    """
+    callbacks = [StreamlitCallbackHandler(thoughts_container or st.container(), expand_new_thoughts=False), StageTimingCallbackHandler()]
+    streaming = None
+    if answer_placeholder is not None:
+        streaming = StreamingAnswerHandler(answer_placeholder, parse_json=True)
+        callbacks.append(streaming)
+    for handler in callbacks:
+        handler.run_inline = True
+    return callbacks, streaming
+
 # Execute chat agent
-def execute_chat_agent(user_input, memory):
+def execute_chat_agent(user_input, memory, thoughts_container=None, answer_placeholder=None):
     """
     Execute the chat agent with the given input and memory.
     
     Args:
     user_input (str): User's input message
-    memory (ConversationBufferMemory): Chat memory object
+    memory (WindowedSummaryMemory): Chat memory object
+    thoughts_container (DeltaGenerator): Where intermediate steps are drawn (defaults to a new container)
+    answer_placeholder (DeltaGenerator): When given, the final answer is streamed into it token by token
 
     Returns:
     dict: Chat agent's response
     """
-    agent_executor = AgentExecutor(
-        agent=chat_agent,
-        tools=tools,
-        memory=memory,
-        return_intermediate_steps=True,
-        handle_parsing_errors=True
-    )
-    st_cb = StreamlitCallbackHandler(st.container(), expand_new_thoughts=False)
+    callbacks, streaming = turn_callbacks(thoughts_container, answer_placeholder)
     try:
-        return agent_executor.invoke({"input": user_input}, {"callbacks": [st_cb]})
+        return answer_turn(user_input, memory, PIPELINE_MODE, callbacks, streaming, use_async=ASYNC_PIPELINE)
     except Exception as e:
         st.error(f"An error occurred while executing the chat agent: {e}")
         return None
 
+# Answer one chat turn
+def answer_turn(user_input, memory, mode, callbacks, streaming=None, use_cache=True, use_async=False):
+    """
+    One chat turn without the Streamlit widgets: the semantic cache for standalone
+    questions, then the agent or the direct pipeline as routed. pipeline_benchmark
+    runs its turns through here as well.
+    
+    Args:
+    user_input (str): User's input message
+    memory (WindowedSummaryMemory): Chat memory object
+    mode (str): Pipeline mode, "agent", "direct" or "auto"
+    callbacks (list): Callback handlers for the run
+    streaming (StreamingAnswerHandler): Handler among the callbacks, switched to plain text for the direct pipeline
+    use_cache (bool): False skips the semantic cache entirely
+    use_async (bool): Run the agent or pipeline with ainvoke under asyncio.run
+
+    Returns:
+    dict: Chat agent's response
+    """
+    cacheable = use_cache and is_cacheable(user_input, memory)
+    response = answer_from_cache(user_input, memory) if cacheable else None
+    if response is not None:
+        return response
+
+    chat_history = memory.load_memory_variables({})["chat_history"]
+    if route_question(user_input, mode, has_history=bool(chat_history)) == "direct":
+        if streaming is not None:
+            streaming.parse_json = False
+        if use_async:
+            response = asyncio.run(arun_direct_pipeline(user_input, chat_history, callbacks=callbacks))
+        else:
+            response = run_direct_pipeline(user_input, chat_history, callbacks=callbacks)
+        memory.save_context({"input": user_input}, {"output": response["output"]})
+    elif use_async:
+        response = asyncio.run(agent_factory.ainvoke(user_input, memory, callbacks))
+    else:
+        response = agent_factory.invoke(user_input, memory, callbacks)
+    if cacheable:
+        cache_chat_response(user_input, response)
+    return response
+
+# Decide whether a question may use the semantic cache
+def is_cacheable(user_input, memory):
+    """
+    The cache is keyed on the question alone, so follow-ups that depend on the
+    conversation are neither looked up nor stored.
+    
+    Args:
+    user_input (str): User's input message
+    memory (WindowedSummaryMemory): Chat memory object, before this turn is saved
+
+    Returns:
+    bool: True when the question can be answered without the conversation
+    """
+    return not is_follow_up(user_input, has_history=bool(memory.chat_memory.messages))
+
+# Answer from the semantic cache
+def answer_from_cache(user_input, memory):
+    """
+    Return a stored answer for a near-duplicate question without running the agent.
+    
+    Args:
+    user_input (str): User's input message
+    memory (WindowedSummaryMemory): Chat memory object
+
+    Returns:
+    dict: Response shaped like the chat agent's, or None on a cache miss
+    """
+    try:
+        cached = get_answer_cache().lookup(user_input)
+    except Exception as e:
+        print(f"Error looking up the answer cache: {e}")
+        return None
+    if cached is None:
+        return None
+    memory.save_context({"input": user_input}, {"output": cached["output"]})
+    step = AgentAction(tool=knowledge_base_tool.name, tool_input=cached["question"], log="Answered from the semantic cache.")
+    return {"input": user_input, "output": cached["output"], "intermediate_steps": [(step, cached["sources"])]}
+
+# Store an agent answer in the semantic cache
+def cache_chat_response(user_input, response):
+    """
+    Store the answer when it was grounded in a knowledge base lookup.
+    
+    Args:
+    user_input (str): User's input message
+    response (dict): Chat agent's response
+    """
+    steps = response.get("intermediate_steps") or []
+    if not steps or steps[0][0].tool not in {tool.name for tool in tools} or not isinstance(steps[0][1], list):
+        return
+    try:
+        get_answer_cache().store(user_input, response["output"], steps[0][1])
+    except Exception as e:
+        print(f"Error storing the answer in the cache: {e}")
+
 # Display chat response
-def display_chat_response(response, message_history):
+def display_chat_response(response, message_history, assistant_message=None, answer_placeholder=None):
     """
     Display the chat agent's response and sources.
     
     Args:
     response (dict): Chat agent's response
     message_history (StreamlitChatMessageHistory): Chat message history
+    assistant_message (DeltaGenerator): Existing assistant bubble to render into
+    answer_placeholder (DeltaGenerator): Placeholder holding the streamed answer, replaced by the final text
     """
-    with st.chat_message("assistant"):
-        st.write(response["output"])
+    with assistant_message or st.chat_message("assistant"):
+        if answer_placeholder is not None:
+            answer_placeholder.write(response["output"])
+        else:
+            st.write(response["output"])
         try:
             sources = response["intermediate_steps"][0][1]
             df = format_search_results_as_dataframe(sources)
@@ -151,15 +268,16 @@ def run_chat_interface():
     st.header("Education Federal Student Aid Assistant App")
 
     msgs = StreamlitChatMessageHistory()
-    memory = ConversationBufferMemory(
+    memory = WindowedSummaryMemory(
         chat_memory=msgs,
-        return_messages=True,
-        memory_key="chat_history",
-        output_key="output"
+        state=st.session_state.setdefault("memory_state", {}),
+        llm_loader=get_llm,
+        max_turns=MEMORY_MAX_TURNS,
+        max_tokens=MEMORY_MAX_TOKENS
     )
 
     if len(msgs.messages) == 0 or st.sidebar.button("Reset chat history"):
-        msgs.clear()
+        memory.clear()
         st.session_state['steps'] = {}
 
     # Display chat history
@@ -172,13 +290,21 @@ def run_chat_interface():
     # Handle user input
     if prompt := st.chat_input(placeholder="What is the Education Federal Student Aid?"):
         st.chat_message("user").write(prompt)
-        dynamodb_history.add_user_message(HumanMessage(id=st.session_state['session_id'], content=prompt))
+        get_session_history(st.session_state["session_id"]).add_user_message(HumanMessage(id=st.session_state['session_id'], content=prompt))
         
-        response = execute_chat_agent(prompt, memory)
+        assistant_message = st.chat_message("assistant")
+        thoughts_container = assistant_message.container()
+        answer_placeholder = assistant_message.empty()
+        with stage_metrics.turn() as timings:
+            response = execute_chat_agent(prompt, memory, thoughts_container, answer_placeholder)
+            
+            if response:
+                with timed("render"):
+                    display_chat_response(response, msgs, assistant_message, answer_placeholder)
+        st.session_state["last_turn_timings"] = timings
         
         if response:
-            display_chat_response(response, msgs)
-            dynamodb_history.add_ai_message(AIMessage(id=st.session_state['session_id'], content=response["output"]))
+            st.session_state["last_message_key"] = get_session_history(st.session_state["session_id"]).append(AIMessage(id=st.session_state['session_id'], content=response["output"]))
             st.session_state["feedback_form"] = True
             
             # Display feedback form
@@ -209,15 +335,59 @@ def run_chat_interface():
 
     # Handle feedback submission
 
+# Render the startup report
+def render_startup_report():
+    """
+    Show what each lazily initialized component cost to build.
+    """
+    with st.sidebar.expander("Startup report"):
+        st.dataframe(pd.DataFrame(startup_report()), hide_index=True)
+
+# Render the latency metrics panel
+def render_metrics_sidebar():
+    """
+    Show per-stage latency percentiles, the last turn's timings and the history writer queue.
+    """
+    with st.sidebar.expander("Latency metrics"):
+        rows = [
+            {key: (round(value * 1000, 1) if isinstance(value, float) else value) for key, value in row.items()}
+            for row in stage_metrics.snapshot()
+        ]
+        st.caption("All stages (ms)")
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+        last_turn = st.session_state.get("last_turn_timings")
+        if last_turn:
+            st.caption("Last turn (ms)")
+            st.dataframe(pd.DataFrame([
+                {"stage": stage, "calls": len(values), "total": round(sum(values) * 1000, 1)}
+                for stage, values in sorted(last_turn.items())
+            ]), hide_index=True)
+        st.caption("Adaptive retrieval depth")
+        st.json(depth_stats.stats())
+        if get_provider("history_writer").initialized:
+            st.caption("History writer")
+            st.json(get_provider("history_writer")().metrics())
+        st.code(stage_metrics.render_prometheus(), language="text")
+
 # Main function
 def main():
     """
     Main function to run the Streamlit app.
     """
     try:
+        # Tracing is configured before the first turn so retriever and tool runs are traced too
+        configure_tracing()
         run_chat_interface()
     except Exception as e:
         st.error(f"An error occurred: {e}")
+    # Build AWS, Bedrock, DynamoDB, LangSmith and Pinecone clients once the UI is drawn
+    warm_up_in_background()
+    if SHOW_STARTUP_REPORT:
+        render_startup_report()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT, METRICS_HOST)
+    if DEBUG_METRICS:
+        render_metrics_sidebar()
 
 if __name__ == "__main__":
     initialize_session_state()
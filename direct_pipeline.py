@@ -0,0 +1,100 @@
+import re
+
+from langchain_core.agents import AgentAction
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from aws_secrets_initialization import get_llm
+from chat_retrieval import aretrieve_documents, knowledge_base_tool, retrieve_documents
+from semantic_cache import is_follow_up
+
+
+# Rules used to route questions between the direct pipeline and the agent
+CHIT_CHAT_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening)|bye|goodbye|ok(ay)?|cool|great|who are you)\b",
+    re.IGNORECASE,
+)
+MULTI_HOP_PATTERN = re.compile(
+    r"\b(compare|comparison|difference between|differences|versus|vs\.?|as well as|and also|both|step by step)\b",
+    re.IGNORECASE,
+)
+
+DIRECT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are an assistant that answers questions about the Federal Student Aid Handbook and the FAFSA. "
+     "Answer using only the handbook excerpts below. If they do not contain the answer, say so.\n\n"
+     "Handbook excerpts:\n{context}"),
+    MessagesPlaceholder(variable_name="chat_history", optional=True),
+    ("human", "{input}"),
+])
+
+
+def classify_question(question, has_history=False):
+    """
+    Cheap rule-based classifier for incoming questions.
+
+    Returns:
+    str: "chit_chat", "follow_up", "multi_hop" or "simple"
+    """
+    words = question.split()
+    if CHIT_CHAT_PATTERN.match(question) and len(words) <= 6:
+        return "chit_chat"
+    if is_follow_up(question, has_history):
+        return "follow_up"
+    if question.count("?") > 1 or MULTI_HOP_PATTERN.search(question):
+        return "multi_hop"
+    return "simple"
+
+
+def route_question(question, mode, has_history=False):
+    """
+    Picks the pipeline for a question: "direct" or "agent".
+    In "auto" mode only simple, self-contained questions take the direct path.
+    """
+    if mode in ("direct", "agent"):
+        return mode
+    return "direct" if classify_question(question, has_history) == "simple" else "agent"
+
+
+def format_context(documents):
+    """
+    Renders reranked documents as numbered excerpts for the prompt.
+    """
+    excerpts = []
+    for number, document in enumerate(documents, start=1):
+        metadata = document.metadata
+        excerpts.append(f"[{number}] {metadata.get('title', '')}, page {metadata.get('page', '')}:\n{document.page_content}")
+    return "\n\n".join(excerpts)
+
+
+def run_direct_pipeline(question, chat_history=None, callbacks=None):
+    """
+    Retrieves first, then answers with a single LLM call over the reranked context.
+
+    Returns:
+    dict: Response shaped like AgentExecutor's, so the source table still renders
+    """
+    documents = retrieve_documents(question)
+    chain = DIRECT_PROMPT | get_llm() | StrOutputParser()
+    output = chain.invoke(
+        {"input": question, "chat_history": chat_history or [], "context": format_context(documents)},
+        {"callbacks": callbacks or []},
+    )
+    step = AgentAction(tool=knowledge_base_tool.name, tool_input=question, log="Retrieved before answering (direct pipeline).")
+    return {"input": question, "output": output, "intermediate_steps": [(step, documents)]}
+
+async def arun_direct_pipeline(question, chat_history=None, callbacks=None):
+    """
+    Async variant of run_direct_pipeline.
+
+    Returns:
+    dict: Response shaped like AgentExecutor's, so the source table still renders
+    """
+    documents = await aretrieve_documents(question)
+    chain = DIRECT_PROMPT | get_llm() | StrOutputParser()
+    output = await chain.ainvoke(
+        {"input": question, "chat_history": chat_history or [], "context": format_context(documents)},
+        {"callbacks": callbacks or []},
+    )
+    step = AgentAction(tool=knowledge_base_tool.name, tool_input=question, log="Retrieved before answering (direct pipeline).")
+    return {"input": question, "output": output, "intermediate_steps": [(step, documents)]}
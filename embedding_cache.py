@@ -0,0 +1,221 @@
+import array
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+from stage_metrics import timed
+
+
+def normalize_query(text):
+    """
+    Normalizes query text so trivially different spellings share one cache entry.
+    """
+    return " ".join(text.casefold().split())
+
+
+def embedding_cache_key(text, model_id):
+    """
+    Returns the cache key for a text embedded with a given model.
+    """
+    return hashlib.sha256(f"{model_id}\x00{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU + TTL cache of embedding vectors with an optional SQLite tier.
+
+    The in-memory tier is per process. When `path` is set, vectors are also
+    stored as float32 blobs in a SQLite database (WAL mode), so they survive
+    restarts and are shared by every Streamlit worker process on the host.
+    The SQLite tier is trimmed every `trim_every` writes: expired rows are
+    deleted and the oldest rows beyond `max_disk_entries` are dropped.
+    """
+
+    def __init__(self, max_entries=4096, ttl_seconds=7 * 24 * 3600, path=None, max_disk_entries=100000, trim_every=256):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.trim_every = trim_every
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model_id TEXT, vector BLOB, created_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_created_at ON embeddings (created_at)")
+            self._db.commit()
+            self._trim_disk()
+
+    def _expired(self, created_at):
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key):
+        """
+        Returns the cached vector for `key`, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[1]):
+                del self._entries[key]
+                entry = None
+            if entry is None and self._db is not None:
+                entry = self._get_from_disk(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[0])
+
+    def put(self, key, vector, model_id=""):
+        """
+        Stores a vector in memory and, when configured, on disk.
+        """
+        entry = (array.array("f", vector), time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, model_id, vector, created_at) VALUES (?, ?, ?, ?)",
+                        (key, model_id, entry[0].tobytes(), entry[1]),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Error writing embedding cache entry: {e}")
+                self._writes += 1
+                if self._writes % self.trim_every == 0:
+                    self._trim_disk()
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_from_disk(self, key):
+        try:
+            row = self._db.execute("SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading embedding cache entry: {e}")
+            return None
+        if row is None:
+            return None
+        if self._expired(row[1]):
+            try:
+                self._db.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Error deleting expired embedding cache entry: {e}")
+            return None
+        vector = array.array("f")
+        vector.frombytes(row[0])
+        return (vector, row[1])
+
+    def _trim_disk(self):
+        """
+        Deletes expired rows and keeps only the newest `max_disk_entries` rows.
+        """
+        try:
+            if self.ttl_seconds is not None:
+                self._db.execute("DELETE FROM embeddings WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,),
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Error trimming the embedding cache: {e}")
+
+    def disk_size(self):
+        """
+        Returns the number of rows in the SQLite tier (0 without one).
+        """
+        with self._lock:
+            if self._db is None:
+                return 0
+            return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self):
+        """
+        Empties both tiers.
+        """
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the in-memory size.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that answers repeated queries from an EmbeddingCache
+    instead of paying another Bedrock round trip.
+    """
+
+    def __init__(self, embeddings, model_id, cache):
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.cache = cache
+
+    def embed_query(self, text):
+        key = embedding_cache_key(text, self.model_id)
+        vector = self.cache.get(key)
+        if vector is None:
+            with timed("embedding"):
+                vector = self.embeddings.embed_query(text)
+            self.cache.put(key, vector, self.model_id)
+        return vector
+
+    def embed_documents(self, texts):
+        keys = [embedding_cache_key(text, self.model_id) for text in texts]
+        vectors = [self.cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            with timed("embedding"):
+                computed = self.embeddings.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                self.cache.put(keys[i], vector, self.model_id)
+                vectors[i] = vector
+        return vectors
+
+    async def aembed_query(self, text):
+        key = embedding_cache_key(text, self.model_id)
+        vector = self.cache.get(key)
+        if vector is None:
+            with timed("embedding"):
+                vector = await self.embeddings.aembed_query(text)
+            self.cache.put(key, vector, self.model_id)
+        return vector
+
+    async def aembed_documents(self, texts):
+        keys = [embedding_cache_key(text, self.model_id) for text in texts]
+        vectors = [self.cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            with timed("embedding"):
+                computed = await self.embeddings.aembed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, computed):
+                self.cache.put(keys[i], vector, self.model_id)
+                vectors[i] = vector
+        return vectors
@@ -0,0 +1,149 @@
+import argparse
+import sqlite3
+import threading
+import time
+from uuid import uuid4
+
+from history_writer import WriteBehindQueue, batch_write
+
+
+PARTITION_KEY = "SessionId"
+SORT_KEY = "FeedbackKey"
+FIELDS = ["session_id", "feedback_id", "message_key", "user_id", "timestamp", "score", "feedback_text"]
+
+
+class DynamoDBFeedbackSink:
+    """
+    Writes feedback records as append-only items of their own DynamoDB table,
+    keyed by (SessionId, FeedbackKey).
+    """
+
+    def __init__(self, client, table_name):
+        self.client = client
+        self.table_name = table_name
+
+    def __call__(self, records):
+        from session_history import serialize_item
+        batch_write(self.client, self.table_name, [
+            {"PutRequest": {"Item": serialize_item({PARTITION_KEY: r["session_id"], SORT_KEY: r["feedback_id"], **r})}}
+            for r in records
+        ])
+
+    def export(self):
+        from session_history import deserialize_item
+        records = []
+        for page in self.client.get_paginator("scan").paginate(TableName=self.table_name):
+            for item in page.get("Items", []):
+                item = deserialize_item(item)
+                records.append({field: item.get(field) for field in FIELDS})
+        return records
+
+    def create_table(self):
+        """
+        Creates the on-demand feedback table.
+        """
+        self.client.create_table(
+            TableName=self.table_name,
+            AttributeDefinitions=[
+                {"AttributeName": PARTITION_KEY, "AttributeType": "S"},
+                {"AttributeName": SORT_KEY, "AttributeType": "S"},
+            ],
+            KeySchema=[
+                {"AttributeName": PARTITION_KEY, "KeyType": "HASH"},
+                {"AttributeName": SORT_KEY, "KeyType": "RANGE"},
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        self.client.get_waiter("table_exists").wait(TableName=self.table_name)
+
+
+class SQLiteFeedbackSink:
+    """
+    Local stand-in for the feedback table: an append-only SQLite table.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS feedback (session_id TEXT, feedback_id TEXT PRIMARY KEY, message_key TEXT, "
+            "user_id TEXT, timestamp INTEGER, score INTEGER, feedback_text TEXT)"
+        )
+        self._db.commit()
+
+    def __call__(self, records):
+        with self._lock:
+            self._db.executemany(
+                f"INSERT OR IGNORE INTO feedback ({', '.join(FIELDS)}) VALUES ({', '.join('?' for _ in FIELDS)})",
+                [tuple(r.get(field) for field in FIELDS) for r in records],
+            )
+            self._db.commit()
+
+    def export(self):
+        with self._lock:
+            rows = self._db.execute(f"SELECT {', '.join(FIELDS)} FROM feedback ORDER BY timestamp").fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+
+class FeedbackStore:
+    """
+    Buffered, append-only feedback log. Records are linked to the session and
+    the answered message and flushed to the sink in batches by a background writer.
+    """
+
+    def __init__(self, sink, max_size=1000, flush_interval=1.0):
+        self.sink = sink
+        self.writer = WriteBehindQueue(sink, max_size=max_size, flush_interval=flush_interval, name="feedback")
+
+    def record(self, session_id, message_key, score, feedback_text, user_id="test_user"):
+        """
+        Enqueues one feedback record and returns its id.
+        """
+        feedback_id = f"{time.time_ns():020d}#{uuid4().hex[:8]}"
+        self.writer.put({
+            "session_id": session_id,
+            "feedback_id": feedback_id,
+            "message_key": message_key,
+            "user_id": user_id,
+            "timestamp": int(time.time()),
+            "score": int(score),
+            "feedback_text": feedback_text,
+        })
+        return feedback_id
+
+    def export(self, path=None, file_format="csv"):
+        """
+        Flushes pending records and exports every record for analytics.
+
+        Args:
+        path (str): Output file; without it the DataFrame is only returned
+        file_format (str): "csv", "parquet" or "jsonl"
+
+        Returns:
+        pd.DataFrame: All feedback records
+        """
+        import pandas as pd
+        self.writer.flush()
+        df = pd.DataFrame(self.sink.export(), columns=FIELDS)
+        if path:
+            if file_format == "parquet":
+                df.to_parquet(path, index=False)
+            elif file_format == "jsonl":
+                df.to_json(path, orient="records", lines=True)
+            else:
+                df.to_csv(path, index=False)
+        return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export chatbot feedback for analytics.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "parquet", "jsonl"], default="csv")
+    args = parser.parse_args()
+    from aws_secrets_initialization import get_feedback_store
+    df = get_feedback_store().export(args.path, args.format)
+    print(f"Exported {len(df)} feedback records to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import atexit
+import json
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from stage_metrics import timed
+
+
+# DynamoDB limits
+BATCH_WRITE_LIMIT = 25
+UNPROCESSED_ATTEMPTS = 8  # BatchWriteItem calls per chunk before unprocessed items are reported as a failure
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue drained by a background thread.
+
+    Items are handed to `flush_batch(items)` in batches of up to `batch_size`;
+    a failing batch is retried with exponential backoff and jitter. When the
+    queue is full new items are dropped and counted, so a slow backend never
+    blocks the request thread. Pending items are flushed at interpreter exit.
+    """
+
+    def __init__(self, flush_batch, max_size=1000, batch_size=BATCH_WRITE_LIMIT, flush_interval=0.2, max_retries=5, name="write-behind"):
+        self.flush_batch = flush_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._counters = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "retries": 0, "batches": 0}
+        self._lag_last = 0.0
+        self._lag_max = 0.0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, item):
+        """
+        Enqueues an item without blocking. Returns False when it was dropped
+        (queue full or already closed).
+        """
+        if self._closed:
+            with self._lock:
+                self._counters["dropped"] += 1
+            return False
+        try:
+            self._queue.put_nowait((time.time(), item))
+        except queue.Full:
+            with self._lock:
+                self._counters["dropped"] += 1
+            return False
+        with self._lock:
+            self._counters["enqueued"] += 1
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch):
+        items = [item for _, item in batch]
+        for attempt in range(self.max_retries):
+            try:
+                with timed(f"{self.name.replace('-', '_')}_write"):
+                    self.flush_batch(items)
+                break
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    print(f"Error writing {len(items)} items in '{self.name}' after {self.max_retries} attempts: {e}")
+                    with self._lock:
+                        self._counters["failed"] += len(items)
+                    return
+                with self._lock:
+                    self._counters["retries"] += 1
+                time.sleep(min(0.1 * (2 ** attempt), 5.0) + random.random() * 0.1)
+        now = time.time()
+        with self._lock:
+            self._counters["written"] += len(items)
+            self._counters["batches"] += 1
+            self._lag_last = now - batch[0][0]
+            self._lag_max = max(self._lag_max, self._lag_last)
+
+    def flush(self):
+        """
+        Blocks until every enqueued item has been written (or has failed).
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Stops accepting items, flushes the queue and stops the worker.
+        """
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._thread.join(timeout=self.flush_interval * 5)
+
+    def metrics(self):
+        """
+        Returns queue depth, counters and write lag (seconds from enqueue to write).
+        """
+        with self._lock:
+            return dict(self._counters, depth=self._queue.qsize(), lag_seconds_last=self._lag_last, lag_seconds_max=self._lag_max)
+
+
+def to_dynamodb(value):
+    """
+    Converts floats to Decimal, as boto3's DynamoDB serializer requires.
+    """
+    return json.loads(json.dumps(value), parse_float=Decimal)
+
+
+def batch_write(client, table_name, requests, max_attempts=UNPROCESSED_ATTEMPTS):
+    """
+    Sends write requests with BatchWriteItem in chunks of 25, retrying
+    unprocessed items with exponential backoff. Raises RuntimeError when items
+    are still unprocessed after `max_attempts` calls, so the caller's own
+    retry and failure accounting applies.
+    """
+    for i in range(0, len(requests), BATCH_WRITE_LIMIT):
+        request = {table_name: requests[i:i + BATCH_WRITE_LIMIT]}
+        for attempt in range(max_attempts):
+            response = client.batch_write_item(RequestItems=request)
+            request = response.get("UnprocessedItems") or None
+            if not request:
+                break
+            if attempt < max_attempts - 1:
+                time.sleep(min(0.05 * (2 ** attempt), 2.0) + random.random() * 0.05)
+        if request:
+            unprocessed = sum(len(items) for items in request.values())
+            raise RuntimeError(f"{unprocessed} items unprocessed by BatchWriteItem on '{table_name}' after {max_attempts} attempts")
+
+
+class DynamoDBItemSink:
+    """
+    WriteBehindQueue sink for (table name, serialized item) records: every
+    record is an independent put, written with BatchWriteItem.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def __call__(self, records):
+        tables = OrderedDict()
+        for table_name, item in records:
+            tables.setdefault(table_name, []).append({"PutRequest": {"Item": item}})
+        for table_name, requests in tables.items():
+            batch_write(self.client, table_name, requests)
@@ -0,0 +1,251 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+
+from aws_secrets_initialization import INDEX_NAME, LOCAL_INDEX_DIR, LOCAL_INDEX_KIND, REGION_NAME, get_embeddings
+from lexical_index import corpus_path, read_records, write_records
+from local_vector_store import METADATA_FILE, TEXT_FIELD, VECTORS_FILE, write_snapshot
+from vector_store_registry import vector_store_registry
+
+
+# Constants and configuration
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 200
+EMBED_BATCH_SIZE = 32
+EMBED_WORKERS = 8
+UPSERT_BATCH_SIZE = 100
+MAX_RETRIES = 5
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+
+def index_version_path(index_name):
+    """
+    Returns the file whose contents change every time an index is rebuilt.
+    """
+    return os.path.join(LOCAL_INDEX_DIR, f"{index_name}.version")
+
+
+def read_index_version(index_name):
+    """
+    Returns the current version stamp of an index, or None if it was never ingested here.
+    """
+    try:
+        with open(index_version_path(index_name), encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _read_pages(data, extension):
+    if extension == ".pdf":
+        from pypdf import PdfReader
+        reader = PdfReader(io.BytesIO(data))
+        title = (reader.metadata.title if reader.metadata else None) or None
+        return title, ((number, page.extract_text() or "") for number, page in enumerate(reader.pages, start=1))
+    return None, iter([(1, data.decode("utf-8", errors="replace"))])
+
+
+def iter_documents(source):
+    """
+    Streams (source uri, title, pages) for every supported file under a local
+    directory or an s3://bucket/prefix. Pages are yielded lazily as (page number, text).
+    Local files are named by their path relative to `source`, so chunk ids and
+    hashes survive moving the directory.
+    """
+    if source.startswith("s3://"):
+        bucket, _, prefix = source[len("s3://"):].partition("/")
+        s3 = boto3.client("s3", region_name=REGION_NAME)
+        for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+            for item in page.get("Contents", []):
+                key = item["Key"]
+                extension = os.path.splitext(key)[1].lower()
+                if extension not in SUPPORTED_EXTENSIONS:
+                    continue
+                data = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+                title, pages = _read_pages(data, extension)
+                yield f"s3://{bucket}/{key}", title or os.path.splitext(os.path.basename(key))[0], pages
+        return
+    for root, _, files in os.walk(source):
+        for name in sorted(files):
+            extension = os.path.splitext(name)[1].lower()
+            if extension not in SUPPORTED_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                title, pages = _read_pages(f.read(), extension)
+            yield os.path.relpath(path, source).replace(os.sep, "/"), title or os.path.splitext(name)[0], pages
+
+
+def chunk_document(source, title, pages, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Splits each page into overlapping chunks carrying the metadata
+    format_search_results_as_dataframe expects: source, title and page.
+    """
+    source_id = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+    for page_number, text in pages:
+        text = " ".join(text.split())
+        start, position = 0, 0
+        while start < len(text):
+            chunk = text[start:start + chunk_size]
+            metadata = {"source": source, "title": title, "page": page_number}
+            content_hash = hashlib.sha256((chunk + json.dumps(metadata, sort_keys=True)).encode("utf-8")).hexdigest()
+            yield {"id": f"{source_id}-{page_number}-{position}", "text": chunk, "metadata": metadata, "hash": content_hash}
+            if start + chunk_size >= len(text):
+                break
+            start += chunk_size - overlap
+            position += 1
+
+
+def embed_with_backoff(texts, retries=MAX_RETRIES):
+    """
+    Embeds a batch of texts, retrying throttled or failed calls with exponential backoff and jitter.
+    """
+    for attempt in range(retries):
+        try:
+            return get_embeddings().embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt == retries - 1:
+                raise
+            delay = (2 ** attempt) + random.random()
+            print(f"Embedding batch failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def embed_chunks(chunks, batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS):
+    """
+    Embeds chunks in batches across a thread pool. Returns vectors in chunk order.
+    """
+    batches = [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda batch: embed_with_backoff([c["text"] for c in batch]), batches)
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def upsert_pinecone(index_name, chunks, vectors, deleted_ids, batch_size=UPSERT_BATCH_SIZE):
+    """
+    Bulk-upserts changed chunks into Pinecone and removes chunks that no longer exist.
+    """
+    index = vector_store_registry.pinecone_index(index_name)
+    items = [
+        (chunk["id"], vector, {**chunk["metadata"], TEXT_FIELD: chunk["text"]})
+        for chunk, vector in zip(chunks, vectors)
+    ]
+    for i in range(0, len(items), batch_size):
+        index.upsert(vectors=items[i:i + batch_size])
+    for i in range(0, len(deleted_ids), 1000):
+        index.delete(ids=deleted_ids[i:i + 1000])
+
+
+def upsert_local(index_name, chunks, vectors, deleted_ids):
+    """
+    Applies changed and deleted chunks to the local snapshot used by LocalVectorStore.
+    """
+    import numpy as np
+    path = os.path.join(LOCAL_INDEX_DIR, index_name)
+    rows = {}
+    if os.path.exists(os.path.join(path, METADATA_FILE)):
+        existing = np.load(os.path.join(path, VECTORS_FILE))
+        with open(os.path.join(path, METADATA_FILE), encoding="utf-8") as f:
+            for record, vector in zip((json.loads(line) for line in f if line.strip()), existing):
+                rows[record["id"]] = (record, vector)
+    for chunk_id in deleted_ids:
+        rows.pop(chunk_id, None)
+    for chunk, vector in zip(chunks, vectors):
+        rows[chunk["id"]] = ({"id": chunk["id"], "text": chunk["text"], "metadata": chunk["metadata"]}, vector)
+    write_snapshot(path, [vector for _, vector in rows.values()], [record for record, _ in rows.values()], kind=LOCAL_INDEX_KIND)
+
+
+def update_corpus(index_name, chunks, deleted_ids):
+    """
+    Applies changed and deleted chunks to the text corpus the BM25 index is built from
+    (the Pinecone target keeps no texts locally otherwise).
+    """
+    path = corpus_path(LOCAL_INDEX_DIR, index_name)
+    records = {record["id"]: record for record in read_records(path)} if os.path.exists(path) else {}
+    for chunk_id in deleted_ids:
+        records.pop(chunk_id, None)
+    for chunk in chunks:
+        records[chunk["id"]] = {"id": chunk["id"], "text": chunk["text"], "metadata": chunk["metadata"]}
+    write_records(path, records.values())
+
+
+def ingest(source, index_name=INDEX_NAME, target="pinecone", full=False, batch_size=EMBED_BATCH_SIZE, workers=EMBED_WORKERS):
+    """
+    Chunks, embeds and upserts every document under `source`. Chunks whose content
+    hash matches the manifest are skipped, so an unchanged corpus is a no-op.
+
+    Returns:
+    dict: Counts of seen, embedded and deleted chunks
+    """
+    manifest_path = os.path.join(LOCAL_INDEX_DIR, f"{index_name}.{target}.manifest.json")
+    previous = load_manifest(manifest_path)
+    # --full re-embeds every chunk, but the previous manifest still tells which chunks to delete
+    manifest = {} if full else previous
+    # Without a corpus file yet, every chunk goes into it, embedded or not
+    rebuild_corpus = target == "pinecone" and not os.path.exists(corpus_path(LOCAL_INDEX_DIR, index_name))
+    seen, changed, corpus_chunks = {}, [], []
+    for document_source, title, pages in iter_documents(source):
+        for chunk in chunk_document(document_source, title, pages):
+            seen[chunk["id"]] = chunk["hash"]
+            if manifest.get(chunk["id"]) != chunk["hash"]:
+                changed.append(chunk)
+            elif rebuild_corpus:
+                corpus_chunks.append(chunk)
+    deleted_ids = [chunk_id for chunk_id in previous if chunk_id not in seen]
+    stats = {"chunks": len(seen), "embedded": len(changed), "deleted": len(deleted_ids)}
+    if not changed and not deleted_ids:
+        if rebuild_corpus:
+            update_corpus(index_name, corpus_chunks, [])
+            vector_store_registry.reset(index_name)
+        return stats
+
+    vectors = embed_chunks(changed, batch_size=batch_size, workers=workers)
+    if target == "local":
+        upsert_local(index_name, changed, vectors, deleted_ids)
+    else:
+        upsert_pinecone(index_name, changed, vectors, deleted_ids)
+        update_corpus(index_name, changed + corpus_chunks, deleted_ids)
+    save_manifest(manifest_path, seen)
+    with open(index_version_path(index_name), "w", encoding="utf-8") as f:
+        f.write(f"{time.time():.6f}")
+    vector_store_registry.reset(index_name)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest the Federal Student Aid Handbook into the vector index.")
+    parser.add_argument("source", help="Local directory or s3://bucket/prefix with PDF or text files")
+    parser.add_argument("--index", default=INDEX_NAME)
+    parser.add_argument("--target", choices=["pinecone", "local"], default="pinecone")
+    parser.add_argument("--full", action="store_true", help="Re-embed every chunk (chunks of removed files are still deleted)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    stats = ingest(args.source, args.index, args.target, args.full, args.batch_size, args.workers)
+    print(f"{json.dumps(stats)} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
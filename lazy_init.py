@@ -0,0 +1,169 @@
+import threading
+import time
+
+
+_registry = []
+_registry_lock = threading.Lock()
+_warm_up_thread = None
+
+
+class LazyProvider:
+    """
+    Memoized, thread-safe provider for an expensive component.
+
+    The factory runs on the first call (from whichever thread gets there
+    first) and its wall time is recorded for the startup report. override()
+    replaces the component, e.g. with a local stand-in, and survives reset()
+    until clear_override().
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.seconds = None
+        self.error = None
+        self.thread_name = None
+        self._value = None
+        self._initialized = False
+        self._overridden = False
+        self._lock = threading.RLock()
+        self.__doc__ = factory.__doc__
+
+    @property
+    def initialized(self):
+        return self._initialized
+
+    def __call__(self):
+        if self._initialized:
+            return self._value
+        with self._lock:
+            if not self._initialized:
+                start = time.perf_counter()
+                try:
+                    self._value = self.factory()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                finally:
+                    self.seconds = time.perf_counter() - start
+                    self.thread_name = threading.current_thread().name
+                self.error = None
+                self._initialized = True
+        return self._value
+
+    def override(self, value):
+        """
+        Uses `value` instead of building the component.
+        """
+        with self._lock:
+            self._value = value
+            self._initialized = True
+            self._overridden = True
+            self.seconds = 0.0
+            self.thread_name = "override"
+
+    def clear_override(self):
+        """
+        Drops an override so the next call builds the real component.
+        """
+        with self._lock:
+            self._overridden = False
+            self.reset()
+
+    def reset(self):
+        """
+        Forgets the component so the next call builds it again. An overridden
+        component is kept, so resets triggered elsewhere (e.g. a key rotation)
+        do not swap a stand-in for a real client.
+        """
+        with self._lock:
+            if self._overridden:
+                return
+            self._value = None
+            self._initialized = False
+            self.seconds = None
+            self.error = None
+
+
+def lazy_provider(name):
+    """
+    Decorator turning a zero-argument factory into a registered LazyProvider.
+    """
+    def decorator(factory):
+        provider = LazyProvider(name, factory)
+        with _registry_lock:
+            _registry.append(provider)
+        return provider
+    return decorator
+
+
+def get_provider(name):
+    """
+    Returns the registered provider with the given name.
+    """
+    for provider in _registry:
+        if provider.name == name:
+            return provider
+    raise KeyError(name)
+
+
+def warm_up(names=None):
+    """
+    Builds every registered component (or only `names`) in registration order.
+    Failures are recorded in the startup report and do not stop the warm-up.
+    """
+    for provider in list(_registry):
+        if names is not None and provider.name not in names:
+            continue
+        try:
+            provider()
+        except Exception as e:
+            print(f"Error warming up '{provider.name}': {e}")
+
+
+def warm_up_in_background(names=None):
+    """
+    Starts the warm-up in a daemon thread once per process; later calls are no-ops.
+    """
+    global _warm_up_thread
+    with _registry_lock:
+        if _warm_up_thread is None:
+            def run():
+                warm_up(names)
+                print(format_startup_report())
+            _warm_up_thread = threading.Thread(target=run, name="warm-up", daemon=True)
+            _warm_up_thread.start()
+    return _warm_up_thread
+
+
+def startup_report():
+    """
+    Returns one row per registered component: name, status, seconds and building thread.
+    """
+    rows = []
+    for provider in list(_registry):
+        if provider.error is not None:
+            status = "error"
+        elif provider.initialized:
+            status = "ready"
+        else:
+            status = "pending"
+        rows.append({
+            "component": provider.name,
+            "status": status,
+            "seconds": provider.seconds,
+            "thread": provider.thread_name,
+            "error": provider.error,
+        })
+    return rows
+
+
+def format_startup_report():
+    """
+    Renders the startup report as a text table.
+    """
+    lines = ["Startup report", f"{'component':<28}{'status':<10}{'seconds':>10}  thread"]
+    for row in startup_report():
+        seconds = "" if row["seconds"] is None else f"{row['seconds']:.3f}"
+        lines.append(f"{row['component']:<28}{row['status']:<10}{seconds:>10}  {row['thread'] or ''}")
+    return "\n".join(lines)
@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import contextvars
+import functools
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from stage_metrics import submit, timed
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it its me my of on or so that the their "
+    "there this to was what when where which who why will with you your".split()
+)
+RRF_K = 60
+
+# Lexical searches run here while the calling thread waits on the vector query
+_lexical_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical")
+
+
+def tokenize(text):
+    """
+    Lowercased alphanumeric terms without stopwords; acronyms such as SAI or ISIR are kept as terms.
+    """
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+def corpus_path(directory, index_name):
+    """
+    Chunk corpus kept next to the index data when the vectors live in Pinecone.
+    """
+    return os.path.join(directory, f"{index_name}.chunks.jsonl")
+
+
+def read_records(path):
+    """
+    Reads {'id', 'text', 'metadata'} rows (a corpus file or a snapshot's metadata.jsonl).
+    """
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_records(path, records):
+    """
+    Writes the corpus under a temporary name and swaps it in, so a reader never sees a partial file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    os.replace(temp_path, path)
+
+
+class BM25Index:
+    """
+    In-memory inverted index with Okapi BM25 scoring.
+
+    Document-length normalization and idf are folded into the posting weights
+    at build time, so a query is one vectorized add per query term.
+    """
+
+    def __init__(self, records, k1=1.5, b=0.75):
+        self.records = records
+        self.k1 = k1
+        self.b = b
+        counts = [Counter(tokenize(record["text"])) for record in records]
+        lengths = np.array([sum(c.values()) for c in counts], dtype=np.float32)
+        average = float(lengths.mean()) if len(lengths) else 0.0
+        postings = defaultdict(lambda: ([], []))
+        for row, terms in enumerate(counts):
+            norm = k1 * (1 - b + b * lengths[row] / average) if average else k1
+            for term, tf in terms.items():
+                rows, weights = postings[term]
+                rows.append(row)
+                weights.append(tf * (k1 + 1) / (tf + norm))
+        total = len(records)
+        self.postings = {}
+        for term, (rows, weights) in postings.items():
+            idf = math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5))
+            self.postings[term] = (np.array(rows, dtype=np.int32), np.array(weights, dtype=np.float32) * idf)
+
+    @classmethod
+    def from_texts(cls, texts, metadatas=None, ids=None):
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(i) for i in range(len(texts))]
+        return cls([{"id": i, "text": t, "metadata": dict(m)} for i, t, m in zip(ids, texts, metadatas)])
+
+    def __len__(self):
+        return len(self.records)
+
+    def search(self, query, k):
+        """
+        Returns up to k (row, score) pairs for rows sharing at least one term with the query.
+        """
+        scores = np.zeros(len(self.records), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        rows = np.flatnonzero(scores)
+        if len(rows) > k:
+            rows = rows[np.argpartition(-scores[rows], k - 1)[:k]]
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return [(int(row), float(scores[row])) for row in rows]
+
+    def document(self, row):
+        record = self.records[row]
+        return Document(page_content=record["text"], metadata={**record.get("metadata", {}), "id": record["id"]})
+
+    def search_documents(self, query, k):
+        with timed("lexical_query"):
+            return [self.document(row) for row, _ in self.search(query, k)]
+
+
+def fusion_key(document):
+    """
+    Identifies the same chunk in dense and lexical results by its text.
+    """
+    return hashlib.sha1(document.page_content.encode("utf-8")).hexdigest()
+
+
+def reciprocal_rank_fusion(result_lists, k=RRF_K):
+    """
+    Merges ranked lists by summing 1 / (k + rank); the first list's copy of a document is kept.
+    """
+    scores, documents = {}, {}
+    for results in result_lists:
+        for rank, document in enumerate(results, start=1):
+            key = fusion_key(document)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, document)
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def submit_lexical_search(lexical_index, query, k):
+    """
+    Starts a lexical search on the background pool; returns its future.
+    """
+    return submit(_lexical_pool, lexical_index.search_documents, query, k)
+
+
+async def alexical_search(lexical_index, query, k):
+    """
+    Awaitable lexical search; the CPU work runs on the lexical pool, off the event loop.
+    """
+    return await asyncio.wrap_future(submit_lexical_search(lexical_index, query, k))
+
+
+async def adense_search(vector_store, query, k, vector=None):
+    """
+    Embeds the query (unless `vector` is given) and runs the vector query without
+    blocking the event loop. Returns (document, score) pairs. Stores without a native
+    async search run the call in the default executor.
+    """
+    if vector is None:
+        vector = await vector_store.embeddings.aembed_query(query)
+    search = getattr(vector_store, "asimilarity_search_by_vector_with_score", None)
+    if search is not None:
+        return await search(vector, k=k)
+    loop = asyncio.get_running_loop()
+    search = functools.partial(vector_store.similarity_search_by_vector_with_score, vector, k=k)
+    return await loop.run_in_executor(None, contextvars.copy_context().run, search)
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Runs the BM25 search alongside the dense vector query and fuses both
+    rankings with reciprocal rank fusion, so exact terms (Pell, SAI, ISIR)
+    that the embeddings miss still reach the reranker.
+    """
+
+    vector_store: Any
+    lexical_index: Any
+    k: int = 40
+    lexical_k: int = 40
+    fused_k: int = 30
+    rrf_k: int = RRF_K
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        lexical = submit_lexical_search(self.lexical_index, query, self.lexical_k)
+        dense = self.vector_store.similarity_search(query, k=self.k)
+        return reciprocal_rank_fusion([dense, lexical.result()], k=self.rrf_k)[:self.fused_k]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> list[Document]:
+        # The query embedding and the lexical search overlap
+        dense, lexical = await asyncio.gather(
+            adense_search(self.vector_store, query, self.k),
+            alexical_search(self.lexical_index, query, self.lexical_k),
+        )
+        return reciprocal_rank_fusion([[document for document, _ in dense], lexical], k=self.rrf_k)[:self.fused_k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a BM25 index over a chunk corpus or snapshot metadata file.")
+    parser.add_argument("path", help="Corpus .jsonl file (e.g. <index>.chunks.jsonl or <snapshot>/metadata.jsonl)")
+    parser.add_argument("query")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = BM25Index(read_records(args.path))
+    print(f"Indexed {len(index)} chunks, {len(index.postings)} terms in {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    results = index.search(args.query, args.k)
+    print(f"Query took {(time.perf_counter() - start) * 1000:.1f} ms")
+    for row, score in results:
+        record = index.records[row]
+        metadata = record.get("metadata", {})
+        print(f"{score:8.3f}  {metadata.get('title', '')} p.{metadata.get('page', '')}  {record['text'][:100]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline_benchmark import OFFLINE_ENVIRONMENT, percentiles
+
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat_st.py")
+TURN_TIMEOUT = 120
+CONVERSATIONS = [
+    ["Who is eligible for a Pell Grant?", "What about part-time students?", "Thanks!"],
+    ["How is the cost of attendance calculated?", "Does it include housing?", "How does that affect my loan limits?"],
+    ["Hello!", "What happens to Title IV funds when a student withdraws?", "Who has to return them?"],
+    ["What documents are needed for verification of FAFSA data?", "What if I can't get them?"],
+    ["Compare Federal Work-Study and Direct Loan disbursement timing", "Which one is paid first?", "Thank you"],
+    ["How do schools determine dependency status?", "Can a financial aid administrator change it?", "What documentation is needed for that?"],
+]
+
+
+class _Concurrency:
+    """
+    Counts sessions in flight and remembers the maximum.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def __exit__(self, *exc_info):
+        with self._lock:
+            self.active -= 1
+
+
+def page_errors(app):
+    """
+    Exceptions and st.error messages drawn by the last run of the app.
+    """
+    return [str(element.value) for element in list(app.exception) + list(app.error)]
+
+
+def run_session(index, conversation, think_time, rng):
+    """
+    One simulated student: opens the app, then asks each question of the
+    conversation after an exponentially distributed think time.
+
+    Returns:
+    tuple: (the AppTest, kept alive for the memory measurement; one record per turn)
+    """
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_FILE, default_timeout=TURN_TIMEOUT)
+    app.run()
+    records = []
+    for question in conversation:
+        if think_time:
+            time.sleep(rng.expovariate(1 / think_time))
+        record = {"session": index, "question": question, "ttft": None, "server_seconds": None, "error": None}
+        start = time.perf_counter()
+        try:
+            app.chat_input[0].set_value(question).run()
+            errors = page_errors(app)
+            if errors:
+                record["error"] = errors[0]
+            else:
+                timings = app.session_state["last_turn_timings"]
+                record["ttft"] = timings.get("time_to_first_token", [None])[0]
+                record["server_seconds"] = timings["turn"][0]
+        except Exception as e:
+            record["error"] = str(e)
+        record["seconds"] = time.perf_counter() - start
+        records.append(record)
+    return app, records
+
+
+def run_load_test(arrival_rate=1.0, sessions=20, think_time=2.0, conversations=None, latency=None, trace_memory=True, seed=0):
+    """
+    Starts `sessions` chat sessions with Poisson arrivals (`arrival_rate` per
+    second) against chat_st running on local stand-ins.
+
+    Returns:
+    dict: Turn latency, time to first token, error rate, memory per session and queue metrics
+    """
+    os.environ.update(OFFLINE_ENVIRONMENT)
+    from aws_secrets_initialization import get_history_writer
+    from offline_fakes import install_fakes
+    from stage_metrics import stage_metrics
+
+    conversations = conversations or CONVERSATIONS
+    install_fakes(latency=latency)
+    if trace_memory:
+        tracemalloc.start()
+    # First session imports the app and builds the agent; it is not measured
+    run_session(-1, conversations[0][:1], 0, random.Random(seed))
+    stage_metrics.reset()
+    baseline = tracemalloc.get_traced_memory()[0] if trace_memory else 0
+
+    rng = random.Random(seed)
+    concurrency = _Concurrency()
+
+    def session(index):
+        with concurrency:
+            return run_session(index, conversations[index % len(conversations)], think_time, random.Random(seed + index + 1))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="load-session") as executor:
+        futures = []
+        for index in range(sessions):
+            futures.append(executor.submit(session, index))
+            time.sleep(rng.expovariate(arrival_rate))
+        results = [future.result() for future in futures]
+    wall = time.perf_counter() - start
+    get_history_writer().flush()
+
+    memory = None
+    if trace_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {"per_session_kb": (current - baseline) / sessions / 1024, "peak_mb": peak / 1024 / 1024}
+
+    records = [record for _, session_records in results for record in session_records]
+    ok = [record for record in records if record["error"] is None]
+    errors = [record for record in records if record["error"] is not None]
+    return {
+        "sessions": sessions,
+        "arrival_rate": arrival_rate,
+        "peak_concurrent_sessions": concurrency.peak,
+        "turns": len(records),
+        "error_rate": len(errors) / len(records) if records else 0.0,
+        "errors": [{"session": r["session"], "question": r["question"], "error": r["error"]} for r in errors[:10]],
+        "wall_seconds": wall,
+        "turns_per_second": len(ok) / wall if wall else 0.0,
+        "latency_ms": percentiles([record["seconds"] for record in ok]),
+        "server_turn_ms": percentiles([record["server_seconds"] for record in ok]),
+        "ttft_ms": percentiles([record["ttft"] for record in ok if record["ttft"] is not None]),
+        "memory": memory,
+        "stages": stage_metrics.snapshot(),
+        "history_writer": get_history_writer().metrics(),
+    }
+
+
+def _ms(value):
+    return "" if value is None else f"{value:.0f}"
+
+
+def format_results(results):
+    lines = [
+        f"{results['sessions']} sessions at {results['arrival_rate']:.2f}/s "
+        f"(peak {results['peak_concurrent_sessions']} concurrent), {results['turns']} turns in {results['wall_seconds']:.1f} s, "
+        f"{results['turns_per_second']:.2f} turns/s, error rate {results['error_rate']:.1%}",
+        "",
+        f"{'':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}",
+    ]
+    for label, key in (("turn (client)", "latency_ms"), ("turn (server)", "server_turn_ms"), ("time to first token", "ttft_ms")):
+        row = results[key]
+        lines.append(f"{label:<22}{_ms(row['p50']):>9}{_ms(row['p95']):>9}{_ms(row['p99']):>9}")
+    if results["memory"]:
+        lines += ["", f"memory per session {results['memory']['per_session_kb']:.0f} KiB, traced peak {results['memory']['peak_mb']:.1f} MiB"]
+    writer = results["history_writer"]
+    lines += ["", "history writer " + ", ".join(f"{name} {value}" for name, value in writer.items())]
+    lines += ["", f"{'stage':<28}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}"]
+    for row in results["stages"]:
+        lines.append(f"{row['stage']:<28}{row['count']:>7}{_ms(row['p50'] * 1000):>9}{_ms(row['p95'] * 1000):>9}")
+    for error in results["errors"]:
+        lines.append(f"error in session {error['session']} ({error['question']!r}): {error['error']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay concurrent multi-turn chat sessions against chat_st (Streamlit AppTest) on local stand-ins.")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--arrival-rate", type=float, default=1.0, help="New sessions per second (Poisson arrivals)")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between a session's turns; 0 sends them back to back")
+    parser.add_argument("--conversations", help="JSON file with a list of conversations, each a list of questions")
+    parser.add_argument("--latency", help="JSON overrides of the injected stand-in latencies")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc, which slows every allocation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the full results as JSON")
+    args = parser.parse_args()
+
+    conversations = None
+    if args.conversations:
+        with open(args.conversations, encoding="utf-8") as f:
+            conversations = json.load(f)
+    results = run_load_test(
+        arrival_rate=args.arrival_rate,
+        sessions=args.sessions,
+        think_time=args.think_time,
+        conversations=conversations,
+        latency=json.loads(args.latency) if args.latency else None,
+        trace_memory=not args.no_memory,
+        seed=args.seed,
+    )
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+import argparse
+import heapq
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+
+# Snapshot layout: one directory per index
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.jsonl"
+GRAPH_FILE = "graph.npz"
+BRUTE_FORCE_LIMIT = 20000  # above this many vectors "auto" selects the graph index
+TEXT_FIELD = "text"
+
+
+class BruteForceIndex:
+    """
+    Exact cosine search over every vector. Fast enough for small corpora and
+    works directly on a memory-mapped array.
+    """
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.norms = np.linalg.norm(vectors, axis=1) if len(vectors) else np.zeros(0, dtype=np.float32)
+        self.norms[self.norms == 0] = 1.0
+
+    def search(self, query, k):
+        """
+        Returns up to k (row, cosine similarity) pairs, best first.
+        """
+        if not len(self.vectors):
+            return []
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = (self.vectors @ query) / self.norms
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+class HNSWIndex:
+    """
+    Hierarchical navigable small world graph for approximate cosine search.
+
+    Each vector is inserted on a randomly drawn number of layers and linked to
+    its closest neighbours; queries descend greedily from the top layer and run
+    a beam search of width `ef_search` on the bottom layer.
+    """
+
+    def __init__(self, vectors, m=16, ef_construction=100, ef_search=64, seed=0):
+        self.vectors = vectors
+        self.norms = np.linalg.norm(vectors, axis=1) if len(vectors) else np.zeros(0, dtype=np.float32)
+        self.norms[self.norms == 0] = 1.0
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+        self.layers = []
+        self.entry_point = None
+
+    def _similarity(self, ids, query):
+        ids = np.asarray(ids)
+        return (self.vectors[ids] @ query) / self.norms[ids]
+
+    def _search_layer(self, query, entry_points, ef, layer):
+        graph = self.layers[layer]
+        visited = set(entry_points)
+        scores = self._similarity(entry_points, query)
+        candidates = [(-float(s), e) for s, e in zip(scores, entry_points)]
+        results = [(float(s), e) for s, e in zip(scores, entry_points)]
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+        while candidates:
+            negative_score, current = heapq.heappop(candidates)
+            if len(results) >= ef and -negative_score < results[0][0]:
+                break
+            neighbors = [n for n in graph.get(current, ()) if n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            for score, neighbor in zip(self._similarity(neighbors, query), neighbors):
+                score = float(score)
+                if len(results) < ef or score > results[0][0]:
+                    heapq.heappush(candidates, (-score, neighbor))
+                    heapq.heappush(results, (score, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted(results, reverse=True)
+
+    def build(self):
+        """
+        Inserts every vector into the graph.
+        """
+        rng = np.random.default_rng(self.seed)
+        level_multiplier = 1 / math.log(self.m)
+        self.layers = []
+        self.entry_point = None
+        for node in range(len(self.vectors)):
+            level = int(-math.log(1.0 - rng.random()) * level_multiplier)
+            self._insert(node, level)
+        return self
+
+    def _insert(self, node, level):
+        while len(self.layers) <= level:
+            self.layers.append({})
+        if self.entry_point is None:
+            for layer in range(level + 1):
+                self.layers[layer][node] = []
+            self.entry_point = node
+            return
+        query = self.vectors[node] / self.norms[node]
+        top_level = max(layer for layer in range(len(self.layers)) if self.entry_point in self.layers[layer])
+        entry_points = [self.entry_point]
+        for layer in range(top_level, level, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+        for layer in range(min(level, top_level), -1, -1):
+            found = self._search_layer(query, entry_points, self.ef_construction, layer)
+            max_links = self.m * 2 if layer == 0 else self.m
+            neighbors = [n for _, n in found[:max_links]]
+            graph = self.layers[layer]
+            graph[node] = neighbors
+            for neighbor in neighbors:
+                links = graph[neighbor]
+                links.append(node)
+                if len(links) > max_links:
+                    base = self.vectors[neighbor] / self.norms[neighbor]
+                    scores = self._similarity(links, base)
+                    graph[neighbor] = [links[i] for i in np.argsort(-scores)[:max_links]]
+            entry_points = [n for _, n in found]
+        for layer in range(top_level + 1, level + 1):
+            self.layers[layer][node] = []
+        if level > top_level:
+            self.entry_point = node
+
+    def search(self, query, k):
+        """
+        Returns up to k (row, cosine similarity) pairs, best first.
+        """
+        if self.entry_point is None:
+            return []
+        query = query / (np.linalg.norm(query) or 1.0)
+        entry_points = [self.entry_point]
+        for layer in range(len(self.layers) - 1, 0, -1):
+            if self.entry_point in self.layers[layer]:
+                entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+        found = self._search_layer(query, entry_points, max(self.ef_search, k), 0)
+        return [(int(i), s) for s, i in found[:k]]
+
+    def save(self, path):
+        """
+        Stores the graph next to the snapshot so it is built only once.
+        The file is written under a temporary name and swapped in.
+        """
+        arrays = {"entry_point": np.array([-1 if self.entry_point is None else self.entry_point]),
+                  "count": np.array([len(self.vectors)])}
+        for layer, graph in enumerate(self.layers):
+            nodes = np.array(sorted(graph), dtype=np.int64)
+            lengths = np.array([len(graph[n]) for n in nodes], dtype=np.int64)
+            links = np.array([n for node in nodes for n in graph[node]], dtype=np.int64)
+            arrays[f"nodes_{layer}"] = nodes
+            arrays[f"lengths_{layer}"] = lengths
+            arrays[f"links_{layer}"] = links
+        _replace_file(path, lambda f: np.savez(f, **arrays))
+
+    def load(self, path):
+        """
+        Loads a graph written by save(); returns False when it does not match the vectors.
+        """
+        data = np.load(path)
+        if int(data["count"][0]) != len(self.vectors):
+            return False
+        self.entry_point = int(data["entry_point"][0])
+        if self.entry_point < 0:
+            self.entry_point = None
+        self.layers = []
+        layer = 0
+        while f"nodes_{layer}" in data:
+            nodes, lengths, links = data[f"nodes_{layer}"], data[f"lengths_{layer}"], data[f"links_{layer}"]
+            offsets = np.concatenate([[0], np.cumsum(lengths)])
+            self.layers.append({int(n): links[offsets[i]:offsets[i + 1]].tolist() for i, n in enumerate(nodes)})
+            layer += 1
+        return True
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store over a snapshot of the handbook index.
+
+    Drop-in replacement for PineconeVectorStore in retrieve_documents: documents
+    carry the same metadata (title, page, source, ...) and the same text field.
+    """
+
+    def __init__(self, embedding, vectors=None, records=None, kind="auto", path=None):
+        self.embedding = embedding
+        self.vectors = vectors if vectors is not None else np.zeros((0, 0), dtype=np.float32)
+        self.records = records or []
+        self.kind = kind
+        self.path = path
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    @property
+    def index_kind(self):
+        if self.kind != "auto":
+            return self.kind
+        return "hnsw" if len(self.records) > BRUTE_FORCE_LIMIT else "brute"
+
+    def _get_index(self):
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = self._build_index()
+        return self._index
+
+    def _build_index(self):
+        if self.index_kind != "hnsw":
+            return BruteForceIndex(self.vectors)
+        index = HNSWIndex(self.vectors)
+        graph_path = os.path.join(self.path, GRAPH_FILE) if self.path else None
+        if not (graph_path and os.path.exists(graph_path) and index.load(graph_path)):
+            print(f"Building the HNSW graph for {len(self.vectors)} vectors; run 'build-graph' after writing a snapshot to avoid this")
+            index.build()
+            if graph_path:
+                try:
+                    index.save(graph_path)
+                except OSError as e:
+                    print(f"Could not save the HNSW graph to '{graph_path}': {e}")
+        return index
+
+    def ensure_index(self):
+        """
+        Loads (or, without a stored graph, builds) the search index now instead of on the first query.
+        """
+        return self._get_index()
+
+    @classmethod
+    def load(cls, path, embedding, kind="auto"):
+        """
+        Loads a snapshot directory; the vectors are memory-mapped, not read into memory.
+        """
+        vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(path, METADATA_FILE), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        if len(records) != len(vectors):
+            raise ValueError(f"Snapshot '{path}' has {len(vectors)} vectors but {len(records)} metadata rows")
+        return cls(embedding, vectors=vectors, records=records, kind=kind, path=path)
+
+    def save(self, path):
+        """
+        Writes the store as a snapshot directory.
+        """
+        write_snapshot(path, self.vectors, self.records, kind=self.kind)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        new_vectors = np.asarray(self.embedding.embed_documents(texts), dtype=np.float32)
+        if len(self.records):
+            self.vectors = np.concatenate([np.asarray(self.vectors), new_vectors])
+        else:
+            self.vectors = new_vectors
+        self.records.extend({"id": i, "text": t, "metadata": dict(m)} for i, t, m in zip(ids, texts, metadatas))
+        with self._index_lock:
+            self._index = None
+        return ids
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, kind="auto", **kwargs):
+        store = cls(embedding, kind=kind)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def _document(self, row):
+        record = self.records[row]
+        return Document(page_content=record["text"], metadata={**record["metadata"], "id": record["id"]})
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, **kwargs):
+        query = np.asarray(embedding, dtype=np.float32)
+        return [(self._document(row), score) for row, score in self._get_index().search(query, k)]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [document for document, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [document for document, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1) / 2
+
+
+def _replace_file(path, write, mode="wb"):
+    """
+    Writes a file under a temporary name in the same directory, then renames it over `path`.
+    Readers that memory-mapped the old file keep their mapping intact.
+    """
+    directory, name = os.path.split(path)
+    temp_path = os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(temp_path, mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+            write(f)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_snapshot(path, vectors, records, kind="auto"):
+    """
+    Writes vectors.npy and metadata.jsonl (one {'id', 'text', 'metadata'} row per vector).
+
+    Files are swapped in with os.replace, so a running LocalVectorStore keeps
+    serving its memory-mapped copy until it reloads. When the snapshot is large
+    enough for the graph index (or kind is "hnsw") the graph is built here, not
+    on the first query.
+    """
+    os.makedirs(path, exist_ok=True)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    graph_path = os.path.join(path, GRAPH_FILE)
+    graph = None
+    if kind == "hnsw" or (kind == "auto" and len(records) > BRUTE_FORCE_LIMIT):
+        graph = HNSWIndex(vectors).build()
+    _replace_file(os.path.join(path, VECTORS_FILE), lambda f: np.save(f, vectors))
+    _replace_file(os.path.join(path, METADATA_FILE), lambda f: f.writelines(json.dumps(record) + "\n" for record in records), mode="w")
+    if graph is not None:
+        graph.save(graph_path)
+    elif os.path.exists(graph_path):
+        os.remove(graph_path)
+
+
+def export_pinecone_snapshot(index, path, namespace="", batch_size=100):
+    """
+    Copies every vector and its metadata out of a Pinecone index into a snapshot directory.
+    """
+    vectors, records = [], []
+    for ids in index.list(namespace=namespace, limit=batch_size):
+        fetched = index.fetch(ids=list(ids), namespace=namespace).vectors
+        for vector_id in ids:
+            vector = fetched.get(vector_id)
+            if vector is None:
+                continue
+            metadata = dict(vector.metadata or {})
+            text = metadata.pop(TEXT_FIELD, "")
+            vectors.append(vector.values)
+            records.append({"id": vector_id, "text": text, "metadata": metadata})
+    write_snapshot(path, vectors, records)
+    return len(records)
+
+
+def benchmark_snapshot(path, queries=100, k=20):
+    """
+    Compares brute-force and graph search on a snapshot, using stored vectors as queries.
+    Returns recall@k of the graph index and mean latency of both.
+    """
+    vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+    rows = np.random.default_rng(0).choice(len(vectors), size=min(queries, len(vectors)), replace=False)
+    exact = BruteForceIndex(vectors)
+    graph = HNSWIndex(vectors)
+    graph_path = os.path.join(path, GRAPH_FILE)
+    if not (os.path.exists(graph_path) and graph.load(graph_path)):
+        graph.build()
+    timings = {"brute": 0.0, "hnsw": 0.0}
+    recall = 0.0
+    for row in rows:
+        query = np.asarray(vectors[row])
+        start = time.perf_counter()
+        expected = {i for i, _ in exact.search(query, k)}
+        timings["brute"] += time.perf_counter() - start
+        start = time.perf_counter()
+        found = {i for i, _ in graph.search(query, k)}
+        timings["hnsw"] += time.perf_counter() - start
+        recall += len(expected & found) / len(expected)
+    return {
+        "vectors": len(vectors),
+        "recall_at_k": recall / len(rows),
+        "brute_ms": 1000 * timings["brute"] / len(rows),
+        "hnsw_ms": 1000 * timings["hnsw"] / len(rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage local snapshots of the handbook vector index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Copy a Pinecone index into a snapshot directory")
+    export.add_argument("--index", required=True)
+    export.add_argument("--out", required=True)
+    export.add_argument("--namespace", default="")
+    build = subparsers.add_parser("build-graph", help="Build and store the HNSW graph for a snapshot")
+    build.add_argument("path")
+    bench = subparsers.add_parser("benchmark", help="Compare brute-force and graph search on a snapshot")
+    bench.add_argument("path")
+    bench.add_argument("--queries", type=int, default=100)
+    bench.add_argument("-k", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from vector_store_registry import vector_store_registry
+        count = export_pinecone_snapshot(vector_store_registry.pinecone_index(args.index), args.out, args.namespace)
+        print(f"Exported {count} vectors to {args.out}")
+    elif args.command == "build-graph":
+        vectors = np.load(os.path.join(args.path, VECTORS_FILE), mmap_mode="r")
+        HNSWIndex(vectors).build().save(os.path.join(args.path, GRAPH_FILE))
+        print(f"Built graph for {len(vectors)} vectors")
+    else:
+        print(json.dumps(benchmark_snapshot(args.path, args.queries, args.k), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import asyncio
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.retrievers import BaseRetriever
+
+from lexical_index import adense_search, alexical_search, reciprocal_rank_fusion, submit_lexical_search
+from rerank_cache import document_id
+from stage_metrics import submit, timed
+
+
+MAX_SUB_QUERIES = 4
+SUB_QUERY_K = 25  # candidates per sub-query
+MAX_CANDIDATES = 60  # union sent to the reranker in one pass
+LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+DECOMPOSE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You write search queries for the Federal Student Aid Handbook. Split the student's question into at most "
+     "{max_queries} short, self-contained search queries, one per aspect of the question. "
+     "Reply with one query per line and nothing else."),
+    ("human", "{question}"),
+])
+
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="multi-query")
+
+
+def parse_sub_queries(text, question, max_queries=MAX_SUB_QUERIES):
+    """
+    Turns the model's reply into distinct sub-queries; the original question always comes first.
+    """
+    queries, seen = [question], {question.casefold()}
+    for line in text.splitlines():
+        query = LIST_MARKER.sub("", line).strip().strip('"')
+        if query and query.casefold() not in seen:
+            seen.add(query.casefold())
+            queries.append(query)
+    return queries[:max_queries + 1]
+
+
+def decompose_question(question, llm, max_queries=MAX_SUB_QUERIES):
+    """
+    One LLM call splitting a multi-part question into sub-queries.
+    Falls back to the question alone when the call fails.
+    """
+    try:
+        with timed("decompose"):
+            text = (DECOMPOSE_PROMPT | llm | StrOutputParser()).invoke({"question": question, "max_queries": max_queries})
+    except Exception as e:
+        print(f"Error decomposing the question: {e}")
+        return [question]
+    return parse_sub_queries(text, question, max_queries)
+
+
+async def adecompose_question(question, llm, max_queries=MAX_SUB_QUERIES):
+    """
+    Async variant of decompose_question.
+    """
+    try:
+        with timed("decompose"):
+            text = await (DECOMPOSE_PROMPT | llm | StrOutputParser()).ainvoke({"question": question, "max_queries": max_queries})
+    except Exception as e:
+        print(f"Error decomposing the question: {e}")
+        return [question]
+    return parse_sub_queries(text, question, max_queries)
+
+
+def interleave_unique(result_lists, limit):
+    """
+    Round-robin over ranked lists, skipping chunk ids already taken, until `limit` documents.
+    """
+    merged, seen = [], set()
+    for rank in range(max((len(results) for results in result_lists), default=0)):
+        for results in result_lists:
+            if rank < len(results):
+                doc_id = document_id(results[rank])
+                if doc_id not in seen:
+                    seen.add(doc_id)
+                    merged.append(results[rank])
+                    if len(merged) == limit:
+                        return merged
+    return merged
+
+
+class ParallelMultiQueryRetriever(BaseRetriever):
+    """
+    Answers a multi-part question in one retrieval round.
+
+    The question is decomposed once, then every sub-query is embedded and
+    searched (vector and BM25) in its own concurrent task; Bedrock's Titan
+    embeddings take one text per call, so a batched embed_documents would
+    serialize them. The results are deduplicated by chunk id and the union is
+    reranked once against the original question. The fan-out is recorded as
+    one "vector_query" stage.
+
+    On the async path the original question's searches start while the
+    decomposition call is still running.
+    """
+
+    vector_store: Any
+    embeddings: Any
+    compressor: Any
+    decompose: Callable[[str], list]
+    adecompose: Optional[Callable[[str], Awaitable[list]]] = None
+    lexical_index: Any = None
+    k: int = SUB_QUERY_K
+    max_candidates: int = MAX_CANDIDATES
+
+    def _search(self, query):
+        lexical = submit_lexical_search(self.lexical_index, query, self.k) if self.lexical_index is not None else None
+        dense = self.vector_store.similarity_search_by_vector(self.embeddings.embed_query(query), k=self.k)
+        return reciprocal_rank_fusion([dense, lexical.result()])[:self.k] if lexical is not None else dense
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> list[Document]:
+        sub_queries = self.decompose(query)
+        with timed("vector_query"):
+            futures = [submit(_search_pool, self._search, sub_query) for sub_query in sub_queries]
+            result_lists = [future.result() for future in futures]
+        candidates = interleave_unique(result_lists, self.max_candidates)
+        if not candidates:
+            return []
+        return list(self.compressor.compress_documents(candidates, query, callbacks=run_manager.get_child()))
+
+    async def _adense(self, query):
+        vector = await self.embeddings.aembed_query(query)
+        return [document for document, _ in await adense_search(self.vector_store, query, self.k, vector)]
+
+    async def _asearch(self, query):
+        if self.lexical_index is None:
+            return await self._adense(query)
+        dense, lexical = await asyncio.gather(self._adense(query), alexical_search(self.lexical_index, query, self.k))
+        return reciprocal_rank_fusion([dense, lexical])[:self.k]
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> list[Document]:
+        original = asyncio.ensure_future(self._asearch(query))
+        try:
+            if self.adecompose is not None:
+                sub_queries = await self.adecompose(query)
+            else:
+                loop = asyncio.get_running_loop()
+                sub_queries = await loop.run_in_executor(None, contextvars.copy_context().run, self.decompose, query)
+            with timed("vector_query"):
+                result_lists = await asyncio.gather(original, *(self._asearch(q) for q in sub_queries[1:]))
+        except BaseException:
+            original.cancel()
+            raise
+        candidates = interleave_unique(list(result_lists), self.max_candidates)
+        if not candidates:
+            return []
+        return list(await self.compressor.acompress_documents(candidates, query, callbacks=run_manager.get_child()))
@@ -0,0 +1,340 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from local_vector_store import METADATA_FILE, LocalVectorStore
+from rerankers import LexicalOverlapReranker
+
+
+# Injected latency of each stand-in, in seconds
+DEFAULT_LATENCY = {
+    "llm_first_token": 0.4,
+    "llm_token": 0.01,
+    "embedding": 0.05,
+    "vector_query": 0.03,
+    "rerank": 0.15,
+    "dynamodb": 0.01,
+}
+AGENT_PROMPT_MARKER = "RESPONSE FORMAT INSTRUCTIONS"
+TOOL_RESPONSE_MARKER = "TOOL RESPONSE"
+USER_INPUT_MARKER = "and NOTHING else):\n\n"
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+TOKEN_PATTERN = re.compile(r"\s*\S+")
+
+TOPICS = [
+    "Pell Grant eligibility", "Expected Family Contribution", "Student Aid Index", "cost of attendance",
+    "satisfactory academic progress", "return of Title IV funds", "verification of FAFSA data",
+    "dependency status", "professional judgment", "Direct Loan limits", "Federal Work-Study",
+    "enrollment status", "disbursement timing", "credit balances", "unusual enrollment history",
+    "ability to benefit", "selective service", "drug conviction questions", "citizenship requirements",
+    "overpayments", "clock-hour programs", "academic year definitions", "payment periods", "loan counseling",
+]
+FILLER = [
+    "schools must", "the student", "financial aid administrators", "under the Higher Education Act",
+    "for each award year", "as described in Volume", "the Department requires", "documentation",
+    "when calculating", "eligible programs", "including", "unless an exception applies",
+]
+SAMPLE_QUESTIONS = [
+    "Who is eligible for a Pell Grant?",
+    "How is the cost of attendance calculated?",
+    "What happens to Title IV funds when a student withdraws?",
+    "What documents are needed for verification of FAFSA data?",
+    "How do schools determine dependency status?",
+    "What are the Direct Loan limits for a dependent undergraduate?",
+    "Hello!",
+    "Compare Federal Work-Study and Direct Loan disbursement timing",
+    "What is satisfactory academic progress and how is it measured?",
+    "When can a financial aid administrator use professional judgment?",
+    "Thanks, what about credit balances?",
+    "How are payment periods defined for clock-hour programs?",
+]
+
+
+def words(text):
+    return WORD_PATTERN.findall(text.lower())
+
+
+def synthetic_corpus(size=500, seed=0):
+    """
+    Deterministic handbook-like chunks with the metadata the app renders.
+
+    Returns:
+    tuple: (texts, metadatas)
+    """
+    rng = random.Random(seed)
+    texts, metadatas = [], []
+    for i in range(size):
+        topic = TOPICS[i % len(TOPICS)]
+        sentences = [f"{topic.capitalize()}: {' '.join(rng.sample(FILLER, 4))} {topic}." for _ in range(4)]
+        sentences.insert(rng.randrange(4), f"See also {rng.choice(TOPICS)}.")
+        texts.append(" ".join(sentences))
+        metadatas.append({"title": f"Volume {i % 8 + 1}: {topic}", "page": i // 8 + 1, "source": f"offline://handbook/{i}"})
+    return texts, metadatas
+
+
+def snapshot_corpus(path):
+    """
+    Texts and metadata of a local vector snapshot, so the benchmark can run over real chunks.
+    """
+    texts, metadatas = [], []
+    with open(os.path.join(path, METADATA_FILE), encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                texts.append(record["text"])
+                metadatas.append(record.get("metadata", {}))
+    return texts, metadatas
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic chat model for offline runs.
+
+    Under the agent prompt it first asks for the Knowledge Base tool with the
+    user's input, then answers once a tool response is present, both as JSON
+    action blobs. Any other prompt (direct pipeline, memory summary) gets a
+    plain-text answer built from the prompt. Output is streamed token by token
+    with the configured latency.
+    """
+
+    first_token_latency: float = DEFAULT_LATENCY["llm_first_token"]
+    token_latency: float = DEFAULT_LATENCY["llm_token"]
+    answer_words: int = 60
+    tool_name: str = "Knowledge Base"
+    streaming: bool = True
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _answer(self, text):
+        return "According to the handbook, " + " ".join(words(text)[-self.answer_words:]) + "."
+
+    def _respond(self, messages):
+        contents = [str(message.content) for message in messages]
+        if not any(AGENT_PROMPT_MARKER in content for content in contents):
+            return self._answer("\n".join(contents))
+        last = contents[-1]
+        if TOOL_RESPONSE_MARKER in last:
+            action, action_input = "Final Answer", self._answer(last)
+        else:
+            action, action_input = self.tool_name, last.rsplit(USER_INPUT_MARKER, 1)[-1].strip()
+        return "```json\n" + json.dumps({"action": action, "action_input": action_input}, indent=4) + "\n```"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._respond(messages)
+        time.sleep(self.first_token_latency + self.token_latency * len(TOKEN_PATTERN.findall(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self._respond(messages)
+        time.sleep(self.first_token_latency)
+        for token in TOKEN_PATTERN.findall(text):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager is not None:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(self.token_latency)
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings (feature hashing), so texts sharing
+    words are close and retrieval results are meaningful without Bedrock.
+    """
+
+    def __init__(self, dimensions=256, latency=DEFAULT_LATENCY["embedding"]):
+        self.dimensions = dimensions
+        self.latency = latency
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in words(text):
+            digest = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dimensions] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return self._embed(text)
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+
+class FakeVectorStore(LocalVectorStore):
+    """
+    In-memory LocalVectorStore with an injected per-query delay standing in for the Pinecone round trip.
+    """
+
+    latency = DEFAULT_LATENCY["vector_query"]
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, **kwargs):
+        time.sleep(self.latency)
+        return super().similarity_search_by_vector_with_score(embedding, k, **kwargs)
+
+
+class FakeReranker(LexicalOverlapReranker):
+    """
+    Lexical-overlap reranker with the round-trip delay of a hosted rerank API, standing in for Cohere.
+    """
+
+    latency: float = DEFAULT_LATENCY["rerank"]
+
+    def score(self, query, texts):
+        time.sleep(self.latency)
+        return super().score(query, texts)
+
+
+class _Waiter:
+    def wait(self, **kwargs):
+        pass
+
+
+class _Paginator:
+    def __init__(self, method):
+        self.method = method
+
+    def paginate(self, **kwargs):
+        yield self.method(**kwargs)
+
+
+class InMemoryDynamoDB:
+    """
+    Thread-safe in-memory stand-in for the low-level boto3 DynamoDB client.
+
+    Covers the calls the app makes (create_table, put_item, batch_write_item,
+    query on the partition key, scan, paginators and waiters), each with an
+    injected delay. Tables created implicitly use SessionId/MessageKey keys.
+    """
+
+    def __init__(self, latency=DEFAULT_LATENCY["dynamodb"]):
+        self.latency = latency
+        self.calls = 0
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _table(self, name):
+        return self._tables.setdefault(name, {"keys": ["SessionId", "MessageKey"], "items": {}})
+
+    def _call(self):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+
+    def _key(self, table, item):
+        return tuple(json.dumps(item.get(name), sort_keys=True) for name in table["keys"])
+
+    def create_table(self, TableName, KeySchema, **kwargs):
+        self._call()
+        with self._lock:
+            self._tables[TableName] = {"keys": [key["AttributeName"] for key in KeySchema], "items": {}}
+        return {"TableDescription": {"TableName": TableName, "TableStatus": "ACTIVE"}}
+
+    def put_item(self, TableName, Item, **kwargs):
+        self._call()
+        with self._lock:
+            table = self._table(TableName)
+            table["items"][self._key(table, Item)] = Item
+        return {}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        self._call()
+        with self._lock:
+            for table_name, requests in RequestItems.items():
+                table = self._table(table_name)
+                for request in requests:
+                    if "PutRequest" in request:
+                        item = request["PutRequest"]["Item"]
+                        table["items"][self._key(table, item)] = item
+                    else:
+                        table["items"].pop(self._key(table, request["DeleteRequest"]["Key"]), None)
+        return {"UnprocessedItems": {}}
+
+    def query(self, TableName, ExpressionAttributeValues, ScanIndexForward=True, **kwargs):
+        self._call()
+        (value,) = ExpressionAttributeValues.values()
+        with self._lock:
+            table = self._table(TableName)
+            items = [item for key, item in sorted(table["items"].items()) if item.get(table["keys"][0]) == value]
+        return {"Items": items if ScanIndexForward else items[::-1], "Count": len(items)}
+
+    def scan(self, TableName, **kwargs):
+        self._call()
+        with self._lock:
+            items = list(self._table(TableName)["items"].values())
+        return {"Items": items, "Count": len(items)}
+
+    def get_paginator(self, operation_name):
+        return _Paginator(getattr(self, operation_name))
+
+    def get_waiter(self, waiter_name):
+        return _Waiter()
+
+
+def install_fakes(texts=None, metadatas=None, latency=None, caches=True):
+    """
+    Replaces Bedrock, Pinecone, Cohere and DynamoDB with the local stand-ins
+    by overriding the lazily built components, and rebuilds the agent.
+    LangSmith is overridden with None so a warm-up never turns tracing on.
+
+    Args:
+    texts, metadatas (list): Corpus for the in-memory vector store (synthetic when omitted)
+    latency (dict): Overrides of DEFAULT_LATENCY
+    caches (bool): Keep the embedding and rerank caches; False makes every call a miss
+
+    Returns:
+    dict: The installed stand-ins by component name
+    """
+    from aws_secrets_initialization import ANSWER_CACHE_SIZE, ANSWER_CACHE_THRESHOLD
+    from chat_retrieval import RERANK_TOP_N, agent_factory, rerank_cache
+    from embedding_cache import CachedEmbeddings, EmbeddingCache
+    from history_writer import DynamoDBItemSink, WriteBehindQueue
+    from lazy_init import get_provider
+    from lexical_index import BM25Index
+    from rerank_cache import CachedRerank, RerankCache
+    from semantic_cache import SemanticAnswerCache
+
+    latency = {**DEFAULT_LATENCY, **(latency or {})}
+    if texts is None:
+        texts, metadatas = synthetic_corpus()
+    cache_size = 4096 if caches else 0
+    embeddings = CachedEmbeddings(HashEmbeddings(latency=latency["embedding"]), "offline-hash", EmbeddingCache(max_entries=cache_size))
+    ids = [str(i) for i in range(len(texts))]
+    vector_store = FakeVectorStore.from_texts(texts, HashEmbeddings(latency=0.0), metadatas=metadatas, ids=ids)
+    vector_store.embedding = embeddings
+    vector_store.latency = latency["vector_query"]
+    rerank_cache.clear()
+    reranker = CachedRerank(
+        base_compressor=FakeReranker(top_n=RERANK_TOP_N, latency=latency["rerank"]),
+        cache=rerank_cache if caches else RerankCache(max_entries=0),
+        model="offline-overlap",
+        top_n=RERANK_TOP_N,
+    )
+    dynamodb = InMemoryDynamoDB(latency=latency["dynamodb"])
+    fakes = {
+        "llm": FakeChatModel(first_token_latency=latency["llm_first_token"], token_latency=latency["llm_token"], streaming=True),
+        "embeddings": embeddings,
+        "vector_store": vector_store,
+        "lexical_index": BM25Index.from_texts(texts, metadatas, ids),
+        "reranker": reranker,
+        "dynamodb_client": dynamodb,
+        "history_writer": WriteBehindQueue(DynamoDBItemSink(dynamodb), max_size=1000, name="dynamodb-history"),
+        "answer_cache": SemanticAnswerCache(embeddings, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_SIZE),
+        "langsmith": None,
+    }
+    for name, value in fakes.items():
+        get_provider(name).override(value)
+    agent_factory.reload()
+    return fakes
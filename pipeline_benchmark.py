@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# Set before the app modules are imported, so nothing reaches AWS, LangSmith or LangChain Hub
+OFFLINE_ENVIRONMENT = {
+    "SECRETS_SOURCE": "local",
+    "PROMPT_HUB_SYNC": "false",
+    "LANGCHAIN_TRACING_V2": "false",
+    "AWS_ACCESS_KEY_ID": "offline",
+    "AWS_SECRET_ACCESS_KEY": "offline",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_EC2_METADATA_DISABLED": "true",
+}
+MODES = ["agent", "direct", "auto"]
+
+
+class _NullPlaceholder:
+    def markdown(self, text):
+        pass
+
+
+def percentiles(values):
+    """
+    Returns p50/p95/p99 of a list of seconds, in milliseconds.
+    """
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    return {f"p{q}": float(np.percentile(values, q)) * 1000 for q in (50, 95, 99)}
+
+
+def run_turn(question, memory, mode, caches):
+    """
+    One chat turn through chat_st.answer_turn, the function run_chat_interface
+    uses, with the Streamlit widgets left out.
+
+    Returns:
+    tuple: (response, seconds to the first streamed answer token or None)
+    """
+    from chat_st import answer_turn
+    from stage_metrics import StageTimingCallbackHandler
+    from streaming import StreamingAnswerHandler
+
+    streaming = StreamingAnswerHandler(_NullPlaceholder(), parse_json=True)
+    response = answer_turn(question, memory, mode, [StageTimingCallbackHandler(), streaming], streaming, use_cache=caches)
+    return response, streaming.first_token_seconds
+
+
+def run_session(index, turns, questions, mode, caches):
+    """
+    Simulates one user: `turns` questions in a row with their own memory and chat history.
+
+    Returns:
+    list: One {'seconds', 'ttft', 'error'} record per turn
+    """
+    from langchain_core.chat_history import InMemoryChatMessageHistory
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from aws_secrets_initialization import MEMORY_MAX_TOKENS, MEMORY_MAX_TURNS, get_llm, get_session_history
+    from stage_metrics import stage_metrics
+    from windowed_memory import WindowedSummaryMemory
+
+    session_id = f"benchmark-{index}"
+    history = get_session_history(session_id)
+    memory = WindowedSummaryMemory(
+        chat_memory=InMemoryChatMessageHistory(),
+        state={},
+        llm_loader=get_llm,
+        max_turns=MEMORY_MAX_TURNS,
+        max_tokens=MEMORY_MAX_TOKENS,
+    )
+    records = []
+    for turn in range(turns):
+        question = questions[(index + turn) % len(questions)]
+        start = time.perf_counter()
+        record = {"ttft": None, "error": None}
+        try:
+            with stage_metrics.turn():
+                history.append(HumanMessage(id=session_id, content=question))
+                response, record["ttft"] = run_turn(question, memory, mode, caches)
+                history.append(AIMessage(id=session_id, content=response["output"]))
+        except Exception as e:
+            record["error"] = str(e)
+        record["seconds"] = time.perf_counter() - start
+        records.append(record)
+    return records
+
+
+def run_configuration(mode, caches, sessions, turns, questions, corpus, latency):
+    """
+    Installs fresh stand-ins (cold caches) and drives `sessions` concurrent sessions.
+
+    Returns:
+    dict: Latency percentiles, throughput, error count and per-stage p50s
+    """
+    from adaptive_retrieval import depth_stats
+    from aws_secrets_initialization import get_history_writer
+    from offline_fakes import install_fakes
+    from stage_metrics import stage_metrics
+
+    install_fakes(*corpus, latency=latency, caches=caches)
+    stage_metrics.reset()
+    depth_stats.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as executor:
+        results = list(executor.map(lambda i: run_session(i, turns, questions, mode, caches), range(sessions)))
+    wall = time.perf_counter() - start
+    get_history_writer().flush()
+
+    records = [record for session in results for record in session]
+    ok = [record for record in records if record["error"] is None]
+    return {
+        "configuration": f"{mode}/{'cached' if caches else 'uncached'}",
+        "sessions": sessions,
+        "turns": len(records),
+        "errors": len(records) - len(ok),
+        "first_error": next((record["error"] for record in records if record["error"]), None),
+        "wall_seconds": wall,
+        "turns_per_second": len(ok) / wall if wall else 0.0,
+        "latency_ms": percentiles([record["seconds"] for record in ok]),
+        "ttft_ms": percentiles([record["ttft"] for record in ok if record["ttft"] is not None]),
+        "stages_p50_ms": {row["stage"]: row["p50"] * 1000 for row in stage_metrics.snapshot() if row["p50"] is not None},
+        "history_writer": get_history_writer().metrics(),
+        "retrieval_depth": depth_stats.stats(),
+    }
+
+
+def run_benchmark(modes=MODES, caches=(True,), sessions=8, turns=5, questions=None, snapshot=None, latency=None):
+    """
+    Runs every (pipeline mode, cache setting) configuration with deterministic stand-ins.
+    """
+    os.environ.update(OFFLINE_ENVIRONMENT)
+    from offline_fakes import SAMPLE_QUESTIONS, snapshot_corpus, synthetic_corpus
+
+    corpus = snapshot_corpus(snapshot) if snapshot else synthetic_corpus()
+    return [
+        run_configuration(mode, cached, sessions, turns, questions or SAMPLE_QUESTIONS, corpus, latency)
+        for mode in modes
+        for cached in caches
+    ]
+
+
+def _ms(value):
+    return "" if value is None else f"{value:.0f}"
+
+
+def format_results(results):
+    lines = [
+        f"{'configuration':<18}{'turns':>7}{'errors':>8}{'turns/s':>9}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ttft p50':>10}{'ttft p95':>10}"
+    ]
+    for row in results:
+        latency, ttft = row["latency_ms"], row["ttft_ms"]
+        lines.append(
+            f"{row['configuration']:<18}{row['turns']:>7}{row['errors']:>8}{row['turns_per_second']:>9.2f}"
+            f"{_ms(latency['p50']):>9}{_ms(latency['p95']):>9}{_ms(latency['p99']):>9}{_ms(ttft['p50']):>10}{_ms(ttft['p95']):>10}"
+        )
+    for row in results:
+        lines += ["", f"{row['configuration']} stage p50 (ms)"]
+        lines += [f"  {stage:<28}{ms:>10.1f}" for stage, ms in row["stages_p50_ms"].items()]
+        if row["first_error"]:
+            lines.append(f"  first error: {row['first_error']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the chat pipeline offline with deterministic stand-ins for Bedrock, Pinecone, Cohere and DynamoDB.")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--caches", nargs="+", choices=["on", "off"], default=["on"], help="Run with warm-able caches, with every cache missing, or both")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated sessions")
+    parser.add_argument("--turns", type=int, default=5, help="Questions asked by each session")
+    parser.add_argument("--questions", help="Text file with one question per line (default: built-in sample)")
+    parser.add_argument("--snapshot", help="Local vector snapshot directory whose chunks are used as the corpus")
+    parser.add_argument("--latency", help='JSON overrides of the injected latencies, e.g. \'{"llm_first_token": 1.0}\'')
+    parser.add_argument("--json", action="store_true", help="Print the full results as JSON")
+    args = parser.parse_args()
+
+    questions = None
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    results = run_benchmark(
+        modes=args.modes,
+        caches=[setting == "on" for setting in args.caches],
+        sessions=args.sessions,
+        turns=args.turns,
+        questions=questions,
+        snapshot=args.snapshot,
+        latency=json.loads(args.latency) if args.latency else None,
+    )
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+
+PROMPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts")
+MANIFEST_FILE = os.path.join(PROMPTS_DIR, "manifest.json")
+
+_lock = threading.Lock()
+_loaded = {}
+# Prompts whose hub source differs from the vendored current version: name -> {version, source}
+hub_drift = {}
+
+
+class PromptChecksumError(ValueError):
+    """
+    Raised when a vendored prompt file does not match the checksum in the manifest.
+    """
+
+
+def load_manifest():
+    with open(MANIFEST_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def prompt_from_spec(spec):
+    """
+    Builds a ChatPromptTemplate from a vendored prompt spec.
+    """
+    messages = []
+    for message in spec["messages"]:
+        if message["type"] == "placeholder":
+            messages.append(MessagesPlaceholder(variable_name=message["variable_name"], optional=message.get("optional", False)))
+        else:
+            messages.append((message["type"], message["template"]))
+    return ChatPromptTemplate.from_messages(messages)
+
+
+def spec_from_prompt(prompt, name, version, source=None):
+    """
+    Converts a ChatPromptTemplate (e.g. one pulled from LangChain Hub) into a prompt spec.
+    """
+    roles = {"SystemMessagePromptTemplate": "system", "HumanMessagePromptTemplate": "human", "AIMessagePromptTemplate": "ai"}
+    messages = []
+    for message in prompt.messages:
+        if isinstance(message, MessagesPlaceholder):
+            messages.append({"type": "placeholder", "variable_name": message.variable_name, "optional": message.optional})
+        else:
+            messages.append({"type": roles[type(message).__name__], "template": message.prompt.template})
+    return {"name": name, "version": version, "source": source, "messages": messages}
+
+
+def load_prompt(name, version=None):
+    """
+    Loads a vendored prompt, validating its checksum. Loaded prompts are cached per process.
+
+    Args:
+    name (str): Prompt name in prompts/manifest.json
+    version (str): Version to load; defaults to the manifest's current version
+
+    Returns:
+    ChatPromptTemplate: The prompt
+    """
+    manifest = load_manifest()[name]
+    version = version or manifest["current"]
+    key = (name, version)
+    with _lock:
+        if key not in _loaded:
+            entry = manifest["versions"][version]
+            with open(os.path.join(PROMPTS_DIR, entry["file"]), "rb") as f:
+                data = f.read()
+            checksum = hashlib.sha256(data).hexdigest()
+            if checksum != entry["sha256"]:
+                raise PromptChecksumError(f"Prompt '{name}' {version} has checksum {checksum}, expected {entry['sha256']}")
+            _loaded[key] = prompt_from_spec(json.loads(data))
+        return _loaded[key]
+
+
+def sync_prompt_in_background(name):
+    """
+    Pulls the prompt's hub source in a daemon thread and reports whether it differs
+    from the vendored version. Drift is only logged and recorded in `hub_drift`;
+    the live agent keeps the checksummed vendored prompt until a new version is
+    vendored into the manifest. Failures are logged and never affect the vendored prompt.
+    """
+    def sync():
+        try:
+            from langchain import hub
+            manifest = load_manifest()[name]
+            current = manifest["current"]
+            source = manifest["versions"][current].get("source")
+            if not source:
+                return
+            pulled = hub.pull(source)
+            if spec_from_prompt(pulled, name, current)["messages"] != spec_from_prompt(load_prompt(name), name, current)["messages"]:
+                hub_drift[name] = {"version": current, "source": source}
+                print(f"Prompt '{name}' on the hub ({source}) differs from vendored {current}; "
+                      f"run 'python prompt_registry.py {name} {source}' to vendor it")
+            else:
+                hub_drift.pop(name, None)
+        except Exception as e:
+            print(f"Error syncing prompt '{name}' from the hub: {e}")
+
+    thread = threading.Thread(target=sync, name=f"prompt-sync-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def vendor_prompt(name, source):
+    """
+    Pulls a prompt from the hub and stores it as the next version of `name`.
+    """
+    from langchain import hub
+    manifest = load_manifest() if os.path.exists(MANIFEST_FILE) else {}
+    entry = manifest.setdefault(name, {"current": None, "versions": {}})
+    version = f"v{len(entry['versions']) + 1}"
+    spec = spec_from_prompt(hub.pull(source), name, version, source)
+    relative_path = f"{name}/{version}.json"
+    os.makedirs(os.path.join(PROMPTS_DIR, name), exist_ok=True)
+    data = (json.dumps(spec, indent=2) + "\n").encode("utf-8")
+    with open(os.path.join(PROMPTS_DIR, relative_path), "wb") as f:
+        f.write(data)
+    entry["versions"][version] = {"file": relative_path, "sha256": hashlib.sha256(data).hexdigest(), "source": source}
+    entry["current"] = version
+    with open(MANIFEST_FILE, "w", encoding="utf-8") as f:
+        f.write(json.dumps(manifest, indent=2) + "\n")
+    return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vendor a LangChain Hub prompt as a new local version.")
+    parser.add_argument("name")
+    parser.add_argument("source", help="Hub handle, e.g. hwchase17/react-chat-json")
+    args = parser.parse_args()
+    print(f"Vendored {args.name} {vendor_prompt(args.name, args.source)}")
+
+
+if __name__ == "__main__":
+    main()
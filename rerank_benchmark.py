@@ -0,0 +1,127 @@
+import argparse
+import json
+import math
+import os
+import time
+
+from pipeline_benchmark import OFFLINE_ENVIRONMENT, percentiles
+
+
+RERANKERS = ["cohere", "cross-encoder", "lexical"]
+REFERENCE = "cohere"
+
+
+def ndcg(ranking, gains, top_n):
+    """
+    NDCG@top_n of a ranking of document ids against graded gains by id.
+    """
+    dcg = sum(gains.get(doc_id, 0.0) / math.log2(rank + 2) for rank, doc_id in enumerate(ranking[:top_n]))
+    ideal = sum(gain / math.log2(rank + 2) for rank, gain in enumerate(sorted(gains.values(), reverse=True)[:top_n]))
+    return dcg / ideal if ideal else 0.0
+
+
+def reciprocal_rank(ranking, relevant):
+    return next((1.0 / (rank + 1) for rank, doc_id in enumerate(ranking) if doc_id in relevant), 0.0)
+
+
+def run_benchmark(queries, rerankers=RERANKERS, candidates=100, top_n=10, qrels=None, offline=False):
+    """
+    Reranks the same dense candidates for every query with each reranker.
+
+    Quality is measured against the Cohere ranking when Cohere is included
+    (overlap of the top_n and NDCG with Cohere's scores as gains) and against
+    labelled relevant ids when `qrels` ({query: [document ids]}) is given.
+
+    Returns:
+    list: One row per reranker with latency percentiles and quality metrics
+    """
+    if offline:
+        os.environ.update(OFFLINE_ENVIRONMENT)
+        from offline_fakes import install_fakes
+        install_fakes(latency={name: 0.0 for name in ("embedding", "vector_query", "rerank")})
+    from chat_retrieval import build_reranker, get_vector_store
+    from rerank_cache import document_id
+
+    candidate_sets = {query: get_vector_store().similarity_search(query, k=candidates) for query in queries}
+    # Rankings are compared by text hash (Cohere drops vector ids); qrels name vector ids
+    vector_ids = {
+        document_id(document): str(document.id or document.metadata.get("id") or document_id(document))
+        for documents in candidate_sets.values()
+        for document in documents
+    }
+    rankings, rows = {}, []
+    for name in rerankers:
+        try:
+            reranker, model = build_reranker(name, top_n=candidates)
+        except Exception as e:
+            print(f"Skipping '{name}': {e}")
+            continue
+        seconds, rankings[name], scores = [], {}, {}
+        for query, documents in candidate_sets.items():
+            start = time.perf_counter()
+            ranked = reranker.compress_documents(documents, query)
+            seconds.append(time.perf_counter() - start)
+            rankings[name][query] = [vector_ids[document_id(document)] for document in ranked]
+            scores[query] = {vector_ids[document_id(d)]: d.metadata.get("relevance_score") or 0.0 for d in ranked}
+        rows.append({"reranker": name, "model": model, "latency_ms": percentiles(seconds), "scores": scores})
+
+    reference = next((row for row in rows if row["reranker"] == REFERENCE), None)
+    for row in rows:
+        ranking = rankings[row["reranker"]]
+        if reference is not None:
+            reference_ranking = rankings[REFERENCE]
+            row[f"overlap@{top_n}"] = sum(
+                len(set(ranking[q][:top_n]) & set(reference_ranking[q][:top_n])) / top_n for q in queries
+            ) / len(queries)
+            row[f"ndcg@{top_n}_vs_cohere"] = sum(ndcg(ranking[q], reference["scores"][q], top_n) for q in queries) / len(queries)
+        if qrels:
+            labelled = [q for q in queries if qrels.get(q)]
+            if labelled:
+                row[f"recall@{top_n}"] = sum(
+                    len(set(ranking[q][:top_n]) & set(qrels[q])) / len(qrels[q]) for q in labelled
+                ) / len(labelled)
+                row["mrr"] = sum(reciprocal_rank(ranking[q], set(qrels[q])) for q in labelled) / len(labelled)
+    for row in rows:
+        del row["scores"]
+    return rows
+
+
+def format_results(rows, candidates):
+    lines = [f"Reranking {candidates} candidates per query", ""]
+    for row in rows:
+        latency = row["latency_ms"]
+        quality = "  ".join(f"{key} {value:.3f}" for key, value in row.items() if isinstance(value, float))
+        lines.append(
+            f"{row['reranker']:<15}{row['model']:<40}p50 {latency['p50']:8.1f} ms  p95 {latency['p95']:8.1f} ms  {quality}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare rerankers on latency and on agreement with Cohere or labelled relevance.")
+    parser.add_argument("--rerankers", nargs="+", choices=RERANKERS, default=RERANKERS)
+    parser.add_argument("--queries", help="Text file with one query per line (default: built-in sample)")
+    parser.add_argument("--qrels", help='JSON file {"query": ["document id", ...]} of relevant chunks')
+    parser.add_argument("--candidates", type=int, default=100, help="Dense candidates reranked per query")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--offline", action="store_true", help="Use the local stand-ins for the index and embeddings (Cohere is skipped)")
+    parser.add_argument("--json", action="store_true", help="Print the full results as JSON")
+    args = parser.parse_args()
+
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        from offline_fakes import SAMPLE_QUESTIONS
+        queries = SAMPLE_QUESTIONS
+    qrels = None
+    if args.qrels:
+        with open(args.qrels, encoding="utf-8") as f:
+            qrels = json.load(f)
+    rerankers = [name for name in args.rerankers if not (args.offline and name == "cohere")]
+    rows = run_benchmark(queries, rerankers, candidates=args.candidates, top_n=args.top_n, qrels=qrels, offline=args.offline)
+    print(json.dumps(rows, indent=2) if args.json else format_results(rows, args.candidates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Sequence
+
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+
+from embedding_cache import normalize_query
+from stage_metrics import timed
+
+
+def document_id(document):
+    """
+    Returns a stable id for a candidate document: a hash of its text. Vector ids
+    are not used, since rerankers such as CohereRerank return copies without them.
+    """
+    return hashlib.sha1(document.page_content.encode("utf-8")).hexdigest()
+
+
+class RerankCache:
+    """
+    Bounded LRU cache of rerank outputs with hit/miss counters.
+    Values are lists of (candidate position, relevance score) pairs.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class CachedRerank(BaseDocumentCompressor):
+    """
+    Document compressor that memoizes another reranker's output by
+    (normalized query, ordered candidate ids, model, top_n).
+    """
+
+    base_compressor: BaseDocumentCompressor
+    cache: Any
+    model: str = ""
+    top_n: int = 0
+
+    def _key(self, documents, query):
+        ids = [document_id(document) for document in documents]
+        return ids, (normalize_query(query), tuple(ids), self.model, self.top_n)
+
+    def _ranking(self, ids, reranked):
+        """
+        Maps reranked documents back to candidate positions; None when some cannot be matched.
+        """
+        positions = {}
+        for i, doc_id in enumerate(ids):
+            positions.setdefault(doc_id, []).append(i)
+        ranking = []
+        for document in reranked:
+            candidates = positions.get(document_id(document))
+            if not candidates:
+                return None
+            ranking.append((candidates.pop(0), document.metadata.get("relevance_score")))
+        return ranking
+
+    def _documents(self, documents, ranking):
+        return [
+            Document(
+                id=documents[i].id,
+                page_content=documents[i].page_content,
+                metadata={**documents[i].metadata, "relevance_score": score},
+            )
+            for i, score in ranking
+        ]
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        documents = list(documents)
+        ids, key = self._key(documents, query)
+        ranking = self.cache.get(key)
+        if ranking is None:
+            with timed("rerank"):
+                reranked = self.base_compressor.compress_documents(documents, query, callbacks=callbacks)
+            ranking = self._ranking(ids, reranked)
+            if ranking is None:
+                return reranked
+            self.cache.put(key, ranking)
+        return self._documents(documents, ranking)
+
+    async def acompress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        documents = list(documents)
+        ids, key = self._key(documents, query)
+        ranking = self.cache.get(key)
+        if ranking is None:
+            with timed("rerank"):
+                reranked = await self.base_compressor.acompress_documents(documents, query, callbacks=callbacks)
+            ranking = self._ranking(ids, reranked)
+            if ranking is None:
+                return reranked
+            self.cache.put(key, ranking)
+        return self._documents(documents, ranking)
@@ -0,0 +1,171 @@
+import argparse
+import math
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+
+import numpy as np
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor, Document
+
+from lexical_index import tokenize
+from stage_metrics import submit
+
+
+MODEL_FILES = ("model.int8.onnx", "model_quantized.onnx", "model.onnx")
+TOKENIZER_FILE = "tokenizer.json"
+BATCH_SIZE = 16
+MAX_LENGTH = 512
+WORKERS = max(1, min(4, (os.cpu_count() or 1) // 2))
+
+_models = {}
+_models_lock = threading.Lock()
+_scoring_pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="rerank")
+
+
+class ScoringReranker(BaseDocumentCompressor, ABC):
+    """
+    Base class for rerankers that score every (query, document) pair.
+
+    Subclasses implement score(); compress_documents sorts by score, stores it
+    as "relevance_score" (as CohereRerank does) and keeps the top_n.
+    `min_confidence` is the best score below which results count as weak, on
+    this reranker's own scale (used by adaptive retrieval depth).
+    """
+
+    top_n: int = 20
+    min_confidence: float = 0.5
+
+    @abstractmethod
+    def score(self, query, texts):
+        """
+        Returns one relevance score per text, higher is more relevant.
+        """
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None,
+    ) -> Sequence[Document]:
+        documents = list(documents)
+        if not documents:
+            return []
+        scores = self.score(query, [document.page_content for document in documents])
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)[:self.top_n]
+        return [
+            Document(
+                id=documents[i].id,
+                page_content=documents[i].page_content,
+                metadata={**documents[i].metadata, "relevance_score": float(scores[i])},
+            )
+            for i in order
+        ]
+
+
+class LexicalOverlapReranker(ScoringReranker):
+    """
+    Dependency-free fallback: the share of query terms found in the document,
+    with a small bonus for repeated matches. Scores are in [0, 1]; common words
+    alone already score around 0.5, so results are weak below 0.7.
+    """
+
+    min_confidence: float = 0.7
+
+    def score(self, query, texts):
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return [0.0] * len(texts)
+        scores = []
+        for text in texts:
+            terms = tokenize(text)
+            matched = query_terms.intersection(terms)
+            repeats = sum(1 for term in terms if term in query_terms) - len(matched)
+            scores.append(0.9 * len(matched) / len(query_terms) + 0.1 * (1 - 1 / (1 + repeats)))
+        return scores
+
+
+def load_cross_encoder(model_dir):
+    """
+    Loads an ONNX cross-encoder and its tokenizer once per process.
+    Needs the optional onnxruntime and tokenizers packages.
+    """
+    model_dir = os.path.abspath(model_dir)
+    with _models_lock:
+        if model_dir not in _models:
+            try:
+                import onnxruntime
+                from tokenizers import Tokenizer
+            except ImportError as e:
+                raise ImportError("The cross-encoder reranker needs 'onnxruntime' and 'tokenizers' installed") from e
+            model_path = next((os.path.join(model_dir, name) for name in MODEL_FILES if os.path.exists(os.path.join(model_dir, name))), None)
+            if model_path is None:
+                raise FileNotFoundError(f"No ONNX model ({', '.join(MODEL_FILES)}) in '{model_dir}'")
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // WORKERS)
+            session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+            tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+            tokenizer.enable_truncation(MAX_LENGTH)
+            tokenizer.enable_padding()
+            _models[model_dir] = (session, tokenizer)
+        return _models[model_dir]
+
+
+class CrossEncoderReranker(ScoringReranker):
+    """
+    Local CPU cross-encoder (e.g. an int8 ms-marco-MiniLM exported to ONNX).
+
+    Pairs are tokenized and scored in batches of `batch_size`, spread over a
+    shared thread pool; logits are mapped to [0, 1] so scores are comparable
+    with Cohere's relevance scores.
+    """
+
+    model_dir: str
+    batch_size: int = BATCH_SIZE
+
+    def _score_batch(self, query, texts):
+        session, tokenizer = load_cross_encoder(self.model_dir)
+        encodings = tokenizer.encode_batch([(query, text) for text in texts])
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        names = {model_input.name for model_input in session.get_inputs()}
+        logits = session.run(None, {name: value for name, value in feeds.items() if name in names})[0]
+        if logits.ndim == 1 or logits.shape[1] == 1:
+            return [1 / (1 + math.exp(-float(value))) for value in logits.reshape(-1)]
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return (probabilities[:, -1] / probabilities.sum(axis=1)).tolist()
+
+    def score(self, query, texts):
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self._score_batch(query, batches[0])
+        futures = [submit(_scoring_pool, self._score_batch, query, batch) for batch in batches]
+        return [score for future in futures for score in future.result()]
+
+
+def quantize(model_dir):
+    """
+    Writes model.int8.onnx next to model.onnx with dynamic int8 quantization.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(os.path.join(model_dir, "model.onnx"), os.path.join(model_dir, "model.int8.onnx"), weight_type=QuantType.QInt8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepare the local cross-encoder reranker.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    quantize_parser = subparsers.add_parser("quantize", help="Quantize an exported model.onnx to int8")
+    quantize_parser.add_argument("model_dir", help="Directory with model.onnx and tokenizer.json (e.g. from 'optimum-cli export onnx')")
+    args = parser.parse_args()
+    if args.command == "quantize":
+        quantize(args.model_dir)
+        print(f"Wrote {os.path.join(args.model_dir, 'model.int8.onnx')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+
+
+def secret_env_name(secret_name, key):
+    """
+    Environment variable that stands in for one key of a secret,
+    e.g. ("edu-app-secrets", "LANGCHAIN") -> EDU_APP_SECRETS__LANGCHAIN.
+    """
+    return f"{secret_name}__{key}".upper().replace("-", "_")
+
+
+class SecretsProvider:
+    """
+    In-memory cache of Secrets Manager secrets.
+
+    Each secret is fetched once and its JSON parsed once; every key is then
+    served from memory. After `ttl_seconds` the cached value is still returned
+    while a background thread refetches it, so rotation never stalls a request.
+    Environment variables (see secret_env_name) override individual keys, and
+    with source="local" secrets come only from `local_path` (a JSON file of
+    {secret_name: {key: value}}) and the environment, with no AWS calls.
+    With `background_refresh`, a periodic refresh starts with the first fetched
+    secret rather than when the provider is created.
+    on_change() lets clients built from a key be rebuilt after it rotates.
+    """
+
+    def __init__(self, client_factory, ttl_seconds=3600, source="aws", local_path=None, background_refresh=False):
+        self.client_factory = client_factory
+        self.ttl_seconds = ttl_seconds
+        self.source = source
+        self.local_path = local_path
+        self.background_refresh = background_refresh
+        self._client = None
+        self._secrets = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._change_callbacks = []
+        self._refresher = None
+
+    def _secret_lock(self, secret_name):
+        with self._lock:
+            return self._locks.setdefault(secret_name, threading.Lock())
+
+    def _fetch(self, secret_name):
+        if self.source == "local":
+            if not self.local_path or not os.path.exists(self.local_path):
+                return {}
+            with open(self.local_path, encoding="utf-8") as f:
+                return json.load(f).get(secret_name, {})
+        if self._client is None:
+            self._client = self.client_factory()
+        response = self._client.get_secret_value(SecretId=secret_name)
+        if 'SecretString' in response:
+            return json.loads(response['SecretString'])
+        return {}
+
+    def get_secret(self, secret_name):
+        """
+        Returns the parsed secret as a dict, fetching it at most once per TTL.
+        """
+        cached = self._secrets.get(secret_name)
+        if cached is None:
+            with self._secret_lock(secret_name):
+                cached = self._secrets.get(secret_name)
+                if cached is None:
+                    cached = (self._fetch(secret_name), time.time())
+                    self._secrets[secret_name] = cached
+            if self.background_refresh:
+                self.start_background_refresh()
+        elif time.time() - cached[1] > self.ttl_seconds:
+            self._refresh_in_background(secret_name)
+        return cached[0]
+
+    def get(self, secret_name, key, default=None):
+        """
+        Returns one key of a secret; an environment stand-in wins over the fetched value.
+        """
+        value = os.environ.get(secret_env_name(secret_name, key))
+        if value is not None:
+            return value
+        return self.get_secret(secret_name).get(key, default)
+
+    def on_change(self, secret_name, key, callback):
+        """
+        Registers callback() to run after a refresh changes the value of one key.
+        """
+        self._change_callbacks.append((secret_name, key, callback))
+
+    def refresh(self, secret_name):
+        """
+        Refetches a secret now. On failure the previous value is kept.
+        """
+        try:
+            value = self._fetch(secret_name)
+        except Exception as e:
+            print(f"Error refreshing the secret '{secret_name}': {e}")
+            return
+        previous = self._secrets.get(secret_name)
+        self._secrets[secret_name] = (value, time.time())
+        if previous is None:
+            return
+        for name, key, callback in list(self._change_callbacks):
+            if name == secret_name and previous[0].get(key) != value.get(key):
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Error handling the rotation of '{secret_name}/{key}': {e}")
+
+    def _refresh_in_background(self, secret_name):
+        with self._lock:
+            if secret_name in self._refreshing:
+                return
+            self._refreshing.add(secret_name)
+
+        def run():
+            try:
+                self.refresh(secret_name)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(secret_name)
+
+        threading.Thread(target=run, name=f"secret-refresh-{secret_name}", daemon=True).start()
+
+    def start_background_refresh(self, interval_seconds=None):
+        """
+        Starts a daemon thread that refreshes every cached secret periodically,
+        so rotated values are picked up before they expire. Only one such thread
+        runs per provider; later calls return it.
+        """
+        interval_seconds = interval_seconds or max(self.ttl_seconds / 2, 1)
+
+        def run():
+            while True:
+                time.sleep(interval_seconds)
+                for secret_name in list(self._secrets):
+                    self.refresh(secret_name)
+
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=run, name="secrets-refresh", daemon=True)
+                self._refresher.start()
+            return self._refresher
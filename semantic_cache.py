@@ -0,0 +1,115 @@
+import re
+import threading
+import time
+
+import numpy as np
+
+
+# Short questions with these words usually lean on the previous turn
+FOLLOW_UP_PATTERN = re.compile(r"\b(it|its|they|them|their|that|this|those|these|he|she|what about|how about)\b", re.IGNORECASE)
+
+
+def is_follow_up(question, has_history):
+    """
+    True for a short question that refers back to the conversation
+    ("What about part-time students?"), whose answer depends on more than its text.
+    """
+    return has_history and len(question.split()) <= 12 and bool(FOLLOW_UP_PATTERN.search(question))
+
+
+class SemanticAnswerCache:
+    """
+    Local vector index of previously answered questions.
+
+    A new question is embedded and compared (cosine similarity) with the stored
+    questions; above `threshold` the stored answer and source documents are
+    returned and the agent is skipped. Entries are evicted oldest first once
+    `max_entries` is reached, expire after `ttl_seconds`, and the whole cache is
+    dropped whenever `version_fn()` changes, i.e. when the handbook index is rebuilt.
+    The TTL bounds staleness when the index is rebuilt from another host, where
+    no local version change is seen.
+    """
+
+    def __init__(self, embeddings, threshold=0.95, max_entries=2000, version_fn=None, ttl_seconds=None):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_fn = version_fn or (lambda: None)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._times = None
+        self._entries = []
+        self._next = 0
+        self._version = self.version_fn()
+
+    def _embed(self, question):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self):
+        version = self.version_fn()
+        if version != self._version:
+            self._vectors = None
+            self._entries = []
+            self._next = 0
+            self._version = version
+
+    def lookup(self, question):
+        """
+        Returns {'question', 'output', 'sources', 'similarity'} for the closest
+        stored question above the threshold, or None.
+        """
+        vector = self._embed(question)
+        with self._lock:
+            self._check_version()
+            if not self._entries:
+                self.misses += 1
+                return None
+            similarities = self._vectors[:len(self._entries)] @ vector
+            if self.ttl_seconds is not None:
+                similarities[self._times[:len(self._entries)] < time.time() - self.ttl_seconds] = -1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(self._entries[best], similarity=float(similarities[best]))
+
+    def store(self, question, output, sources):
+        """
+        Remembers the answer and source documents for a question.
+        """
+        vector = self._embed(question)
+        with self._lock:
+            self._check_version()
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._times = np.zeros(self.max_entries)
+            entry = {"question": question, "output": output, "sources": list(sources)}
+            slot = self._next % self.max_entries
+            self._vectors[slot] = vector
+            self._times[slot] = time.time()
+            if slot < len(self._entries):
+                self._entries[slot] = entry
+            else:
+                self._entries.append(entry)
+            self._next += 1
+
+    def invalidate(self):
+        """
+        Drops every stored answer.
+        """
+        with self._lock:
+            self._vectors = None
+            self._entries = []
+            self._next = 0
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the number of stored answers.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,115 @@
+import time
+from uuid import uuid4
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+from history_writer import batch_write, to_dynamodb
+
+
+PARTITION_KEY = "SessionId"
+SORT_KEY = "MessageKey"
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def new_message_key():
+    """
+    Sort key for a new message: nanosecond timestamp plus a random suffix, so keys
+    sort chronologically and never collide.
+    """
+    return f"{time.time_ns():020d}#{uuid4().hex[:8]}"
+
+
+def serialize_item(item):
+    return {name: _serializer.serialize(value) for name, value in to_dynamodb(item).items()}
+
+
+def deserialize_item(item):
+    return {name: _deserializer.deserialize(value) for name, value in item.items()}
+
+
+class SessionMessageHistory(BaseChatMessageHistory):
+    """
+    Chat history stored as one DynamoDB item per message.
+
+    Items are keyed by (SessionId, MessageKey), so appending a message is a
+    single put that never reads or rewrites earlier messages, and each session
+    has its own partition. With a `writer` (WriteBehindQueue) puts are batched
+    in the background; reads flush pending writes first.
+    """
+
+    def __init__(self, table_name, session_id, client, writer=None):
+        self.table_name = table_name
+        self.session_id = session_id
+        self.client = client
+        self.writer = writer
+
+    def append(self, message):
+        """
+        Stores a message and returns its sort key, so other records can refer to it.
+        """
+        key = new_message_key()
+        item = serialize_item({
+            PARTITION_KEY: self.session_id,
+            SORT_KEY: key,
+            "Message": message_to_dict(message),
+            "CreatedAt": int(time.time()),
+        })
+        if self.writer is not None:
+            self.writer.put((self.table_name, item))
+        else:
+            self.client.put_item(TableName=self.table_name, Item=item)
+        return key
+
+    def add_message(self, message):
+        self.append(message)
+
+    def _items(self, projection=None):
+        if self.writer is not None:
+            self.writer.flush()
+        kwargs = {
+            "TableName": self.table_name,
+            "KeyConditionExpression": "#pk = :session_id",
+            "ExpressionAttributeNames": {"#pk": PARTITION_KEY},
+            "ExpressionAttributeValues": {":session_id": {"S": self.session_id}},
+            "ScanIndexForward": True,
+        }
+        if projection:
+            kwargs["ProjectionExpression"] = projection
+            kwargs["ExpressionAttributeNames"]["#sk"] = SORT_KEY
+        for page in self.client.get_paginator("query").paginate(**kwargs):
+            for item in page.get("Items", []):
+                yield deserialize_item(item)
+
+    @property
+    def messages(self):
+        return messages_from_dict([item["Message"] for item in self._items()])
+
+    def clear(self):
+        keys = [
+            {"DeleteRequest": {"Key": serialize_item({PARTITION_KEY: item[PARTITION_KEY], SORT_KEY: item[SORT_KEY]})}}
+            for item in self._items(projection="#pk, #sk")
+        ]
+        batch_write(self.client, self.table_name, keys)
+
+
+def create_session_messages_table(client, table_name):
+    """
+    Creates the on-demand (SessionId, MessageKey) table used by SessionMessageHistory.
+    """
+    client.create_table(
+        TableName=table_name,
+        AttributeDefinitions=[
+            {"AttributeName": PARTITION_KEY, "AttributeType": "S"},
+            {"AttributeName": SORT_KEY, "AttributeType": "S"},
+        ],
+        KeySchema=[
+            {"AttributeName": PARTITION_KEY, "KeyType": "HASH"},
+            {"AttributeName": SORT_KEY, "KeyType": "RANGE"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    client.get_waiter("table_exists").wait(TableName=table_name)
@@ -0,0 +1,241 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RESERVOIR_SIZE = 2048
+METRIC_NAME = "edu_chatbot_stage_seconds"
+RETRIEVAL_RUNS = ("Compression", "Adaptive", "MultiQuery")  # retriever names that include the rerank
+
+# Timings of the turn being served; copied into pool threads by submit()
+_current_turn = contextvars.ContextVar("stage_metrics_turn", default=None)
+
+
+class Histogram:
+    """
+    Latency histogram with fixed Prometheus buckets plus a window of recent
+    samples for p50/p95/p99.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.samples.append(seconds)
+
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class StageMetrics:
+    """
+    Process-wide per-stage latency histograms.
+
+    Observations made inside turn() are also collected into that turn's timings,
+    so a single request can be inspected next to the aggregates. The turn is held
+    in a context variable: work handed to a pool through submit() still reports
+    to it, and observations arriving after the turn ended are left out.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+            turn = _current_turn.get()
+            if turn is not None and turn["open"]:
+                turn["timings"].setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        """
+        Context manager recording the wall time of its block under `stage`.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    @contextmanager
+    def turn(self):
+        """
+        Collects the stage timings of one chat turn; yields a {stage: [seconds]} dict.
+        """
+        timings = {}
+        turn = {"timings": timings, "open": True}
+        token = _current_turn.set(turn)
+        start = time.perf_counter()
+        try:
+            yield timings
+        finally:
+            _current_turn.reset(token)
+            with self._lock:
+                turn["open"] = False
+            seconds = time.perf_counter() - start
+            self.observe("turn", seconds)
+            timings.setdefault("turn", []).append(seconds)
+
+    def snapshot(self):
+        """
+        Returns one row per stage with count, mean and p50/p95/p99 in seconds.
+        """
+        with self._lock:
+            return [
+                {
+                    "stage": stage,
+                    "count": histogram.count,
+                    "mean": histogram.sum / histogram.count if histogram.count else None,
+                    "p50": histogram.percentile(50),
+                    "p95": histogram.percentile(95),
+                    "p99": histogram.percentile(99),
+                }
+                for stage, histogram in sorted(self._histograms.items())
+            ]
+
+    def render_prometheus(self):
+        """
+        Renders every histogram in the Prometheus text exposition format.
+        """
+        lines = [f"# HELP {METRIC_NAME} Latency of chatbot pipeline stages.", f"# TYPE {METRIC_NAME} histogram"]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+stage_metrics = StageMetrics()
+
+
+def timed(stage):
+    """
+    Shortcut for stage_metrics.timed(stage).
+    """
+    return stage_metrics.timed(stage)
+
+
+def submit(executor, fn, *args, **kwargs):
+    """
+    executor.submit() that runs `fn` in a copy of the caller's context, so stage
+    timings recorded on the pool thread reach the caller's turn.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class StageTimingCallbackHandler(BaseCallbackHandler):
+    """
+    Records LLM calls, agent iterations and retriever runs of one turn.
+    The vector query stage is the base retriever run (query embedding included);
+    "retrieval" is a whole retrieve-and-rerank run (compression, adaptive or multi-query).
+    """
+
+    run_inline = True  # on async runs, called on the turn's thread so observations reach its timings
+
+    def __init__(self):
+        self._starts = {}
+        self._retriever_names = {}
+        self._last_step = time.perf_counter()
+
+    def _start(self, run_id):
+        self._starts[run_id] = time.perf_counter()
+
+    def _end(self, run_id, stage):
+        start = self._starts.pop(run_id, None)
+        if start is not None:
+            stage_metrics.observe(stage, time.perf_counter() - start)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id, "llm")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, "llm_error")
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id)
+        self._retriever_names[run_id] = kwargs.get("name") or (serialized or {}).get("name", "")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        name = self._retriever_names.pop(run_id, "")
+        self._end(run_id, "retrieval" if any(part in name for part in RETRIEVAL_RUNS) else "vector_query")
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._retriever_names.pop(run_id, None)
+        self._end(run_id, "retrieval_error")
+
+    def _step(self):
+        now = time.perf_counter()
+        stage_metrics.observe("agent_iteration", now - self._last_step)
+        self._last_step = now
+
+    def on_agent_action(self, action, **kwargs):
+        self._step()
+
+    def on_agent_finish(self, finish, **kwargs):
+        self._step()
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = stage_metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """
+    Serves the Prometheus text export on http://<host>:<port>/ from a daemon thread (once per process).
+    Binds to localhost unless another interface is given.
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsRequestHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
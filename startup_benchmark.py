@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+
+ENTRY_MODULE = "chat_st"
+IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+EMBEDDING_DIMENSIONS = 1024
+INDEX_NAME = "startup-benchmark"  # stand-in snapshot; passed to the child as INDEX_NAME
+
+
+def offline_environment(workdir):
+    """
+    Environment that points every network dependency at a local stand-in:
+    secrets from a JSON file, a tiny local vector snapshot instead of Pinecone,
+    dummy AWS credentials and no instance-metadata lookups.
+    Only the child imports the app: importing aws_secrets_initialization here
+    would load the app and its clients in this process.
+    """
+    import numpy as np
+    from local_vector_store import write_snapshot
+
+    secrets_file = os.path.join(workdir, "secrets.json")
+    with open(secrets_file, "w", encoding="utf-8") as f:
+        json.dump({
+            "edu-app-secrets": {"PINECONE_API_KEY": "offline", "LANGCHAIN": "offline"},
+            "policy-app-secrets": {"COHERE_API_KEY": "offline"},
+        }, f)
+    vectors = np.random.default_rng(0).normal(size=(8, EMBEDDING_DIMENSIONS)).astype(np.float32)
+    records = [{"id": str(i), "text": f"chunk {i}", "metadata": {"title": "Stand-in", "page": i, "source": ""}} for i in range(8)]
+    write_snapshot(os.path.join(workdir, INDEX_NAME), vectors, records)
+    return dict(
+        os.environ,
+        SECRETS_SOURCE="local",
+        SECRETS_FILE=secrets_file,
+        INDEX_NAME=INDEX_NAME,
+        VECTOR_STORE_BACKEND="local",
+        LOCAL_INDEX_DIR=workdir,
+        PROMPT_HUB_SYNC="false",
+        AWS_ACCESS_KEY_ID="offline",
+        AWS_SECRET_ACCESS_KEY="offline",
+        AWS_DEFAULT_REGION="us-east-1",
+        AWS_EC2_METADATA_DISABLED="true",
+        LANGCHAIN_TRACING_V2="false",
+    )
+
+
+def run_child():
+    """
+    Runs inside the benchmark subprocess: imports the entry module, then builds
+    every lazily initialized component and prints the timings as JSON.
+    """
+    start = time.perf_counter()
+    __import__(ENTRY_MODULE)
+    import_seconds = time.perf_counter() - start
+    from lazy_init import startup_report, warm_up
+    start = time.perf_counter()
+    warm_up()
+    warm_up_seconds = time.perf_counter() - start
+    print(json.dumps({"import_seconds": import_seconds, "warm_up_seconds": warm_up_seconds, "initializers": startup_report()}))
+
+
+def parse_import_times(stderr):
+    """
+    Parses `python -X importtime` output into per-module rows and per-package totals.
+    A package total is the self time of all its modules, so nothing is counted twice.
+    """
+    modules, packages = [], defaultdict(int)
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        modules.append({"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000, "depth": (len(indent) - 1) // 2})
+        packages[name.split(".")[0]] += self_us
+    return modules, {name: us / 1000 for name, us in sorted(packages.items(), key=lambda item: -item[1])}
+
+
+def run_benchmark():
+    """
+    Runs the entry module's import graph and initializers in a fresh interpreter
+    with network stand-ins.
+
+    Returns:
+    dict: Import time per module and package, and wall time per initializer
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        env = offline_environment(workdir)
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env, capture_output=True, text=True,
+        )
+        wall_seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup benchmark child failed:\n{result.stderr[-4000:]}")
+    modules, packages = parse_import_times(result.stderr)
+    child = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        "wall_ms": wall_seconds * 1000,
+        "import_ms": child["import_seconds"] * 1000,
+        "warm_up_ms": child["warm_up_seconds"] * 1000,
+        "packages_ms": packages,
+        "modules": modules,
+        "initializers": child["initializers"],
+    }
+
+
+def check_budget(results, budget):
+    """
+    Compares results with a budget of the form
+    {"import_ms": ..., "warm_up_ms": ..., "packages_ms": {name: ms}, "initializers_ms": {name: ms}}.
+
+    Returns:
+    list: One message per exceeded limit
+    """
+    failures = []
+    for key in ("wall_ms", "import_ms", "warm_up_ms"):
+        if key in budget and results[key] > budget[key]:
+            failures.append(f"{key}: {results[key]:.0f} ms > {budget[key]:.0f} ms")
+    for name, limit in budget.get("packages_ms", {}).items():
+        actual = results["packages_ms"].get(name, 0.0)
+        if actual > limit:
+            failures.append(f"import {name}: {actual:.0f} ms > {limit:.0f} ms")
+    initializers = {row["component"]: (row["seconds"] or 0.0) * 1000 for row in results["initializers"]}
+    for name, limit in budget.get("initializers_ms", {}).items():
+        if initializers.get(name, 0.0) > limit:
+            failures.append(f"initializer {name}: {initializers[name]:.0f} ms > {limit:.0f} ms")
+    return failures
+
+
+def format_results(results, top=15):
+    lines = [
+        f"Startup of {ENTRY_MODULE}: wall {results['wall_ms']:.0f} ms, "
+        f"import {results['import_ms']:.0f} ms, warm-up {results['warm_up_ms']:.0f} ms",
+        "",
+        f"{'package':<32}{'import ms':>12}",
+    ]
+    for name, ms in list(results["packages_ms"].items())[:top]:
+        lines.append(f"{name:<32}{ms:>12.1f}")
+    lines += ["", f"{'initializer':<32}{'ms':>12}  status"]
+    for row in results["initializers"]:
+        ms = "" if row["seconds"] is None else f"{row['seconds'] * 1000:.1f}"
+        lines.append(f"{row['component']:<32}{ms:>12}  {row['status']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Measure import and initialization time of {ENTRY_MODULE} with network stand-ins.")
+    parser.add_argument("--budget", help="JSON budget file; exit with status 1 when any limit is exceeded")
+    parser.add_argument("--json", action="store_true", help="Print the full results as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child()
+        return
+
+    results = run_benchmark()
+    print(json.dumps(results, indent=2) if args.json else format_results(results))
+    if args.budget:
+        with open(args.budget, encoding="utf-8") as f:
+            failures = check_budget(results, json.load(f))
+        if failures:
+            print("\nStartup budget exceeded:\n" + "\n".join(failures))
+            sys.exit(1)
+        print("\nStartup budget met")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+import re
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from stage_metrics import stage_metrics
+
+
+ACTION_PATTERN = re.compile(r'"action"\s*:\s*"((?:[^"\\]|\\.)*)"')
+ACTION_INPUT_PATTERN = re.compile(r'"action_input"\s*:\s*"')
+FINAL_ANSWER = "Final Answer"
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class FinalAnswerStreamParser:
+    """
+    Incrementally parses the agent's JSON action blob as tokens arrive.
+
+    Text of "action_input" is decoded as soon as it streams in, but only
+    released once "action" is known to be "Final Answer"; tool calls yield nothing.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.action = None
+        self.position = None
+        self.pending = ""
+        self.done = False
+
+    def feed(self, chunk):
+        """
+        Adds a chunk of model output and returns newly available answer text.
+        """
+        self.buffer += chunk
+        if self.action is None:
+            match = ACTION_PATTERN.search(self.buffer)
+            if match:
+                self.action = json.loads(f'"{match.group(1)}"')
+        if self.position is None:
+            match = ACTION_INPUT_PATTERN.search(self.buffer)
+            if match:
+                self.position = match.end()
+        if self.position is not None and not self.done:
+            self.pending += self._decode()
+        if self.action == FINAL_ANSWER and self.pending:
+            text, self.pending = self.pending, ""
+            return text
+        return ""
+
+    def _decode(self):
+        text = []
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                text.append(char)
+                self.position += 1
+                continue
+            if self.position + 1 >= len(self.buffer):
+                break
+            escape = self.buffer[self.position + 1]
+            if escape == "u":
+                if self.position + 6 > len(self.buffer):
+                    break
+                text.append(chr(int(self.buffer[self.position + 2:self.position + 6], 16)))
+                self.position += 6
+            else:
+                text.append(ESCAPES.get(escape, escape))
+                self.position += 2
+        return "".join(text)
+
+
+class StreamingAnswerHandler(BaseCallbackHandler):
+    """
+    Callback handler that streams the final answer into a Streamlit placeholder.
+
+    With parse_json=True (agent mode) each LLM call is parsed with a
+    FinalAnswerStreamParser; otherwise every token is answer text (direct pipeline).
+    """
+
+    run_inline = True  # Streamlit elements can only be updated from the script thread
+
+    def __init__(self, placeholder, parse_json=True):
+        self.placeholder = placeholder
+        self.parse_json = parse_json
+        self.parser = FinalAnswerStreamParser()
+        self.text = ""
+        self.started_at = time.perf_counter()
+        self.first_token_seconds = None
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.parser = FinalAnswerStreamParser()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.parser = FinalAnswerStreamParser()
+
+    def on_llm_new_token(self, token, **kwargs):
+        if not isinstance(token, str):
+            return
+        delta = self.parser.feed(token) if self.parse_json else token
+        if not delta:
+            return
+        if self.first_token_seconds is None:
+            self.first_token_seconds = time.perf_counter() - self.started_at
+            stage_metrics.observe("time_to_first_token", self.first_token_seconds)
+        self.text += delta
+        self.placeholder.markdown(self.text + "▌")
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Optional
+
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+
+from adaptive_retrieval import (
+    DEFAULT_DEPTH_LIMITS, MIN_RERANK_CONFIDENCE, AdaptiveRetriever, confidence_threshold, depth_stats, is_flat,
+    top_confidence,
+)
+from lexical_index import BM25Index
+from offline_fakes import FakeVectorStore, HashEmbeddings, synthetic_corpus
+from rerank_cache import CachedRerank, RerankCache
+from rerankers import CrossEncoderReranker, LexicalOverlapReranker
+
+
+class ConstantReranker(BaseDocumentCompressor):
+    """
+    Scores every document `value` and records how many documents each call reranked.
+    """
+
+    value: float = 0.0
+    min_confidence: Optional[float] = None
+    batches: list = []
+
+    def compress_documents(self, documents, query, callbacks=None):
+        self.batches.append(len(documents))
+        return [Document(page_content=d.page_content, metadata={**d.metadata, "relevance_score": self.value}) for d in documents]
+
+
+def retriever(reranker, **kwargs):
+    texts, metadatas = synthetic_corpus()
+    store = FakeVectorStore.from_texts(texts, HashEmbeddings(), metadatas=metadatas)
+    return AdaptiveRetriever(vector_store=store, compressor=reranker, lexical_index=BM25Index.from_texts(texts), **kwargs)
+
+
+LIMITS = {"simple": {"initial_k": 5, "max_k": 20, "top_n": 3}}
+
+
+def test_flatness_and_confidence_helpers():
+    assert is_flat([0.81, 0.80, 0.79])
+    assert not is_flat([0.9, 0.5])
+    assert not is_flat([0.9])
+    assert top_confidence([Document(page_content="a", metadata={"relevance_score": 0.3})]) == 0.3
+    assert top_confidence([]) == 0.0
+
+
+def test_retrieval_only_sees_standalone_query_classes():
+    assert "follow_up" not in DEFAULT_DEPTH_LIMITS
+
+
+def test_threshold_is_per_reranker_and_seen_through_the_cache():
+    reranker = ConstantReranker(min_confidence=0.7)
+    assert confidence_threshold(reranker) == 0.7
+    assert confidence_threshold(CachedRerank(base_compressor=reranker, cache=RerankCache())) == 0.7
+    assert confidence_threshold(ConstantReranker()) == MIN_RERANK_CONFIDENCE
+    assert confidence_threshold(object()) == MIN_RERANK_CONFIDENCE
+
+
+def test_local_rerankers_declare_their_own_scale():
+    lexical = LexicalOverlapReranker()
+    assert confidence_threshold(lexical) == lexical.min_confidence != MIN_RERANK_CONFIDENCE
+    assert confidence_threshold(CachedRerank(base_compressor=lexical, cache=RerankCache())) == lexical.min_confidence
+    assert confidence_threshold(CrossEncoderReranker(model_dir="unused")) == 0.5
+
+
+def test_confident_results_do_not_widen():
+    reranker = ConstantReranker(value=0.4, min_confidence=0.3, batches=[])
+    documents = retriever(reranker, limits=LIMITS, flat_spread=0.0).invoke("What is the Pell Grant?")
+    assert reranker.batches == [5]
+    assert len(documents) == 3
+
+
+def test_weak_results_widen_and_rerank_only_new_candidates():
+    depth_stats.reset()
+    reranker = ConstantReranker(value=0.4, min_confidence=0.5, batches=[])
+    documents = retriever(reranker, limits=LIMITS, flat_spread=0.0).invoke("What is the Pell Grant?")
+    assert len(reranker.batches) > 1
+    assert sum(reranker.batches) <= 20
+    assert len(documents) == 3
+    assert depth_stats.stats()["widened"] == 1
+
+
+def test_sync_and_async_agree():
+    adaptive = retriever(LexicalOverlapReranker(top_n=100))
+    query = "independent student dependency override"
+    sync = [document.page_content for document in adaptive.invoke(query)]
+    assert sync == [document.page_content for document in asyncio.run(adaptive.ainvoke(query))]
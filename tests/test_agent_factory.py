@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("langchain")
+
+import agent_factory
+from agent_factory import AgentFactory
+
+
+class RecordingExecutor:
+    def __init__(self, agent, tools, **kwargs):
+        self.agent = agent
+
+    def invoke(self, inputs, config):
+        return {"output": f"answer to {inputs['input']}", "history": inputs["chat_history"]}
+
+    async def ainvoke(self, inputs, config):
+        return self.invoke(inputs, config)
+
+
+class RecordingMemory:
+    def __init__(self):
+        self.saved = []
+
+    def load_memory_variables(self, inputs):
+        return {"chat_history": list(self.saved)}
+
+    def save_context(self, inputs, outputs):
+        self.saved.append((inputs["input"], outputs["output"]))
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    builds = []
+
+    def create_agent(llm, tools, prompt):
+        builds.append((llm, prompt))
+        time.sleep(0.02)
+        return object()
+
+    monkeypatch.setattr(agent_factory, "create_json_chat_agent", create_agent)
+    monkeypatch.setattr(agent_factory, "AgentExecutor", RecordingExecutor)
+    return builds
+
+
+def test_executor_is_built_once_and_shared(builds):
+    prompts = []
+    factory = AgentFactory(lambda: "llm", [], lambda: prompts.append(1) or "prompt")
+    executors = []
+    threads = [threading.Thread(target=lambda: executors.append(factory.get_executor())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert builds == [("llm", "prompt")]
+    assert len(prompts) == 1
+    assert len({id(executor) for executor in executors}) == 1
+
+
+def test_reload_rebuilds_with_the_new_prompt_and_model(builds):
+    factory = AgentFactory(lambda: "llm", [], lambda: "prompt")
+    first = factory.get_executor()
+
+    factory.reload(prompt="new prompt", llm="new llm")
+
+    assert factory.get_executor() is not first
+    assert builds[-1] == ("new llm", "new prompt")
+    assert factory.generation == 1
+
+
+def test_invoke_binds_the_session_memory(builds):
+    factory = AgentFactory(lambda: "llm", [], lambda: "prompt")
+    memory = RecordingMemory()
+
+    factory.invoke("first", memory)
+    response = factory.invoke("second", memory)
+
+    assert response["history"] == [("first", "answer to first")]
+    assert memory.saved[-1] == ("second", "answer to second")
+    assert len(builds) == 1
+
+
+def test_ainvoke_shares_the_executor_and_memory(builds):
+    factory = AgentFactory(lambda: "llm", [], lambda: "prompt")
+    memory = RecordingMemory()
+
+    factory.invoke("first", memory)
+    response = asyncio.run(factory.ainvoke("second", memory))
+
+    assert response["history"] == [("first", "answer to first")]
+    assert memory.saved[-1] == ("second", "answer to second")
+    assert len(builds) == 1
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+from langchain_core.documents import Document
+
+from lexical_index import BM25Index, adense_search, alexical_search
+from offline_fakes import HashEmbeddings
+from stage_metrics import stage_metrics, timed
+
+
+class SyncOnlyStore:
+    """
+    Vector store without a native async search, recording the calling thread.
+    """
+
+    def __init__(self):
+        self.embeddings = HashEmbeddings(latency=0.0)
+        self.threads = []
+
+    def similarity_search_by_vector_with_score(self, vector, k):
+        self.threads.append(threading.current_thread())
+        with timed("vector_query"):
+            return [(Document(page_content=f"hit {i}"), 1.0 - i / 10) for i in range(k)]
+
+
+def test_dense_search_without_native_async_runs_off_the_loop():
+    store = SyncOnlyStore()
+
+    async def search():
+        return threading.current_thread(), await adense_search(store, "pell grant", 3)
+
+    loop_thread, results = asyncio.run(search())
+
+    assert [document.page_content for document, _ in results] == ["hit 0", "hit 1", "hit 2"]
+    assert store.threads and store.threads[0] is not loop_thread
+
+
+def test_executor_searches_record_on_the_turn():
+    store = SyncOnlyStore()
+    index = BM25Index.from_texts(["Pell Grant eligibility", "Direct Loan limits"])
+
+    async def search():
+        return await asyncio.gather(adense_search(store, "pell grant", 2), alexical_search(index, "pell", 1))
+
+    with stage_metrics.turn() as timings:
+        asyncio.run(search())
+
+    assert len(timings["vector_query"]) == 1
+    assert len(timings["lexical_query"]) == 1
+
+
+def test_dense_search_uses_a_precomputed_vector():
+    store = SyncOnlyStore()
+    embedded = []
+    store.embeddings.aembed_query = lambda text: embedded.append(text)
+
+    asyncio.run(adense_search(store, "pell grant", 1, vector=[0.0] * 8))
+
+    assert embedded == []
+
+
+def test_lexical_search_runs_on_the_lexical_pool(monkeypatch):
+    index = BM25Index.from_texts(["Pell Grant eligibility", "Direct Loan limits"])
+    threads = []
+    search = index.search_documents
+    monkeypatch.setattr(index, "search_documents", lambda query, k: threads.append(threading.current_thread().name) or search(query, k))
+
+    documents = asyncio.run(alexical_search(index, "pell", 1))
+
+    assert [document.page_content for document in documents] == ["Pell Grant eligibility"]
+    assert threads[0].startswith("lexical")
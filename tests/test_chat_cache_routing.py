@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("langchain_cohere")
+
+from pipeline_benchmark import OFFLINE_ENVIRONMENT
+
+os.environ.update(OFFLINE_ENVIRONMENT)
+
+from langchain_core.chat_history import InMemoryChatMessageHistory  # noqa: E402
+
+from offline_fakes import install_fakes  # noqa: E402
+from windowed_memory import WindowedSummaryMemory  # noqa: E402
+
+
+@pytest.fixture
+def memory():
+    install_fakes(latency={})
+    from aws_secrets_initialization import get_llm
+    return WindowedSummaryMemory(chat_memory=InMemoryChatMessageHistory(), state={}, llm_loader=get_llm)
+
+
+def test_follow_ups_skip_the_answer_cache(memory):
+    from chat_st import is_cacheable
+    assert is_cacheable("What about part-time students?", memory)
+    memory.save_context({"input": "How is the Pell Grant calculated?"}, {"output": "From the SAI."})
+    assert not is_cacheable("What about part-time students?", memory)
+    assert is_cacheable("How is the Pell Grant calculated for part-time students?", memory)
+
+
+def test_follow_up_is_not_served_another_sessions_answer(memory):
+    from chat_st import answer_from_cache, cache_chat_response, is_cacheable
+    from langchain_core.agents import AgentAction
+    step = AgentAction(tool="Knowledge Base", tool_input="loans", log="")
+    cache_chat_response("What about part-time students?", {"output": "Loan answer", "intermediate_steps": [(step, [])]})
+    memory.save_context({"input": "How is the Pell Grant calculated?"}, {"output": "From the SAI."})
+    question = "What about part-time students?"
+    response = answer_from_cache(question, memory) if is_cacheable(question, memory) else None
+    assert response is None
@@ -0,0 +1,79 @@
+import asyncio
+import sys
+import types
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.language_models import FakeListChatModel
+
+MODEL = FakeListChatModel(responses=["According to the handbook, yes."])
+DOCUMENTS = [Document(page_content="Pell rules.", metadata={"title": "Volume 7", "page": 3})]
+
+
+async def aretrieve_documents(query):
+    return list(DOCUMENTS)
+
+
+@pytest.fixture
+def direct_pipeline(monkeypatch):
+    # aws_secrets_initialization needs streamlit and chat_retrieval the app clients; the pipeline only needs these names
+    monkeypatch.setitem(sys.modules, "aws_secrets_initialization", types.SimpleNamespace(get_llm=lambda: MODEL))
+    monkeypatch.setitem(sys.modules, "chat_retrieval", types.SimpleNamespace(
+        knowledge_base_tool=types.SimpleNamespace(name="Knowledge Base"),
+        retrieve_documents=lambda query: list(DOCUMENTS),
+        aretrieve_documents=aretrieve_documents))
+    monkeypatch.delitem(sys.modules, "direct_pipeline", raising=False)
+    import direct_pipeline
+    return direct_pipeline
+
+
+@pytest.mark.parametrize("question, has_history, expected", [
+    ("Hello!", False, "chit_chat"),
+    ("What about credit balances?", True, "follow_up"),
+    ("What about them?", False, "simple"),
+    ("Compare Federal Work-Study and Direct Loans", False, "multi_hop"),
+    ("Who is eligible? When do they apply?", False, "multi_hop"),
+    ("Who is eligible for a Pell Grant?", True, "simple"),
+])
+def test_classify_question(direct_pipeline, question, has_history, expected):
+    assert direct_pipeline.classify_question(question, has_history=has_history) == expected
+
+
+def test_route_question(direct_pipeline):
+    route_question = direct_pipeline.route_question
+    assert route_question("Hello!", "direct") == "direct"
+    assert route_question("Who is eligible for a Pell Grant?", "agent") == "agent"
+    assert route_question("Who is eligible for a Pell Grant?", "auto") == "direct"
+    assert route_question("Compare grants and loans", "auto") == "agent"
+    assert route_question("What about them?", "auto", has_history=True) == "agent"
+
+
+def test_format_context_numbers_excerpts(direct_pipeline):
+    context = direct_pipeline.format_context([
+        Document(page_content="Pell rules.", metadata={"title": "Volume 7", "page": 3}),
+        Document(page_content="Loan limits.", metadata={}),
+    ])
+    assert context == "[1] Volume 7, page 3:\nPell rules.\n\n[2] , page :\nLoan limits."
+
+
+def test_direct_pipeline_retrieves_once_and_answers(direct_pipeline):
+    question = "Who is eligible for a Pell Grant?"
+
+    response = direct_pipeline.run_direct_pipeline(question)
+
+    (step, documents), = response["intermediate_steps"]
+    assert step.tool == "Knowledge Base"
+    assert step.tool_input == question
+    assert documents == DOCUMENTS
+    assert response["output"] == "According to the handbook, yes."
+
+
+def test_async_pipeline_matches_the_sync_one(direct_pipeline):
+    question = "Who is eligible for a Pell Grant?"
+
+    response = asyncio.run(direct_pipeline.arun_direct_pipeline(question))
+
+    (step, documents), = response["intermediate_steps"]
+    assert step.tool_input == question
+    assert documents == DOCUMENTS
+    assert response["output"] == "According to the handbook, yes."
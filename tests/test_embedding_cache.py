@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+import embedding_cache
+from embedding_cache import CachedEmbeddings, EmbeddingCache, embedding_cache_key, normalize_query
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.calls = []
+
+    def embed_query(self, text):
+        self.calls.append(text)
+        return [float(len(text)), 0.5]
+
+    def embed_documents(self, texts):
+        self.calls.extend(texts)
+        return [[float(len(text)), 0.5] for text in texts]
+
+
+def test_normalization_and_keys():
+    assert normalize_query("  What IS\tthe Pell Grant? ") == "what is the pell grant?"
+    assert embedding_cache_key("Pell grant", "m") == embedding_cache_key("pell  GRANT", "m")
+    assert embedding_cache_key("pell grant", "m") != embedding_cache_key("pell grant", "other-model")
+
+
+def test_repeated_queries_hit_the_cache():
+    base = CountingEmbeddings()
+    cached = CachedEmbeddings(base, "m", EmbeddingCache())
+    assert cached.embed_query("Pell grant") == cached.embed_query("pell grant")
+    assert base.calls == ["Pell grant"]
+    assert cached.cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_documents_only_embed_misses():
+    base = CountingEmbeddings()
+    cached = CachedEmbeddings(base, "m", EmbeddingCache())
+    cached.embed_query("a")
+    vectors = cached.embed_documents(["a", "bb", "ccc"])
+    assert base.calls == ["a", "bb", "ccc"]
+    assert [vector[0] for vector in vectors] == [1.0, 2.0, 3.0]
+
+
+def test_async_methods_share_the_cache():
+    base = CountingEmbeddings()
+    cached = CachedEmbeddings(base, "m", EmbeddingCache())
+    cached.embed_query("pell")
+    assert asyncio.run(cached.aembed_query("PELL")) == cached.embed_query("pell")
+    asyncio.run(cached.aembed_documents(["pell", "loan"]))
+    assert base.calls == ["pell", "loan"]
+
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    cache = EmbeddingCache(max_entries=2, ttl_seconds=10)
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    for key in "abc":
+        cache.put(key, [1.0])
+    assert cache.get("a") is None
+    assert cache.get("c") == [1.0]
+    now[0] += 11
+    assert cache.get("c") is None
+
+
+def test_sqlite_tier_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite3")
+    EmbeddingCache(path=path).put("key", [0.25, 0.5], "m")
+    other = EmbeddingCache(path=path)
+    assert other.get("key") == pytest.approx([0.25, 0.5])
+    other.clear()
+    assert EmbeddingCache(path=path).get("key") is None
+
+
+def test_sqlite_tier_is_trimmed_to_its_row_limit(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"), max_disk_entries=3, trim_every=2)
+    for key in "abcdef":
+        now[0] += 1
+        cache.put(key, [1.0])
+    assert cache.disk_size() == 3
+    fresh = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"))
+    assert fresh.get("a") is None
+    assert fresh.get("f") == [1.0]
+
+
+def test_expired_sqlite_rows_are_deleted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    path = str(tmp_path / "embeddings.sqlite3")
+    EmbeddingCache(path=path, ttl_seconds=10).put("old", [1.0])
+    now[0] += 5
+    EmbeddingCache(path=path, ttl_seconds=10).put("new", [1.0])
+    now[0] += 6
+    cache = EmbeddingCache(path=path, ttl_seconds=10)
+    assert cache.disk_size() == 1
+    now[0] += 5
+    assert cache.get("new") is None
+    assert cache.disk_size() == 0
@@ -0,0 +1,43 @@
+import pytest
+
+from feedback_store import FIELDS, FeedbackStore, SQLiteFeedbackSink
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeedbackStore(SQLiteFeedbackSink(str(tmp_path / "feedback.db")), flush_interval=0.05)
+    yield store
+    store.writer.close()
+
+
+def test_records_are_flushed_to_the_sink(store):
+    first = store.record("s1", "m1", 1, "helpful")
+    second = store.record("s1", "m2", 0, "wrong deadline", user_id="u2")
+    store.writer.flush()
+
+    records = store.sink.export()
+    assert [r["feedback_id"] for r in records] == [first, second]
+    assert {k: records[1][k] for k in ("session_id", "message_key", "user_id", "score", "feedback_text")} == {
+        "session_id": "s1", "message_key": "m2", "user_id": "u2", "score": 0, "feedback_text": "wrong deadline",
+    }
+    assert set(records[0]) == set(FIELDS)
+
+
+def test_sink_is_append_only_and_idempotent(tmp_path):
+    sink = SQLiteFeedbackSink(str(tmp_path / "feedback.db"))
+    record = {"session_id": "s1", "feedback_id": "f1", "message_key": "m1", "user_id": "u", "timestamp": 1, "score": 1, "feedback_text": ""}
+    sink([record])
+    sink([dict(record, score=0)])
+    assert [r["score"] for r in sink.export()] == [1]
+
+
+def test_export_writes_file(store, tmp_path):
+    pytest.importorskip("pandas")
+    store.record("s1", "m1", 1, "great")
+    path = tmp_path / "feedback.csv"
+
+    df = store.export(str(path))
+
+    assert list(df.columns) == FIELDS
+    assert len(df) == 1
+    assert path.read_text().splitlines()[0] == ",".join(FIELDS)
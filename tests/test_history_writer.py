@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+import history_writer
+from history_writer import DynamoDBItemSink, WriteBehindQueue, batch_write, to_dynamodb
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(history_writer.time, "sleep", lambda seconds: None)
+
+
+class ThrottlingClient:
+    """
+    BatchWriteItem stand-in that leaves the first `throttled` calls' items unprocessed.
+    """
+
+    def __init__(self, throttled=0):
+        self.throttled = throttled
+        self.calls = 0
+        self.items = []
+
+    def batch_write_item(self, RequestItems):
+        self.calls += 1
+        if self.calls <= self.throttled:
+            return {"UnprocessedItems": RequestItems}
+        for requests in RequestItems.values():
+            self.items.extend(request["PutRequest"]["Item"] for request in requests)
+        return {"UnprocessedItems": {}}
+
+
+def puts(count):
+    return [{"PutRequest": {"Item": {"id": {"S": str(i)}}}} for i in range(count)]
+
+
+def test_batch_write_chunks_by_25_and_retries_unprocessed_items():
+    client = ThrottlingClient(throttled=2)
+    batch_write(client, "table", puts(30))
+    assert len(client.items) == 30
+    assert client.calls == 4
+
+
+def test_batch_write_gives_up_under_sustained_throttling():
+    client = ThrottlingClient(throttled=1000)
+    with pytest.raises(RuntimeError, match="unprocessed"):
+        batch_write(client, "table", puts(3), max_attempts=4)
+    assert client.calls == 4
+
+
+def test_queue_retries_then_counts_failures():
+    client = ThrottlingClient(throttled=1000)
+    writer = WriteBehindQueue(DynamoDBItemSink(client), max_retries=2, flush_interval=0.01, name="test-writer")
+    writer.put(("table", {"id": {"S": "1"}}))
+    writer.flush()
+    metrics = writer.metrics()
+    assert metrics["failed"] == 1
+    assert metrics["retries"] == 1
+    writer.close()
+
+
+def test_flush_writes_everything_in_batches():
+    written = []
+    writer = WriteBehindQueue(written.extend, batch_size=10, flush_interval=0.01)
+    for i in range(35):
+        assert writer.put(i)
+    writer.flush()
+    assert sorted(written) == list(range(35))
+    assert writer.metrics()["written"] == 35
+    writer.close()
+
+
+def test_full_queue_and_closed_queue_drop_items():
+    release = threading.Event()
+    writer = WriteBehindQueue(lambda items: release.wait(), max_size=1, batch_size=1, flush_interval=0.01)
+    results = [writer.put(i) for i in range(5)]
+    assert not all(results)
+    release.set()
+    writer.close()
+    assert writer.put("late") is False
+    metrics = writer.metrics()
+    assert metrics["dropped"] == results.count(False) + 1
+
+
+def test_floats_are_converted_for_dynamodb():
+    item = to_dynamodb({"score": 0.5, "nested": [1.25]})
+    assert str(item["score"]) == "0.5"
+    assert str(item["nested"][0]) == "1.25"
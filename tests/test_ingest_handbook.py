@@ -0,0 +1,79 @@
+import os
+import sys
+import types
+
+import pytest
+
+from local_vector_store import LocalVectorStore
+from secrets_provider import SecretsProvider
+
+for module in ("pinecone", "langchain_pinecone"):
+    pytest.importorskip(module)
+
+
+@pytest.fixture
+def ingest_handbook(monkeypatch):
+    # aws_secrets_initialization needs streamlit and AWS configuration; ingestion only needs its names
+    monkeypatch.setitem(sys.modules, "aws_secrets_initialization", types.SimpleNamespace(
+        INDEX_NAME="test", LOCAL_INDEX_DIR="", LOCAL_INDEX_KIND="auto", REGION_NAME="us-east-1",
+        PINECONE_API_KEY_SECRET=("app", "PINECONE_API_KEY"), get_embeddings=lambda: None, get_pinecone_api_key=lambda: "key",
+        secrets_provider=SecretsProvider(lambda: None, source="local")))
+    for module in ("vector_store_registry", "ingest_handbook"):
+        monkeypatch.delitem(sys.modules, module, raising=False)
+    import ingest_handbook
+    return ingest_handbook
+
+
+@pytest.fixture
+def index_dir(tmp_path, monkeypatch, ingest_handbook):
+    path = tmp_path / "snapshots"
+    monkeypatch.setattr(ingest_handbook, "LOCAL_INDEX_DIR", str(path))
+    monkeypatch.setattr(ingest_handbook, "embed_chunks", lambda chunks, **kwargs: [[float(len(c["text"])), 1.0] for c in chunks])
+    monkeypatch.setattr(ingest_handbook.vector_store_registry, "reset", lambda index_name=None: None)
+    return path
+
+
+def write_source(directory, files):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, text in files.items():
+        (directory / name).write_text(text)
+    return str(directory)
+
+
+def manifest(ingest_handbook, index_dir):
+    return ingest_handbook.load_manifest(os.path.join(str(index_dir), "test.local.manifest.json"))
+
+
+def test_unchanged_corpus_is_a_no_op(tmp_path, ingest_handbook, index_dir):
+    source = write_source(tmp_path / "docs", {"a.txt": "Pell Grant rules.", "b.txt": "Loan limits."})
+    assert ingest_handbook.ingest(source, "test", target="local") == {"chunks": 2, "embedded": 2, "deleted": 0}
+    assert ingest_handbook.ingest(source, "test", target="local") == {"chunks": 2, "embedded": 0, "deleted": 0}
+
+
+def test_removed_file_is_deleted_even_with_full(tmp_path, ingest_handbook, index_dir):
+    docs = tmp_path / "docs"
+    source = write_source(docs, {"a.txt": "Pell Grant rules.", "b.txt": "Loan limits."})
+    ingest_handbook.ingest(source, "test", target="local")
+    os.remove(docs / "b.txt")
+    assert ingest_handbook.ingest(source, "test", target="local", full=True) == {"chunks": 1, "embedded": 1, "deleted": 1}
+    store = LocalVectorStore.load(os.path.join(str(index_dir), "test"), embedding=None)
+    assert [record["text"] for record in store.records] == ["Pell Grant rules."]
+    assert len(manifest(ingest_handbook, index_dir)) == 1
+
+
+def test_moving_the_source_directory_keeps_chunk_ids(tmp_path, ingest_handbook, index_dir):
+    source = write_source(tmp_path / "old", {"a.txt": "Pell Grant rules."})
+    ingest_handbook.ingest(source, "test", target="local")
+    moved = str(tmp_path / "new")
+    os.rename(source, moved)
+    assert ingest_handbook.ingest(moved, "test", target="local") == {"chunks": 1, "embedded": 0, "deleted": 0}
+
+
+def test_chunks_overlap_and_carry_metadata(tmp_path, ingest_handbook):
+    source = write_source(tmp_path / "docs", {"a.txt": "x" * 2500})
+    (uri, title, pages), = ingest_handbook.iter_documents(source)
+    chunks = list(ingest_handbook.chunk_document(uri, title, pages, chunk_size=1000, overlap=200))
+    assert uri == "a.txt"
+    assert [len(chunk["text"]) for chunk in chunks] == [1000, 1000, 900]
+    assert chunks[0]["metadata"] == {"source": "a.txt", "title": "a", "page": 1}
+    assert len({chunk["id"] for chunk in chunks}) == 3
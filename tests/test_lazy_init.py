@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from lazy_init import LazyProvider, get_provider, lazy_provider, startup_report, warm_up
+
+
+def test_concurrent_first_calls_build_once():
+    builds = []
+
+    def factory():
+        builds.append(threading.current_thread().name)
+        time.sleep(0.05)
+        return object()
+
+    provider = LazyProvider("shared", factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert len({id(result) for result in results}) == 1
+    assert provider.seconds >= 0.05
+
+
+def test_failed_build_is_reported_and_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("unreachable")
+        return "client"
+
+    provider = LazyProvider("flaky", factory)
+    with pytest.raises(RuntimeError):
+        provider()
+    assert provider.error == "unreachable" and not provider.initialized
+    assert provider() == "client"
+    assert provider.error is None
+
+
+def test_override_and_reset():
+    provider = LazyProvider("component", lambda: "real")
+    provider.override("stand-in")
+    assert provider() == "stand-in"
+    assert provider.thread_name == "override"
+    provider.reset()
+    assert provider() == "stand-in"
+    provider.clear_override()
+    assert not provider.initialized
+    assert provider() == "real"
+
+
+def test_registered_providers_warm_up_by_name_and_report_status():
+    @lazy_provider("test_lazy_init_warm")
+    def warm():
+        return 1
+
+    @lazy_provider("test_lazy_init_cold")
+    def cold():
+        return 2
+
+    assert get_provider("test_lazy_init_warm") is warm
+    warm_up(["test_lazy_init_warm"])
+    rows = {row["component"]: row for row in startup_report()}
+    assert rows["test_lazy_init_warm"]["status"] == "ready"
+    assert rows["test_lazy_init_cold"]["status"] == "pending"
+    with pytest.raises(KeyError):
+        get_provider("test_lazy_init_missing")
@@ -0,0 +1,65 @@
+import asyncio
+
+from langchain_core.documents import Document
+
+from lexical_index import (
+    BM25Index, HybridRetriever, corpus_path, fusion_key, read_records, reciprocal_rank_fusion, tokenize, write_records,
+)
+from offline_fakes import FakeVectorStore, HashEmbeddings, synthetic_corpus
+
+
+def test_tokenize_lowercases_and_splits():
+    assert tokenize("Pell Grant, SAI-eligible!") == ["pell", "grant", "sai", "eligible"]
+
+
+def test_bm25_prefers_exact_term_matches():
+    index = BM25Index.from_texts([
+        "The Pell Grant is awarded by the Department of Education.",
+        "Direct Loans have annual limits for dependent students.",
+        "Campus-based aid includes Federal Work-Study.",
+    ])
+    rows = [row for row, _ in index.search("direct loan limits", 3)]
+    assert rows[0] == 1
+    assert index.search("zzz unknown", 3) == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = (Document(page_content=text) for text in ("a", "b", "c"))
+    fused = reciprocal_rank_fusion([[a, b, c], [b, Document(page_content="c")]])
+    assert [document.page_content for document in fused] == ["b", "c", "a"]
+    assert fusion_key(a) == fusion_key(Document(page_content="a", metadata={"id": "other"}))
+
+
+def test_rrf_keeps_the_first_lists_copy():
+    dense = Document(page_content="same text", metadata={"source": "dense"})
+    lexical = Document(page_content="same text", metadata={"source": "lexical"})
+    assert reciprocal_rank_fusion([[dense], [lexical]])[0].metadata["source"] == "dense"
+
+
+def test_records_round_trip_atomically(tmp_path):
+    path = corpus_path(str(tmp_path), "index")
+    records = [{"id": "1", "text": "pell grant", "metadata": {"page": 1}}]
+    write_records(path, records)
+    write_records(path, records + [{"id": "2", "text": "loans", "metadata": {}}])
+    assert [record["id"] for record in read_records(path)] == ["1", "2"]
+    assert [name for name in tmp_path.iterdir() if name.suffix == ".tmp"] == []
+
+
+def test_hybrid_retriever_fuses_dense_and_lexical_results():
+    texts, metadatas = synthetic_corpus()
+    embeddings = HashEmbeddings()
+    store = FakeVectorStore.from_texts(texts, embeddings, metadatas=metadatas)
+    retriever = HybridRetriever(vector_store=store, lexical_index=BM25Index.from_texts(texts), k=20, lexical_k=20, fused_k=10)
+    query = "dependency override for a graduate student"
+    fused = [document.page_content for document in retriever.invoke(query)]
+    assert len(fused) == 10
+    assert len(set(fused)) == 10
+
+
+def test_hybrid_retriever_sync_and_async_agree():
+    texts, metadatas = synthetic_corpus()
+    store = FakeVectorStore.from_texts(texts, HashEmbeddings(), metadatas=metadatas)
+    retriever = HybridRetriever(vector_store=store, lexical_index=BM25Index.from_texts(texts), k=20, lexical_k=20, fused_k=10)
+    query = "dependency override for a graduate student"
+    sync = [document.page_content for document in retriever.invoke(query)]
+    assert sync == [document.page_content for document in asyncio.run(retriever.ainvoke(query))]
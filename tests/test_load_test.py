@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from load_test import _Concurrency, format_results, page_errors
+
+
+def test_concurrency_tracks_the_peak():
+    concurrency = _Concurrency()
+    inside, release = threading.Barrier(4), threading.Event()
+
+    def session():
+        with concurrency:
+            inside.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=session) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    inside.wait()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert concurrency.peak == 3
+    assert concurrency.active == 0
+
+
+def test_page_errors_reads_exceptions_and_error_messages():
+    class Element:
+        def __init__(self, value):
+            self.value = value
+
+    class App:
+        exception = [Element(ValueError("boom"))]
+        error = [Element("Error invoking the agent")]
+
+    assert page_errors(App()) == ["boom", "Error invoking the agent"]
+
+
+def test_format_results():
+    empty = {"p50": None, "p95": None, "p99": None}
+    results = {
+        "sessions": 2, "arrival_rate": 1.0, "peak_concurrent_sessions": 2, "turns": 4, "wall_seconds": 3.0,
+        "turns_per_second": 1.0, "error_rate": 0.25, "latency_ms": {"p50": 500.0, "p95": 900.0, "p99": 950.0},
+        "server_turn_ms": empty, "ttft_ms": empty, "memory": {"per_session_kb": 12.0, "peak_mb": 3.5},
+        "history_writer": {"written": 8, "dropped": 0}, "stages": [{"stage": "llm", "count": 4, "p50": 0.2, "p95": 0.4}],
+        "errors": [{"session": 1, "question": "Hello!", "error": "timeout"}],
+    }
+
+    text = format_results(results)
+
+    assert "error rate 25.0%" in text
+    assert "memory per session 12 KiB" in text
+    assert "history writer written 8, dropped 0" in text
+    assert "error in session 1 ('Hello!'): timeout" in text
+
+
+def test_load_test_replays_sessions_without_errors():
+    pytest.importorskip("streamlit")
+    pytest.importorskip("langchain_cohere")
+    from load_test import run_load_test
+    from offline_fakes import DEFAULT_LATENCY
+
+    results = run_load_test(
+        arrival_rate=20.0, sessions=2, think_time=0, conversations=[["Who is eligible for a Pell Grant?", "Thanks!"]],
+        latency={name: 0.0 for name in DEFAULT_LATENCY}, trace_memory=False,
+    )
+
+    assert results["turns"] == 4
+    assert results["error_rate"] == 0.0, results["errors"]
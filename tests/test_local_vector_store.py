@@ -0,0 +1,67 @@
+import os
+import threading
+
+import numpy as np
+
+import local_vector_store
+from local_vector_store import GRAPH_FILE, BruteForceIndex, HNSWIndex, LocalVectorStore, write_snapshot
+
+
+def snapshot(rows, dim=8, seed=0):
+    vectors = np.random.default_rng(seed).normal(size=(rows, dim)).astype(np.float32)
+    records = [{"id": f"chunk-{i}", "text": f"chunk {i}", "metadata": {"page": i}} for i in range(rows)]
+    return vectors, records
+
+
+def test_rewrite_keeps_the_running_mapping_valid(tmp_path):
+    path = str(tmp_path / "index")
+    write_snapshot(path, *snapshot(500))
+    running = LocalVectorStore.load(path, embedding=None)
+    query = np.asarray(running.vectors[7])
+
+    write_snapshot(path, *snapshot(10, seed=1))
+    assert [document.metadata["id"] for document, _ in running.similarity_search_by_vector_with_score(query, k=1)] == ["chunk-7"]
+    assert len(LocalVectorStore.load(path, embedding=None).records) == 10
+    assert not [name for name in os.listdir(path) if name.endswith(".tmp")]
+
+
+def test_graph_is_built_when_the_snapshot_is_written(tmp_path):
+    path = str(tmp_path / "index")
+    vectors, records = snapshot(200)
+    write_snapshot(path, vectors, records, kind="hnsw")
+    assert os.path.exists(os.path.join(path, GRAPH_FILE))
+    store = LocalVectorStore.load(path, embedding=None, kind="hnsw")
+    assert HNSWIndex(store.vectors).load(os.path.join(path, GRAPH_FILE))
+
+    write_snapshot(path, vectors[:50], records[:50], kind="brute")
+    assert not os.path.exists(os.path.join(path, GRAPH_FILE))
+
+
+def test_concurrent_first_queries_build_the_index_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "index")
+    write_snapshot(path, *snapshot(100), kind="brute")
+    store = LocalVectorStore.load(path, embedding=None, kind="hnsw")
+    builds = []
+    original = HNSWIndex.build
+
+    def counting_build(self):
+        builds.append(threading.current_thread().name)
+        return original(self)
+
+    monkeypatch.setattr(local_vector_store.HNSWIndex, "build", counting_build)
+    threads = [threading.Thread(target=store.similarity_search_by_vector, args=(np.ones(8), 3)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+
+
+def test_hnsw_recall_against_brute_force():
+    vectors, _ = snapshot(300, dim=16)
+    exact, graph = BruteForceIndex(vectors), HNSWIndex(vectors).build()
+    recall = np.mean([
+        len({i for i, _ in exact.search(vectors[row], 10)} & {i for i, _ in graph.search(vectors[row], 10)}) / 10
+        for row in range(0, 300, 10)
+    ])
+    assert recall > 0.9
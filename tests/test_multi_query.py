@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+
+from langchain_core.documents import Document
+
+from lexical_index import BM25Index
+from multi_query import ParallelMultiQueryRetriever, interleave_unique, parse_sub_queries
+from offline_fakes import FakeVectorStore, HashEmbeddings, synthetic_corpus
+from rerankers import LexicalOverlapReranker
+from stage_metrics import stage_metrics
+
+
+def test_parse_sub_queries_strips_markers_and_duplicates():
+    text = "1. Dependency override rules\n- SAI for married students\n* dependency override rules\n\n"
+    assert parse_sub_queries(text, "Original?", max_queries=4) == [
+        "Original?", "Dependency override rules", "SAI for married students",
+    ]
+    assert len(parse_sub_queries("\n".join(f"q{i}" for i in range(10)), "Q", max_queries=3)) == 4
+
+
+def test_interleave_unique_round_robins_and_dedupes():
+    a, b, c = (Document(page_content=text) for text in "abc")
+    merged = interleave_unique([[a, b], [Document(page_content="a"), c]], limit=10)
+    assert [document.page_content for document in merged] == ["a", "b", "c"]
+    assert len(interleave_unique([[a, b], [c]], limit=2)) == 2
+
+
+class SlowEmbeddings(HashEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def embed_query(self, text):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return super().embed_query(text)
+
+
+def retriever(embeddings):
+    texts, metadatas = synthetic_corpus()
+    store = FakeVectorStore.from_texts(texts, embeddings, metadatas=metadatas)
+    return ParallelMultiQueryRetriever(
+        vector_store=store,
+        embeddings=embeddings,
+        compressor=LexicalOverlapReranker(top_n=10),
+        decompose=lambda question: [question, "dependency override", "SAI married graduate student"],
+        lexical_index=BM25Index.from_texts(texts),
+    )
+
+
+def test_sub_queries_are_embedded_concurrently_and_timed_on_the_turn():
+    embeddings = SlowEmbeddings()
+    with stage_metrics.turn() as timings:
+        documents = retriever(embeddings).invoke("Dependency override and SAI for a married graduate student?")
+    assert embeddings.peak > 1
+    assert len(documents) == 10
+    assert len(timings["vector_query"]) == 1
+    assert len(timings["lexical_query"]) == 3
+
+
+def test_sync_and_async_agree():
+    multi = retriever(HashEmbeddings())
+    question = "Dependency override and SAI?"
+    sync = [document.page_content for document in multi.invoke(question)]
+    assert sync == [document.page_content for document in asyncio.run(multi.ainvoke(question))]
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import HumanMessage
+
+from offline_fakes import (
+    AGENT_PROMPT_MARKER, TOOL_RESPONSE_MARKER, USER_INPUT_MARKER, FakeChatModel, InMemoryDynamoDB, synthetic_corpus,
+)
+from pipeline_benchmark import format_results, percentiles
+
+
+def test_percentiles_in_milliseconds():
+    assert percentiles([]) == {"p50": None, "p95": None, "p99": None}
+    result = percentiles([0.1] * 99 + [1.0])
+    assert result["p50"] == pytest.approx(100.0)
+    assert result["p99"] == pytest.approx(109.0)
+
+
+def test_synthetic_corpus_is_deterministic():
+    assert synthetic_corpus(size=20, seed=1) == synthetic_corpus(size=20, seed=1)
+    texts, metadatas = synthetic_corpus(size=20)
+    assert len(texts) == len(metadatas) == 20
+    assert metadatas[9]["source"] == "offline://handbook/9"
+
+
+def test_fake_chat_model_follows_the_agent_protocol():
+    llm = FakeChatModel(first_token_latency=0, token_latency=0)
+    prompt = f"{AGENT_PROMPT_MARKER}\n{USER_INPUT_MARKER}What is a Pell Grant?"
+
+    action = json.loads(llm.invoke([HumanMessage(content=prompt)]).content.strip("`json\n"))
+    final = json.loads(llm.invoke([HumanMessage(content=prompt), HumanMessage(content=f"{TOOL_RESPONSE_MARKER}: pell grant rules")]).content.strip("`json\n"))
+    plain = llm.invoke([HumanMessage(content="Summarize the chat")]).content
+
+    assert action == {"action": "Knowledge Base", "action_input": "What is a Pell Grant?"}
+    assert final["action"] == "Final Answer"
+    assert final["action_input"].startswith("According to the handbook")
+    assert plain.startswith("According to the handbook")
+
+
+def test_fake_chat_model_streams_tokens():
+    llm = FakeChatModel(first_token_latency=0, token_latency=0)
+    chunks = [chunk.content for chunk in llm.stream("Summarize the chat")]
+    assert len(chunks) > 1
+    assert "".join(chunks) == llm.invoke("Summarize the chat").content
+
+
+def test_in_memory_dynamodb_queries_one_partition():
+    client = InMemoryDynamoDB(latency=0)
+    for session, key in (("a", "2"), ("b", "1"), ("a", "1")):
+        client.put_item(TableName="t", Item={"SessionId": {"S": session}, "MessageKey": {"S": key}})
+
+    pages = client.get_paginator("query").paginate(TableName="t", ExpressionAttributeValues={":s": {"S": "a"}}, ScanIndexForward=False)
+
+    assert [item["MessageKey"]["S"] for page in pages for item in page["Items"]] == ["2", "1"]
+    assert client.calls == 4
+
+
+def test_format_results_lists_every_configuration():
+    row = {
+        "configuration": "direct/cached", "turns": 10, "errors": 1, "turns_per_second": 2.5,
+        "latency_ms": {"p50": 120.0, "p95": 300.0, "p99": None}, "ttft_ms": percentiles([]),
+        "stages_p50_ms": {"llm": 80.0}, "first_error": "boom",
+    }
+    text = format_results([row])
+    assert "direct/cached" in text.splitlines()[1]
+    assert "llm" in text
+    assert "first error: boom" in text
+
+
+def test_offline_benchmark_runs_every_mode():
+    for module in ("streamlit", "langchain", "langchain_cohere", "pandas"):
+        pytest.importorskip(module)
+    from pipeline_benchmark import MODES, run_benchmark
+
+    latency = {name: 0.0 for name in ("llm_first_token", "llm_token", "embedding", "vector_query", "rerank", "dynamodb")}
+    results = run_benchmark(sessions=2, turns=2, latency=latency)
+
+    assert [row["configuration"] for row in results] == [f"{mode}/cached" for mode in MODES]
+    assert all(row["errors"] == 0 for row in results), [row["first_error"] for row in results]
+    assert all(row["turns"] == 4 for row in results)
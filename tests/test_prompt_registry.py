@@ -0,0 +1,53 @@
+import hashlib
+import json
+import sys
+import types
+
+import pytest
+
+import prompt_registry
+from prompt_registry import PromptChecksumError, load_manifest, load_prompt, prompt_from_spec, spec_from_prompt
+
+
+def test_vendored_chat_prompt_loads_and_matches_its_checksum():
+    manifest = load_manifest()["react-chat-json"]
+    prompt = load_prompt("react-chat-json")
+    assert load_prompt("react-chat-json") is prompt
+    assert {"input", "tools", "tool_names"} <= set(prompt.input_variables)
+    assert manifest["current"] in manifest["versions"]
+
+
+def test_spec_round_trip():
+    spec = {
+        "name": "p", "version": "v1", "source": None,
+        "messages": [
+            {"type": "system", "template": "You help with {topic}."},
+            {"type": "placeholder", "variable_name": "chat_history", "optional": True},
+            {"type": "human", "template": "{input}"},
+        ],
+    }
+    assert spec_from_prompt(prompt_from_spec(spec), "p", "v1") == spec
+
+
+def test_tampered_prompt_is_rejected(tmp_path, monkeypatch):
+    data = json.dumps({"messages": [{"type": "human", "template": "{input}"}]}).encode("utf-8")
+    (tmp_path / "p.json").write_bytes(data + b" ")
+    manifest = {"p": {"current": "v1", "versions": {"v1": {"file": "p.json", "sha256": hashlib.sha256(data).hexdigest()}}}}
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    monkeypatch.setattr(prompt_registry, "PROMPTS_DIR", str(tmp_path))
+    monkeypatch.setattr(prompt_registry, "MANIFEST_FILE", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(prompt_registry, "_loaded", {})
+    with pytest.raises(PromptChecksumError):
+        load_prompt("p")
+
+
+def test_hub_drift_is_reported_without_replacing_the_vendored_prompt(monkeypatch):
+    vendored = load_prompt("react-chat-json")
+    pulled = prompt_from_spec({"messages": [{"type": "human", "template": "Changed upstream: {input}"}]})
+    monkeypatch.setitem(sys.modules, "langchain", types.SimpleNamespace(hub=types.SimpleNamespace(pull=lambda source: pulled)))
+    monkeypatch.setattr(prompt_registry, "hub_drift", {})
+
+    prompt_registry.sync_prompt_in_background("react-chat-json").join()
+
+    assert prompt_registry.hub_drift["react-chat-json"]["version"] == load_manifest()["react-chat-json"]["current"]
+    assert load_prompt("react-chat-json") is vendored
@@ -0,0 +1,63 @@
+import asyncio
+
+from langchain_core.documents import BaseDocumentCompressor, Document
+
+from rerank_cache import CachedRerank, RerankCache
+
+
+class CopyingReranker(BaseDocumentCompressor):
+    """
+    Returns fresh copies without the vector id, as CohereRerank does.
+    """
+
+    calls: int = 0
+
+    def compress_documents(self, documents, query, callbacks=None):
+        self.calls += 1
+        ranked = sorted(documents, key=lambda document: len(document.page_content), reverse=True)[:2]
+        return [
+            Document(page_content=document.page_content, metadata={**document.metadata, "relevance_score": 1.0 / (i + 1)})
+            for i, document in enumerate(ranked)
+        ]
+
+
+def candidates():
+    texts = ["pell grant", "pell grant eligibility", "direct loan limits for dependent students"]
+    return [Document(id=f"vec-{i}", page_content=text, metadata={"source": "handbook"}) for i, text in enumerate(texts)]
+
+
+def test_copying_reranker_fills_the_cache():
+    base = CopyingReranker()
+    reranker = CachedRerank(base_compressor=base, cache=RerankCache(), model="m", top_n=2)
+    results = [reranker.compress_documents(candidates(), "Pell grant?") for _ in range(3)]
+    assert base.calls == 1
+    assert reranker.cache.stats() == {"hits": 2, "misses": 1, "size": 1}
+    assert [d.page_content for d in results[0]] == [d.page_content for d in results[2]]
+    assert [d.id for d in results[2]] == ["vec-2", "vec-1"]
+    assert results[2][0].metadata["relevance_score"] == 1.0
+
+
+def test_async_path_shares_the_cache():
+    base = CopyingReranker()
+    reranker = CachedRerank(base_compressor=base, cache=RerankCache(), model="m", top_n=2)
+    reranker.compress_documents(candidates(), "pell grant")
+    documents = asyncio.run(reranker.acompress_documents(candidates(), "  Pell Grant "))
+    assert base.calls == 1
+    assert [d.id for d in documents] == ["vec-2", "vec-1"]
+
+
+def test_different_candidates_miss():
+    base = CopyingReranker()
+    reranker = CachedRerank(base_compressor=base, cache=RerankCache(), model="m", top_n=2)
+    reranker.compress_documents(candidates(), "pell grant")
+    reranker.compress_documents(candidates()[:2], "pell grant")
+    assert base.calls == 2
+
+
+def test_lru_evicts_oldest():
+    cache = RerankCache(max_entries=2)
+    for key in "abc":
+        cache.put(key, [(0, 1.0)])
+    assert cache.get("a") is None
+    assert cache.get("c") == [(0, 1.0)]
+
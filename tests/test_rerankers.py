@@ -0,0 +1,72 @@
+import math
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document
+
+from rerank_benchmark import ndcg, reciprocal_rank
+from rerankers import CrossEncoderReranker, LexicalOverlapReranker, ScoringReranker
+
+
+def documents(*texts):
+    return [Document(id=str(i), page_content=text, metadata={"page": i}) for i, text in enumerate(texts)]
+
+
+def test_lexical_reranker_orders_by_query_overlap():
+    reranker = LexicalOverlapReranker(top_n=2)
+    ranked = reranker.compress_documents(
+        documents("cost of attendance", "pell grant eligibility rules", "pell grant grant eligibility"),
+        "pell grant eligibility",
+    )
+
+    assert [d.id for d in ranked] == ["2", "1"]
+    assert ranked[0].metadata["page"] == 2
+    assert ranked[0].metadata["relevance_score"] > ranked[1].metadata["relevance_score"] >= 0.9
+    assert reranker.compress_documents([], "anything") == []
+
+
+def test_scoring_reranker_requires_score():
+    with pytest.raises(TypeError):
+        ScoringReranker()
+
+    class Constant(ScoringReranker):
+        def score(self, query, texts):
+            return [0.5] * len(texts)
+
+    ranked = Constant(top_n=1).compress_documents(documents("a", "b"), "query")
+    assert [(d.id, d.metadata["relevance_score"]) for d in ranked] == [("0", 0.5)]
+
+
+def test_lexical_scores_are_bounded():
+    scores = LexicalOverlapReranker().score("pell grant", ["pell grant " * 50, "loan limits", ""])
+    assert all(0.0 <= score <= 1.0 for score in scores)
+    assert scores[1] == scores[2] == 0.0
+    assert LexicalOverlapReranker().score("", ["pell grant"]) == [0.0]
+
+
+def test_cross_encoder_scores_batches_in_order(monkeypatch):
+    batches = []
+
+    def score_batch(self, query, texts):
+        batches.append(list(texts))
+        return [float(text.count("x")) for text in texts]
+
+    monkeypatch.setattr(CrossEncoderReranker, "_score_batch", score_batch)
+    reranker = CrossEncoderReranker(model_dir="unused", batch_size=2, top_n=5)
+
+    ranked = reranker.compress_documents(documents("x", "xxx", "", "xx", "xxxx"), "query")
+
+    assert sorted(len(batch) for batch in batches) == [1, 2, 2]
+    assert [d.id for d in ranked] == ["4", "1", "3", "0", "2"]
+
+
+def test_ndcg_and_reciprocal_rank():
+    gains = {"a": 3.0, "b": 1.0}
+    assert ndcg(["a", "b", "c"], gains, 3) == pytest.approx(1.0)
+    swapped = (1.0 + 3.0 / math.log2(3)) / (3.0 + 1.0 / math.log2(3))
+    assert ndcg(["b", "a"], gains, 2) == pytest.approx(swapped)
+    assert ndcg(["a"], {}, 10) == 0.0
+    assert reciprocal_rank(["c", "b", "a"], {"a", "b"}) == pytest.approx(0.5)
+    assert reciprocal_rank(["c"], {"a"}) == 0.0
@@ -0,0 +1,73 @@
+import json
+
+from secrets_provider import SecretsProvider, secret_env_name
+
+
+class FakeSecretsManager:
+    def __init__(self, secrets):
+        self.secrets = secrets
+        self.calls = 0
+
+    def get_secret_value(self, SecretId):
+        self.calls += 1
+        return {"SecretString": json.dumps(self.secrets[SecretId])}
+
+
+def test_secret_is_fetched_once_within_ttl():
+    client = FakeSecretsManager({"app": {"KEY": "one", "OTHER": "x"}})
+    provider = SecretsProvider(lambda: client, ttl_seconds=3600)
+    assert provider.get("app", "KEY") == "one"
+    assert provider.get("app", "OTHER") == "x"
+    assert client.calls == 1
+
+
+def test_environment_overrides_a_key(monkeypatch):
+    provider = SecretsProvider(lambda: FakeSecretsManager({"app-secrets": {"KEY": "stored"}}))
+    monkeypatch.setenv(secret_env_name("app-secrets", "KEY"), "from-env")
+    assert secret_env_name("app-secrets", "KEY") == "APP_SECRETS__KEY"
+    assert provider.get("app-secrets", "KEY") == "from-env"
+
+
+def test_rotation_runs_change_callbacks_for_changed_keys_only():
+    client = FakeSecretsManager({"app": {"KEY": "one", "OTHER": "x"}})
+    provider = SecretsProvider(lambda: client)
+    rotated = []
+    provider.on_change("app", "KEY", lambda: rotated.append("KEY"))
+    provider.on_change("app", "OTHER", lambda: rotated.append("OTHER"))
+    provider.get("app", "KEY")
+
+    provider.refresh("app")
+    assert rotated == []
+    client.secrets["app"]["KEY"] = "two"
+    provider.refresh("app")
+    assert rotated == ["KEY"]
+    assert provider.get("app", "KEY") == "two"
+
+
+def test_failed_refresh_keeps_the_previous_value():
+    client = FakeSecretsManager({"app": {"KEY": "one"}})
+    provider = SecretsProvider(lambda: client)
+    provider.get("app", "KEY")
+    del client.secrets["app"]
+    provider.refresh("app")
+    assert provider.get("app", "KEY") == "one"
+
+
+def test_local_source_reads_the_file(tmp_path):
+    path = tmp_path / "secrets.json"
+    path.write_text(json.dumps({"app": {"KEY": "local"}}))
+    provider = SecretsProvider(lambda: None, source="local", local_path=str(path))
+    assert provider.get("app", "KEY") == "local"
+    assert provider.get("missing", "KEY", "default") == "default"
+
+
+def test_background_refresh_starts_with_the_first_fetch():
+    client = FakeSecretsManager({"app": {"KEY": "one"}})
+    provider = SecretsProvider(lambda: client, ttl_seconds=3600, background_refresh=True)
+    assert provider._refresher is None
+
+    provider.get("app", "KEY")
+    thread = provider._refresher
+    assert thread is not None and thread.is_alive()
+    provider.get("app", "KEY")
+    assert provider.start_background_refresh() is thread
@@ -0,0 +1,77 @@
+import hashlib
+import re
+
+import numpy as np
+
+import semantic_cache
+from semantic_cache import SemanticAnswerCache, is_follow_up
+
+
+class BagOfWordsEmbeddings:
+    """
+    Feature-hashed bag of words: questions sharing words are close.
+    """
+
+    def embed_query(self, text):
+        vector = np.zeros(64)
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            vector[int(hashlib.sha1(word.encode("utf-8")).hexdigest(), 16) % 64] += 1.0
+        return vector.tolist()
+
+
+def cache(**kwargs):
+    return SemanticAnswerCache(BagOfWordsEmbeddings(), **kwargs)
+
+
+def test_near_duplicate_question_hits():
+    answers = cache(threshold=0.95)
+    answers.store("What is the Pell Grant?", "A need-based grant.", ["source"])
+    hit = answers.lookup("what is the pell grant?")
+    assert hit["output"] == "A need-based grant."
+    assert hit["sources"] == ["source"]
+    assert hit["similarity"] >= 0.95
+    assert answers.stats() == {"hits": 1, "misses": 0, "size": 1}
+
+
+def test_different_question_misses():
+    answers = cache(threshold=0.95)
+    answers.store("What is the Pell Grant?", "A need-based grant.", [])
+    assert answers.lookup("How do I appeal a dependency status decision?") is None
+    assert answers.stats()["misses"] == 1
+
+
+def test_oldest_entries_are_evicted():
+    answers = cache(max_entries=2)
+    for i, question in enumerate(["first question about loans", "second question about grants", "third question about work-study"]):
+        answers.store(question, f"answer {i}", [])
+    assert answers.stats()["size"] == 2
+    assert answers.lookup("first question about loans") is None
+    assert answers.lookup("third question about work-study")["output"] == "answer 2"
+
+
+def test_new_index_version_drops_every_answer():
+    version = ["v1"]
+    answers = cache(version_fn=lambda: version[0])
+    answers.store("What is the Pell Grant?", "old answer", [])
+    version[0] = "v2"
+    assert answers.lookup("What is the Pell Grant?") is None
+    assert answers.stats()["size"] == 0
+
+
+def test_answers_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now[0])
+    answers = cache(ttl_seconds=60)
+    answers.store("What is the Pell Grant?", "old answer", [])
+    now[0] += 30
+    answers.store("How are Direct Loan limits set?", "loan answer", [])
+    assert answers.lookup("What is the Pell Grant?")["output"] == "old answer"
+    now[0] += 31
+    assert answers.lookup("What is the Pell Grant?") is None
+    assert answers.lookup("How are Direct Loan limits set?")["output"] == "loan answer"
+
+
+def test_follow_ups_depend_on_the_conversation():
+    assert is_follow_up("What about part-time students?", has_history=True)
+    assert not is_follow_up("What about part-time students?", has_history=False)
+    assert not is_follow_up("How is the Pell Grant calculated for part-time students?", has_history=True)
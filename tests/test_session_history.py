@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from history_writer import DynamoDBItemSink, WriteBehindQueue
+from session_history import SessionMessageHistory, create_session_messages_table, new_message_key
+
+
+class MessagesTable:
+    """
+    Low-level DynamoDB client stand-in for the (SessionId, MessageKey) table:
+    put_item, batch_write_item and paginated queries on the partition key.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.created = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(item):
+        return item["SessionId"]["S"], item["MessageKey"]["S"]
+
+    def create_table(self, TableName, **kwargs):
+        self.created.append(TableName)
+
+    def get_waiter(self, waiter_name):
+        return type("Waiter", (), {"wait": lambda self, **kwargs: None})()
+
+    def put_item(self, TableName, Item):
+        with self._lock:
+            self.items[self._key(Item)] = Item
+
+    def batch_write_item(self, RequestItems):
+        with self._lock:
+            for requests in RequestItems.values():
+                for request in requests:
+                    if "PutRequest" in request:
+                        item = request["PutRequest"]["Item"]
+                        self.items[self._key(item)] = item
+                    else:
+                        self.items.pop(self._key(request["DeleteRequest"]["Key"]), None)
+        return {"UnprocessedItems": {}}
+
+    def get_paginator(self, operation_name):
+        table = self
+
+        class Paginator:
+            def paginate(self, ExpressionAttributeValues, **kwargs):
+                session_id = ExpressionAttributeValues[":session_id"]["S"]
+                with table._lock:
+                    yield {"Items": [item for key, item in sorted(table.items.items()) if key[0] == session_id]}
+
+        return Paginator()
+
+
+def test_message_keys_sort_chronologically():
+    keys = [new_message_key() for _ in range(50)]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+
+def test_messages_round_trip_in_order():
+    client = MessagesTable()
+    create_session_messages_table(client, "messages")
+    history = SessionMessageHistory("messages", "s1", client)
+    history.add_message(HumanMessage(content="What is FAFSA?"))
+    history.add_message(AIMessage(content="A federal aid form."))
+    history.add_message(HumanMessage(content="When is it due?"))
+
+    assert client.created == ["messages"]
+    assert [m.content for m in history.messages] == ["What is FAFSA?", "A federal aid form.", "When is it due?"]
+    assert isinstance(history.messages[1], AIMessage)
+
+
+def test_sessions_are_isolated_and_clear_only_its_own():
+    client = MessagesTable()
+    first = SessionMessageHistory("messages", "s1", client)
+    second = SessionMessageHistory("messages", "s2", client)
+    first.add_message(HumanMessage(content="one"))
+    second.add_message(HumanMessage(content="two"))
+
+    first.clear()
+
+    assert first.messages == []
+    assert [m.content for m in second.messages] == ["two"]
+
+
+def test_writer_batches_puts_and_reads_flush_first():
+    client = MessagesTable()
+    writer = WriteBehindQueue(DynamoDBItemSink(client), flush_interval=0.05)
+    try:
+        history = SessionMessageHistory("messages", "s1", client, writer=writer)
+        key = history.append(HumanMessage(content="queued"))
+        history.add_message(AIMessage(content="also queued"))
+
+        assert [m.content for m in history.messages] == ["queued", "also queued"]
+        assert len(key.split("#")) == 2
+        assert writer.metrics()["written"] == 2
+    finally:
+        writer.close()
@@ -0,0 +1,99 @@
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+import stage_metrics as stage_metrics_module
+from stage_metrics import METRIC_NAME, Histogram, StageMetrics, StageTimingCallbackHandler, stage_metrics, start_metrics_server, submit
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(seconds)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.65)
+    assert histogram.percentile(50) == 0.5
+    assert histogram.percentile(100) == 2.0
+    assert Histogram().percentile(50) is None
+
+
+def test_turn_collects_only_its_own_thread():
+    metrics = StageMetrics()
+    with metrics.turn() as timings:
+        metrics.observe("llm", 0.2)
+        other = threading.Thread(target=metrics.observe, args=("llm", 0.4))
+        other.start()
+        other.join()
+
+    assert timings["llm"] == [0.2]
+    assert "turn" in timings
+    rows = {row["stage"]: row for row in metrics.snapshot()}
+    assert rows["llm"]["count"] == 2
+    assert rows["llm"]["mean"] == pytest.approx(0.3)
+    assert rows["turn"]["count"] == 1
+
+
+def test_submitted_work_reports_to_the_turn_until_it_ends():
+    metrics = StageMetrics()
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with metrics.turn() as timings:
+            submit(pool, metrics.observe, "lexical_query", 0.1).result()
+            late = submit(pool, lambda: release.wait() and metrics.observe("summary", 0.5))
+        release.set()
+        late.result()
+
+    assert timings["lexical_query"] == [0.1]
+    assert "summary" not in timings
+    assert {row["stage"] for row in metrics.snapshot()} >= {"lexical_query", "summary"}
+
+
+def test_prometheus_buckets_are_cumulative():
+    metrics = StageMetrics()
+    metrics.observe("retrieval", 0.003)
+    metrics.observe("retrieval", 45.0)
+
+    text = metrics.render_prometheus()
+
+    assert f"# TYPE {METRIC_NAME} histogram" in text
+    assert f'{METRIC_NAME}_bucket{{stage="retrieval",le="0.005"}} 1' in text
+    assert f'{METRIC_NAME}_bucket{{stage="retrieval",le="30.0"}} 1' in text
+    assert f'{METRIC_NAME}_bucket{{stage="retrieval",le="+Inf"}} 2' in text
+    assert f'{METRIC_NAME}_count{{stage="retrieval"}} 2' in text
+
+
+def test_callback_handler_names_retriever_stages():
+    handler = StageTimingCallbackHandler()
+    with stage_metrics.turn() as timings:
+        for name in ("VectorStoreRetriever", "ContextualCompressionRetriever"):
+            run_id = uuid4()
+            handler.on_retriever_start({}, "fafsa", run_id=run_id, name=name)
+            handler.on_retriever_end([], run_id=run_id)
+        run_id = uuid4()
+        handler.on_chat_model_start({}, [[]], run_id=run_id)
+        handler.on_llm_end(None, run_id=run_id)
+        handler.on_llm_end(None, run_id=uuid4())
+
+    assert len(timings["vector_query"]) == 1
+    assert len(timings["retrieval"]) == 1
+    assert len(timings["llm"]) == 1
+
+
+def test_metrics_server_binds_localhost_by_default(monkeypatch):
+    monkeypatch.setattr(stage_metrics_module, "_server", None)
+    server = start_metrics_server(0)
+    try:
+        host, port = server.server_address
+        assert host == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/") as response:
+            assert f"# TYPE {METRIC_NAME} histogram" in response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
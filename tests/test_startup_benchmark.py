@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+from startup_benchmark import check_budget, parse_import_times
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_offline_environment_does_not_import_the_app(tmp_path):
+    code = (
+        "import sys, startup_benchmark\n"
+        f"env = startup_benchmark.offline_environment({str(tmp_path)!r})\n"
+        "assert env['SECRETS_SOURCE'] == 'local' and env['INDEX_NAME'] == startup_benchmark.INDEX_NAME\n"
+        "assert 'aws_secrets_initialization' not in sys.modules, 'app imported in the parent'\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert os.path.exists(tmp_path / "startup-benchmark" / "vectors.npy")
+
+
+def test_parse_import_times_totals_self_time_per_package():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 |     numpy.core",
+        "import time:       200 |        300 |   numpy",
+        "import time:        50 |         50 | chat_st",
+    ])
+    modules, packages = parse_import_times(stderr)
+    assert [row["module"] for row in modules] == ["numpy.core", "numpy", "chat_st"]
+    assert packages == {"numpy": 0.3, "chat_st": 0.05}
+
+
+def test_check_budget_reports_exceeded_limits():
+    results = {
+        "wall_ms": 900.0, "import_ms": 500.0, "warm_up_ms": 100.0,
+        "packages_ms": {"langchain": 300.0},
+        "initializers": [{"component": "llm", "seconds": 0.2, "status": "ok"}],
+    }
+    budget = {"import_ms": 400, "packages_ms": {"langchain": 350}, "initializers_ms": {"llm": 100}}
+    assert check_budget(results, budget) == ["import_ms: 500 ms > 400 ms", "initializer llm: 200 ms > 100 ms"]
@@ -0,0 +1,54 @@
+import json
+
+from streaming import FinalAnswerStreamParser, StreamingAnswerHandler
+
+
+def stream(text, size):
+    parser = FinalAnswerStreamParser()
+    return "".join(parser.feed(text[i:i + size]) for i in range(0, len(text), size))
+
+
+def test_final_answer_is_released_in_any_chunking():
+    answer = 'The "Pell Grant" is need-based.\nSee \\ volume 7 é'
+    blob = "```json\n" + json.dumps({"action": "Final Answer", "action_input": answer}) + "\n```"
+    for size in (1, 2, 3, 7, len(blob)):
+        assert stream(blob, size) == answer
+
+
+def test_tool_calls_release_nothing():
+    blob = json.dumps({"action": "Knowledge Base", "action_input": "pell grant eligibility"})
+    assert stream(blob, 4) == ""
+
+
+def test_answer_is_held_until_the_action_is_known():
+    parser = FinalAnswerStreamParser()
+    assert parser.feed('{"action_input": "Hello') == ""
+    assert parser.feed(' there", "action": "Final Answer"}') == "Hello there"
+
+
+class Placeholder:
+    def __init__(self):
+        self.texts = []
+
+    def markdown(self, text):
+        self.texts.append(text)
+
+
+def test_handler_streams_into_the_placeholder_and_resets_per_call():
+    placeholder = Placeholder()
+    handler = StreamingAnswerHandler(placeholder, parse_json=True)
+    for token in ['{"action": "Knowledge Base", "action_input": "loans"}']:
+        handler.on_llm_new_token(token)
+    handler.on_chat_model_start({}, [])
+    for token in ['{"action": "Final Answer", ', '"action_input": "Yes', ', you can."}']:
+        handler.on_llm_new_token(token)
+    assert handler.text == "Yes, you can."
+    assert placeholder.texts[-1] == "Yes, you can.▌"
+    assert handler.first_token_seconds is not None
+
+
+def test_direct_mode_streams_every_token():
+    handler = StreamingAnswerHandler(Placeholder(), parse_json=False)
+    for token in ["Direct ", "answer."]:
+        handler.on_llm_new_token(token)
+    assert handler.text == "Direct answer."
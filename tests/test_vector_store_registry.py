@@ -0,0 +1,72 @@
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from secrets_provider import SecretsProvider
+
+for module in ("pinecone", "langchain_pinecone"):
+    pytest.importorskip(module)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # aws_secrets_initialization needs streamlit and AWS configuration; the registry only needs its names
+    monkeypatch.setitem(sys.modules, "aws_secrets_initialization", types.SimpleNamespace(
+        PINECONE_API_KEY_SECRET=("app", "PINECONE_API_KEY"), get_embeddings=lambda: None, get_pinecone_api_key=lambda: "key",
+        secrets_provider=SecretsProvider(lambda: None, source="local")))
+    monkeypatch.delitem(sys.modules, "vector_store_registry", raising=False)
+    from vector_store_registry import VectorStoreRegistry
+    return VectorStoreRegistry()
+
+
+def test_handles_are_built_once_across_threads(registry):
+    builds = []
+
+    def builder():
+        builds.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("client", builder))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len({id(result) for result in results}) == 1
+
+
+def test_reset_by_index_keeps_other_handles(registry):
+    client = registry.get("pinecone-client", object)
+    first = registry.get(("pinecone-index", "a"), object)
+    other = registry.get(("pinecone-index", "b"), object)
+
+    registry.reset("a")
+
+    assert registry.get("pinecone-client", object) is client
+    assert registry.get(("pinecone-index", "b"), object) is other
+    assert registry.get(("pinecone-index", "a"), object) is not first
+    assert registry.generation == 1
+
+    registry.reset()
+    assert registry.get("pinecone-client", object) is not client
+    assert registry.generation == 2
+
+
+def test_failed_health_check_resets_the_index(registry):
+    class BrokenIndex:
+        def describe_index_stats(self):
+            raise ConnectionError("connection reset")
+
+    registry.get(("pinecone-index", "edu"), BrokenIndex)
+
+    result = registry.health_check("edu")
+
+    assert result == {"index": "edu", "healthy": False, "error": "connection reset"}
+    assert registry.generation == 1
+    assert ("pinecone-index", "edu") not in registry._handles
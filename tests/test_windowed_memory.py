@@ -0,0 +1,106 @@
+import time
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableLambda
+
+from windowed_memory import WindowedSummaryMemory
+
+
+def fake_llm():
+    # "Summarizes" by echoing the prompt's current summary and new lines
+    return RunnableLambda(lambda prompt: prompt.to_messages()[-1].content)
+
+
+def failing_llm():
+    def fail(prompt):
+        raise RuntimeError("throttled")
+    return RunnableLambda(fail)
+
+
+def wait_for_summary(state, timeout=5.0):
+    deadline = time.time() + timeout
+    while state["pending"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert not state["pending"]
+
+
+def save_turns(memory, count):
+    for i in range(count):
+        memory.save_context({"input": f"question {i}"}, {"output": f"answer {i}"})
+        wait_for_summary(memory.state)
+
+
+def test_short_history_is_kept_verbatim():
+    memory = WindowedSummaryMemory(InMemoryChatMessageHistory(), {}, fake_llm, max_turns=4)
+    save_turns(memory, 2)
+
+    history = memory.load_memory_variables({})["chat_history"]
+
+    assert [m.content for m in history] == ["question 0", "answer 0", "question 1", "answer 1"]
+    assert memory.state["summary"] == ""
+
+
+def test_old_turns_are_folded_into_a_summary():
+    memory = WindowedSummaryMemory(InMemoryChatMessageHistory(), {}, fake_llm, max_turns=2)
+    save_turns(memory, 5)
+
+    history = memory.load_memory_variables({})["chat_history"]
+
+    assert isinstance(history[0], SystemMessage)
+    assert "question 0" in history[0].content
+    assert [m.content for m in history[1:]] == ["question 3", "answer 3", "question 4", "answer 4"]
+    assert memory.state["summarized"] == 6
+
+
+def test_token_budget_shrinks_the_window():
+    memory = WindowedSummaryMemory(InMemoryChatMessageHistory(), {}, fake_llm, max_turns=10, max_tokens=3, token_counter=lambda m: 1)
+    save_turns(memory, 3)
+
+    history = memory.load_memory_variables({})["chat_history"]
+
+    assert [m.content for m in history[1:]] == ["answer 1", "question 2", "answer 2"]
+
+
+def test_clear_discards_an_in_flight_summary():
+    memory = WindowedSummaryMemory(InMemoryChatMessageHistory(), {}, fake_llm, max_turns=1)
+    save_turns(memory, 2)
+    generation = memory.state["generation"]
+
+    memory.clear()
+    memory._summarize(memory.chat_memory.messages, 2, generation)
+
+    assert memory.state["summary"] == ""
+    assert memory.state["summarized"] == 0
+    assert memory.load_memory_variables({})["chat_history"] == []
+
+
+def test_unsummarized_turns_stay_verbatim_while_a_summary_is_pending():
+    memory = WindowedSummaryMemory(InMemoryChatMessageHistory(), {}, fake_llm, max_turns=1)
+    memory.state["pending"] = True
+    for i in range(3):
+        memory.save_context({"input": f"question {i}"}, {"output": f"answer {i}"})
+
+    history = memory.load_memory_variables({})["chat_history"]
+
+    assert [m.content for m in history] == ["question 0", "answer 0", "question 1", "answer 1", "question 2", "answer 2"]
+
+
+def test_failed_summary_keeps_the_turns_and_is_retried():
+    memory = WindowedSummaryMemory(InMemoryChatMessageHistory(), {}, failing_llm, max_turns=1)
+    save_turns(memory, 3)
+
+    history = memory.load_memory_variables({})["chat_history"]
+    assert [m.content for m in history][:2] == ["question 0", "answer 0"]
+    assert memory.state["summarized"] == 0
+
+    memory.llm_loader = fake_llm
+    memory.save_context({"input": "question 3"}, {"output": "answer 3"})
+    wait_for_summary(memory.state)
+    history = memory.load_memory_variables({})["chat_history"]
+    assert isinstance(history[0], SystemMessage)
+    assert [m.content for m in history[1:]] == ["question 3", "answer 3"]
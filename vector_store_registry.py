@@ -0,0 +1,111 @@
+import threading
+
+import pinecone
+from langchain_pinecone import PineconeVectorStore
+
+from aws_secrets_initialization import PINECONE_API_KEY_SECRET, get_embeddings, get_pinecone_api_key, secrets_provider
+
+
+# Constants and configuration
+TEXT_FIELD = "text"
+POOL_THREADS = 8
+
+
+class VectorStoreRegistry:
+    """
+    Process-wide, thread-safe registry of vector store handles.
+
+    Every Streamlit session shares the same Pinecone client, Index handle and
+    PineconeVectorStore, so TLS connections stay pooled between turns instead of
+    being rebuilt on every query.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._handles = {}
+        self._generation = 0
+        self._reset_callbacks = []
+
+    @property
+    def generation(self):
+        """
+        Counter bumped on every reset; lets dependent caches notice a rebuild.
+        """
+        return self._generation
+
+    def get(self, key, builder):
+        """
+        Return the handle cached under `key`, building it once with `builder()`.
+        """
+        handle = self._handles.get(key)
+        if handle is None:
+            with self._lock:
+                handle = self._handles.get(key)
+                if handle is None:
+                    handle = builder()
+                    self._handles[key] = handle
+        return handle
+
+    def on_reset(self, callback):
+        """
+        Registers callback(index_name) to run after every reset.
+        """
+        self._reset_callbacks.append(callback)
+
+    def pinecone_client(self):
+        """
+        Returns the shared Pinecone client.
+        """
+        return self.get("pinecone-client", lambda: pinecone.Pinecone(api_key=get_pinecone_api_key(), pool_threads=POOL_THREADS))
+
+    def pinecone_index(self, index_name):
+        """
+        Returns the shared Index handle (and its HTTP connection pool) for an index.
+        """
+        return self.get(("pinecone-index", index_name),
+                        lambda: self.pinecone_client().Index(index_name, pool_threads=POOL_THREADS))
+
+    def pinecone_vector_store(self, index_name):
+        """
+        Returns the shared PineconeVectorStore for an index.
+        """
+        return self.get(("pinecone-store", index_name),
+                        lambda: PineconeVectorStore(self.pinecone_index(index_name), get_embeddings(), TEXT_FIELD))
+
+    def reset(self, index_name=None):
+        """
+        Drop cached handles so they are rebuilt on next use.
+        With an index name only that index's handles are dropped; otherwise all of them.
+        """
+        with self._lock:
+            if index_name is None:
+                self._handles.clear()
+            else:
+                for key in list(self._handles):
+                    if isinstance(key, tuple) and key[1] == index_name:
+                        del self._handles[key]
+            self._generation += 1
+        for callback in self._reset_callbacks:
+            callback(index_name)
+
+    def health_check(self, index_name):
+        """
+        Checks that the shared index handle can still reach Pinecone.
+        A failing handle is reset so the next query gets a fresh connection.
+
+        Returns:
+        dict: {'index', 'healthy', 'vector_count'} or {'index', 'healthy', 'error'}
+        """
+        try:
+            stats = self.pinecone_index(index_name).describe_index_stats()
+            return {"index": index_name, "healthy": True, "vector_count": getattr(stats, "total_vector_count", None)}
+        except Exception as e:
+            print(f"Health check failed for index '{index_name}': {e}")
+            self.reset(index_name)
+            return {"index": index_name, "healthy": False, "error": str(e)}
+
+
+vector_store_registry = VectorStoreRegistry()
+
+# A rotated Pinecone key rebuilds the client and every index handle on next use
+secrets_provider.on_change(*PINECONE_API_KEY_SECRET, lambda: vector_store_registry.reset())
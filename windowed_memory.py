@@ -0,0 +1,122 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import SystemMessage, get_buffer_string
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from stage_metrics import submit, timed
+
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "Progressively summarize a conversation between a student and a Federal Student Aid assistant. "
+     "Extend the current summary with the new lines, keeping facts about the student's situation, "
+     "questions asked and answers given. Reply with the new summary only."),
+    ("human", "Current summary:\n{summary}\n\nNew lines of conversation:\n{new_lines}"),
+])
+
+_summarizer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+
+
+def estimate_tokens(message):
+    """
+    Rough token count (about four characters per token), cheap enough to run every turn.
+    """
+    return len(str(message.content)) // 4 + 4
+
+
+class WindowedSummaryMemory:
+    """
+    Conversation memory with a constant-size prompt footprint.
+
+    The last `max_turns` turns are kept verbatim as long as they fit in
+    `max_tokens`; older messages are folded into a running summary by a
+    background LLM call after each turn, so only new messages are summarized.
+    Messages stay verbatim until a summary covering them has been committed,
+    so nothing is lost while a summary is pending or after one fails.
+    Summary state lives in `state`, a plain dict kept in st.session_state.
+    Implements the load_memory_variables/save_context interface used by the
+    agent factory and the direct pipeline.
+    """
+
+    memory_key = "chat_history"
+
+    def __init__(self, chat_memory, state, llm_loader, max_turns=4, max_tokens=2000, token_counter=estimate_tokens):
+        self.chat_memory = chat_memory
+        self.state = state
+        self.llm_loader = llm_loader
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        self.state.setdefault("summary", "")
+        self.state.setdefault("summarized", 0)
+        self.state.setdefault("lock", threading.Lock())
+        self.state.setdefault("pending", False)
+        self.state.setdefault("generation", 0)
+
+    @property
+    def memory_variables(self):
+        return [self.memory_key]
+
+    def _window_start(self, messages):
+        """
+        Index of the first message that stays in the window; older ones are due for summarizing.
+        """
+        start, tokens = len(messages), 0
+        while start > self.state["summarized"] and len(messages) - start < self.max_turns * 2:
+            cost = self.token_counter(messages[start - 1])
+            if tokens + cost > self.max_tokens:
+                break
+            tokens += cost
+            start -= 1
+        return start
+
+    def load_memory_variables(self, inputs):
+        messages = self.chat_memory.messages
+        with self.state["lock"]:
+            summary, summarized = self.state["summary"], self.state["summarized"]
+        history = messages[summarized:]
+        if summary:
+            history = [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + history
+        return {self.memory_key: history}
+
+    def save_context(self, inputs, outputs):
+        self.chat_memory.add_user_message(inputs["input"])
+        self.chat_memory.add_ai_message(outputs["output"])
+        self._schedule_summary()
+
+    def _schedule_summary(self):
+        """
+        Folds messages that left the window into the summary in the background.
+        """
+        messages = self.chat_memory.messages
+        start = self._window_start(messages)
+        with self.state["lock"]:
+            if self.state["pending"] or start <= self.state["summarized"]:
+                return
+            self.state["pending"] = True
+            to_fold = messages[self.state["summarized"]:start]
+        submit(_summarizer, self._summarize, to_fold, start, self.state["generation"])
+
+    def _summarize(self, to_fold, end, generation):
+        try:
+            chain = SUMMARY_PROMPT | self.llm_loader() | StrOutputParser()
+            with timed("summary"):
+                summary = chain.invoke({"summary": self.state["summary"] or "(none)", "new_lines": get_buffer_string(to_fold)})
+            with self.state["lock"]:
+                if generation == self.state["generation"]:
+                    self.state["summary"] = summary.strip()
+                    self.state["summarized"] = end
+        except Exception as e:
+            print(f"Error summarizing the conversation: {e}")
+        finally:
+            with self.state["lock"]:
+                self.state["pending"] = False
+
+    def clear(self):
+        self.chat_memory.clear()
+        with self.state["lock"]:
+            self.state["summary"] = ""
+            self.state["summarized"] = 0
+            self.state["generation"] += 1